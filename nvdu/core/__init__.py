@@ -4,4 +4,13 @@ from .scene_object import *
 from .cuboid import *
 from .camera import *
 from .box import *
-from .nvdu_data import *
\ No newline at end of file
+from .frame_table import *
+from .json_backend import *
+from .image_io import *
+from .frame_aspect import *
+from .frame_loader import *
+from .lru_cache import *
+from .nvdu_data import *
+from .annotation_store import *
+from .reprojection_check import *
+from .instance_mask import *
@@ -0,0 +1,361 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+import os
+from os import path
+import json
+import numpy as np
+
+from .cuboid import *
+from .frame_table import *
+from .json_backend import *
+from .nvdu_data import *
+
+# =============================== Annotation store ===============================
+# An annotation store packs the annotation data of all the frames in a dataset into flat numpy arrays,
+# each array is saved in its own .npy file so it can be memory-mapped.
+# The objects of frame i are [frame_object_offsets[i], frame_object_offsets[i + 1]) in the object arrays,
+# the keypoints of object j are [object_keypoint_offsets[j], object_keypoint_offsets[j + 1]) in the keypoint arrays.
+# NOTE: Missing values are stored as NaN
+ANNOTATION_STORE_VERSION = 1
+ANNOTATION_STORE_META_FILE_NAME = 'meta.json'
+
+# Name, dtype and item shape of each array in the store
+AnnotationStoreColumns = [
+    ('frame_names',                     None,       ()),
+    ('frame_object_offsets',            np.int64,   ()),
+    ('object_class_ids',                np.int32,   ()),
+    ('object_locations',                np.float32, (3,)),
+    ('object_quaternions_xyzw',         np.float32, (4,)),
+    ('object_cuboid_centroids',         np.float32, (3,)),
+    ('object_projected_cuboids',        np.float32, (CuboidVertexType.TotalVertexCount, 2)),
+    ('object_keypoint_offsets',         np.int64,   ()),
+    ('keypoint_name_ids',               np.int32,   ()),
+    ('keypoint_locations',              np.float32, (3,)),
+    ('keypoint_projected_locations',    np.float32, (2,)),
+]
+
+def get_annotation_store_array_path(store_dir_path, column_name):
+    return path.join(store_dir_path, column_name + '.npy')
+
+def _get_json_vector(json_obj, key, vector_size):
+    json_vector = json_obj.get(key)
+    if (json_vector is None) or (len(json_vector) != vector_size):
+        return [np.nan] * vector_size
+    return json_vector
+
+class AnnotationStoreWriter(object):
+    """Pack the annotation data of frames into flat arrays and save them as an annotation store"""
+    def __init__(self):
+        self.frame_names = []
+        self.class_names = []
+        self.keypoint_names = []
+        self._class_ids = {}
+        self._keypoint_name_ids = {}
+
+        self._arrays = {}
+        for column_name, column_dtype, column_shape in AnnotationStoreColumns:
+            if not (column_dtype is None):
+                self._arrays[column_name] = GrowableArray(column_dtype, column_shape)
+        self._arrays['frame_object_offsets'].extend([0])
+        self._arrays['object_keypoint_offsets'].extend([0])
+
+    @property
+    def frame_count(self):
+        return len(self.frame_names)
+
+    @property
+    def object_count(self):
+        return len(self._arrays['object_class_ids'])
+
+    def _get_name_id(self, name, name_ids, names):
+        name_id = name_ids.get(name)
+        if (name_id is None):
+            name_id = len(names)
+            name_ids[name] = name_id
+            names.append(name)
+        return name_id
+
+    def add_frame(self, frame_name, frame_json_data):
+        """Add the annotation data of a frame, frame_json_data is the parsed json of the frame's annotation file"""
+        objects_data = frame_json_data.get('objects', []) if not (frame_json_data is None) else []
+        if (objects_data is None):
+            objects_data = []
+
+        class_ids = []
+        locations = []
+        quaternions = []
+        cuboid_centroids = []
+        projected_cuboids = []
+        keypoint_counts = []
+        keypoint_name_ids = []
+        keypoint_locations = []
+        keypoint_projected_locations = []
+        for check_obj in objects_data:
+            class_ids.append(self._get_name_id(check_obj.get('class', ''), self._class_ids, self.class_names))
+            locations.append(_get_json_vector(check_obj, 'location', 3))
+            quaternions.append(_get_json_vector(check_obj, 'quaternion_xyzw', 4))
+            cuboid_centroids.append(_get_json_vector(check_obj, 'cuboid_centroid', 3))
+
+            projected_cuboid = np.full((CuboidVertexType.TotalVertexCount, 2), np.nan, dtype=np.float32)
+            projected_vertices = check_obj.get('projected_cuboid')
+            if projected_vertices:
+                vertex_count = min(len(projected_vertices), CuboidVertexType.TotalVertexCount)
+                projected_cuboid[:vertex_count] = projected_vertices[:vertex_count]
+            if (len(check_obj.get('projected_cuboid_centroid') or []) == 2):
+                projected_cuboid[CuboidVertexType.Center] = check_obj['projected_cuboid_centroid']
+            projected_cuboids.append(projected_cuboid)
+
+            keypoints_data = check_obj.get('keypoints') or []
+            keypoint_counts.append(len(keypoints_data))
+            for check_keypoint in keypoints_data:
+                keypoint_name_ids.append(self._get_name_id(check_keypoint.get('name', ''), self._keypoint_name_ids, self.keypoint_names))
+                keypoint_locations.append(_get_json_vector(check_keypoint, 'location', 3))
+                keypoint_projected_locations.append(_get_json_vector(check_keypoint, 'projected_location', 2))
+
+        self.frame_names.append(frame_name)
+        self._arrays['frame_object_offsets'].extend([self.object_count + len(class_ids)])
+        if not class_ids:
+            return
+
+        last_keypoint_offset = self._arrays['object_keypoint_offsets'].values[-1]
+        self._arrays['object_keypoint_offsets'].extend(np.cumsum(keypoint_counts) + last_keypoint_offset)
+        self._arrays['object_class_ids'].extend(class_ids)
+        self._arrays['object_locations'].extend(locations)
+        self._arrays['object_quaternions_xyzw'].extend(quaternions)
+        self._arrays['object_cuboid_centroids'].extend(cuboid_centroids)
+        self._arrays['object_projected_cuboids'].extend(projected_cuboids)
+        if keypoint_name_ids:
+            self._arrays['keypoint_name_ids'].extend(keypoint_name_ids)
+            self._arrays['keypoint_locations'].extend(keypoint_locations)
+            self._arrays['keypoint_projected_locations'].extend(keypoint_projected_locations)
+
+    def add_frame_from_file(self, frame_name, frame_file_path):
+        self.add_frame(frame_name, load_json_file(frame_file_path))
+
+    def save(self, store_dir_path):
+        if not path.exists(store_dir_path):
+            os.makedirs(store_dir_path)
+
+        for column_name, column_dtype, _ in AnnotationStoreColumns:
+            if (column_name == 'frame_names'):
+                # NOTE: Save the names as fixed size utf-8 strings so they can be memory-mapped too
+                column_values = np.array(list(frame_name.encode('utf-8') for frame_name in self.frame_names), dtype=np.bytes_)
+            else:
+                column_values = self._arrays[column_name].values
+            np.save(get_annotation_store_array_path(store_dir_path, column_name), column_values)
+
+        meta_data = {
+            'version': ANNOTATION_STORE_VERSION,
+            'frame_count': self.frame_count,
+            'object_count': self.object_count,
+            'keypoint_count': len(self._arrays['keypoint_name_ids']),
+            'class_names': self.class_names,
+            'keypoint_names': self.keypoint_names,
+        }
+        with open(path.join(store_dir_path, ANNOTATION_STORE_META_FILE_NAME), 'w') as meta_file:
+            json.dump(meta_data, meta_file, indent=4)
+
+def build_annotation_store(dataset, store_dir_path, frame_indexes=None):
+    """Pack the annotation data of a scanned NVDUDataset into an annotation store
+    Args:
+        dataset: NVDUDataset - the frames are stored in the same order as in the dataset
+        store_dir_path: directory where the store's files are saved
+        frame_indexes: indexes of the frames to pack, all the frames of the dataset if None
+    Return:
+        AnnotationStore - the saved store
+    """
+    if not dataset.is_scanned:
+        dataset.scan()
+    if (frame_indexes is None):
+        frame_indexes = range(dataset.frame_count)
+
+    store_writer = AnnotationStoreWriter()
+    for frame_index in frame_indexes:
+        frame_name = dataset.get_frame_name_from_index(frame_index)
+        store_writer.add_frame_from_file(frame_name, dataset.get_annotation_file_path_of_frame(frame_name))
+        if (store_writer.frame_count % 10000 == 0):
+            print("build_annotation_store - packed {} frames - {} objects".format(store_writer.frame_count, store_writer.object_count))
+
+    store_writer.save(store_dir_path)
+    print("build_annotation_store: {} - {} frames - {} objects".format(store_dir_path, store_writer.frame_count, store_writer.object_count))
+    return AnnotationStore(store_dir_path)
+
+class AnnotationStore(object):
+    """Read the annotation data from an annotation store without any json parsing"""
+    def __init__(self, store_dir_path, use_mmap=True):
+        self.store_dir_path = store_dir_path
+        self._mmap_mode = 'r' if use_mmap else None
+
+        with open(path.join(store_dir_path, ANNOTATION_STORE_META_FILE_NAME), 'r') as meta_file:
+            meta_data = json.load(meta_file)
+        if (meta_data.get('version') != ANNOTATION_STORE_VERSION):
+            raise Exception('Unsupported annotation store version: {} - {}'.format(meta_data.get('version'), store_dir_path))
+
+        self.frame_count = meta_data['frame_count']
+        self.object_count = meta_data['object_count']
+        self.keypoint_count = meta_data['keypoint_count']
+        self.class_names = meta_data['class_names']
+        self.keypoint_names = meta_data['keypoint_names']
+        # The arrays are only loaded when they are used
+        self._arrays = {}
+
+    def get_array(self, column_name):
+        """Get a whole array of the store, e.g: 'object_locations'"""
+        if not (column_name in self._arrays):
+            array_path = get_annotation_store_array_path(self.store_dir_path, column_name)
+            self._arrays[column_name] = np.load(array_path, mmap_mode=self._mmap_mode)
+        return self._arrays[column_name]
+
+    def get_frame_name(self, frame_index):
+        return self.get_array('frame_names')[frame_index].decode('utf-8')
+
+    def get_frame_object_range(self, frame_index):
+        frame_object_offsets = self.get_array('frame_object_offsets')
+        return int(frame_object_offsets[frame_index]), int(frame_object_offsets[frame_index + 1])
+
+    def get_frame_object_counts(self):
+        return np.diff(self.get_array('frame_object_offsets'))
+
+    def get_object_frame_indexes(self):
+        """Get the index of the frame which contains each object"""
+        return np.repeat(np.arange(self.frame_count), self.get_frame_object_counts())
+
+    def get_object_pose_matrices(self, object_indexes=None):
+        """Get the (N, 4, 4) transform matrices of the objects' poses (same as transform3d's), all the objects if object_indexes is None
+        NOTE: The objects without location or quaternion get NaN matrices
+        """
+        locations = self.get_array('object_locations')
+        quaternions = self.get_array('object_quaternions_xyzw')
+        if not (object_indexes is None):
+            locations = locations[object_indexes]
+            quaternions = quaternions[object_indexes]
+        return poses_to_matrices(locations, quaternions)
+
+    def get_projected_cuboids(self, dataset_settings, camera_intrinsic_matrices, object_indexes=None):
+        """Project the cuboids of the stored objects in one vectorized pass, e.g: to regenerate the projected cuboids with new intrinsics
+        Args:
+            dataset_settings: DatasetSettings which have the cuboid of each class
+            camera_intrinsic_matrices: (3, 3) intrinsic matrix of all the frames or (frame_count, 3, 3) - one per frame
+            object_indexes: indexes of the objects to project, all the objects if None
+        Return:
+            (projected_vertices, is_valid): (N, 9, 2) array and (N, 9) mask, see project_cuboids
+        """
+        # Cuboid vertices of each class, NaN if the class has no settings
+        class_cuboid_vertices = np.full((max(1, len(self.class_names)), CuboidVertexType.TotalVertexCount, 3), np.nan)
+        for class_id, class_name in enumerate(self.class_names):
+            class_settings = dataset_settings.get_object_settings(class_name)
+            if not (class_settings is None):
+                class_cuboid_vertices[class_id] = class_settings.cuboid3d.get_vertices()
+
+        object_indexes = slice(None) if (object_indexes is None) else object_indexes
+        cuboid_vertices = class_cuboid_vertices[self.get_array('object_class_ids')[object_indexes]]
+        # NOTE: Same transform as AnnotatedObjectInfo's cuboid 3d, placed at the cuboid centroid if there is one
+        cuboid_locations = np.array(self.get_array('object_cuboid_centroids')[object_indexes], dtype=np.float64)
+        missing_centroids = np.isnan(cuboid_locations).any(axis=-1)
+        cuboid_locations[missing_centroids] = self.get_array('object_locations')[object_indexes][missing_centroids]
+        cuboid_matrices = poses_to_matrices(cuboid_locations, self.get_array('object_quaternions_xyzw')[object_indexes])
+
+        camera_intrinsic_matrices = np.asarray(camera_intrinsic_matrices, dtype=np.float64)
+        if (camera_intrinsic_matrices.ndim == 3):
+            camera_intrinsic_matrices = camera_intrinsic_matrices[self.get_object_frame_indexes()[object_indexes]]
+        return project_cuboids(cuboid_vertices, cuboid_matrices, camera_intrinsic_matrices)
+
+    def get_cuboid_boxes(self, dataset_settings, camera_intrinsic_matrices, image_size=None, object_indexes=None):
+        """Get the 2d boxes around the projected cuboids of the stored objects, see get_projected_cuboids
+        image_size: (width, height) of the images, the boxes are clipped to it if specified
+        Return:
+            (boxes, truncations): (N, 4) array of [left, top, right, bottom] and the (N,) ratio of each box outside of the image
+        """
+        projected_cuboids, is_valid = self.get_projected_cuboids(dataset_settings, camera_intrinsic_matrices, object_indexes)
+        boxes = get_boxes_from_cuboids(projected_cuboids, is_valid)
+        if (image_size is None):
+            return boxes, np.zeros(len(boxes))
+        return clip_boxes(boxes, image_size[0], image_size[1])
+
+    def get_mesh_boxes(self, dataset_settings, camera_intrinsic_matrices, image_size=None, object_indexes=None):
+        """Get the tight 2d boxes around the projected meshes of the stored objects, the objects of each class are projected in batches
+        NOTE: The objects whose class has no settings or no mesh file get NaN boxes
+        Return:
+            (boxes, truncations): see get_cuboid_boxes
+        """
+        object_indexes = np.arange(self.object_count) if (object_indexes is None) else np.asarray(object_indexes).reshape(-1)
+        object_class_ids = self.get_array('object_class_ids')[object_indexes]
+        camera_intrinsic_matrices = np.asarray(camera_intrinsic_matrices, dtype=np.float64)
+        if (camera_intrinsic_matrices.ndim == 3):
+            camera_intrinsic_matrices = camera_intrinsic_matrices[self.get_object_frame_indexes()[object_indexes]]
+
+        boxes = np.full((len(object_indexes), 4), np.nan)
+        for class_id, class_name in enumerate(self.class_names):
+            class_settings = dataset_settings.get_object_settings(class_name)
+            if (class_settings is None) or not path.exists(class_settings.mesh_file_path):
+                continue
+            class_object_mask = (object_class_ids == class_id)
+            if not class_object_mask.any():
+                continue
+            class_intrinsics = camera_intrinsic_matrices[class_object_mask] if (camera_intrinsic_matrices.ndim == 3) else camera_intrinsic_matrices
+            boxes[class_object_mask] = get_boxes_from_mesh_vertices(load_mesh_vertices(class_settings.mesh_file_path),
+                self.get_object_pose_matrices(object_indexes[class_object_mask]), class_intrinsics, class_settings.initial_matrix)
+
+        if (image_size is None):
+            return boxes, np.zeros(len(boxes))
+        return clip_boxes(boxes, image_size[0], image_size[1])
+
+    def get_frame(self, frame_index):
+        """Get the annotation data of a frame
+        Return:
+            dict - the object and keypoint arrays of the store sliced to the frame's objects
+        """
+        object_start, object_end = self.get_frame_object_range(frame_index)
+        object_keypoint_offsets = self.get_array('object_keypoint_offsets')
+        keypoint_start = int(object_keypoint_offsets[object_start])
+        keypoint_end = int(object_keypoint_offsets[object_end])
+
+        frame_data = {
+            'frame_name': self.get_frame_name(frame_index),
+            'object_keypoint_offsets': object_keypoint_offsets[object_start:object_end + 1] - keypoint_start,
+        }
+        for column_name, _, _ in AnnotationStoreColumns:
+            if column_name.startswith('object_') and not (column_name in frame_data):
+                frame_data[column_name] = self.get_array(column_name)[object_start:object_end]
+            elif column_name.startswith('keypoint_'):
+                frame_data[column_name] = self.get_array(column_name)[keypoint_start:keypoint_end]
+        return frame_data
+
+    def get_frame_json_data(self, frame_index):
+        """Rebuild the annotation json data of a frame (only with the fields kept in the store)"""
+        frame_data = self.get_frame(frame_index)
+        objects_data = []
+        keypoint_offsets = frame_data['object_keypoint_offsets']
+        for object_index in range(len(frame_data['object_class_ids'])):
+            obj_json = {'class': self.class_names[frame_data['object_class_ids'][object_index]]}
+            for json_key, column_name in [('location', 'object_locations'),
+                                          ('quaternion_xyzw', 'object_quaternions_xyzw'),
+                                          ('cuboid_centroid', 'object_cuboid_centroids')]:
+                column_value = frame_data[column_name][object_index]
+                if not np.isnan(column_value).any():
+                    obj_json[json_key] = column_value.tolist()
+
+            projected_cuboid = frame_data['object_projected_cuboids'][object_index]
+            if not np.isnan(projected_cuboid[:CuboidVertexType.TotalCornerVertexCount]).all():
+                obj_json['projected_cuboid'] = projected_cuboid[:CuboidVertexType.TotalCornerVertexCount].tolist()
+            if not np.isnan(projected_cuboid[CuboidVertexType.Center]).any():
+                obj_json['projected_cuboid_centroid'] = projected_cuboid[CuboidVertexType.Center].tolist()
+
+            keypoint_start, keypoint_end = keypoint_offsets[object_index], keypoint_offsets[object_index + 1]
+            if (keypoint_end > keypoint_start):
+                obj_json['keypoints'] = list({
+                    'name': self.keypoint_names[frame_data['keypoint_name_ids'][keypoint_index]],
+                    'location': frame_data['keypoint_locations'][keypoint_index].tolist(),
+                    'projected_location': frame_data['keypoint_projected_locations'][keypoint_index].tolist(),
+                } for keypoint_index in range(keypoint_start, keypoint_end))
+            objects_data.append(obj_json)
+
+        return {'objects': objects_data}
+
+    def create_scene_info(self, dataset_settings, frame_index, image_data=None):
+        """Create the AnnotatedSceneInfo of a frame from the store"""
+        new_scene_info = AnnotatedSceneInfo.create_from_json_data(dataset_settings, self.get_frame_json_data(frame_index), image_data)
+        new_scene_info.source_file_path = self.get_frame_name(frame_index) + FrameDataExt
+        return new_scene_info
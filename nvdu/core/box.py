@@ -1,26 +1,152 @@
 # Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
-# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International 
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
 # License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode)
 
+import numpy as np
+
 from .scene_object import *
+from .cuboid import *
 
+# ========================= Box2d =========================
 class Box2d(SceneObject):
+    """2d box in image space, the coordinates are in pixels"""
+    __slots__ = ['left', 'right', 'top', 'bottom']
+
     # Create a box from its border
     def __init__(self, left, right, top, bottom):
-        super(BoundingBox2d, self).__init__()
-        
+        super(Box2d, self).__init__()
+
         self.left = left
         self.right = right
         self.top = top
         self.bottom = bottom
 
-        self.generate_vertexes()
+    @classmethod
+    def from_array(cls, box_array):
+        """Create a box from a [left, top, right, bottom] array, e.g: one row of the arrays of get_boxes_from_points"""
+        left, top, right, bottom = box_array
+        return cls(left, right, top, bottom)
+
+    @classmethod
+    def parse_from_json_data(cls, json_data):
+        """Parse an annotated box, e.g: 'bounding_box' or 'bounding_rectangle_imagespace'
+        NOTE: NDDS write the corners as (y, x): {"top_left": [top, left], "bottom_right": [bottom, right]}
+        Return None if the data is not a box
+        """
+        try:
+            top, left = json_data['top_left']
+            bottom, right = json_data['bottom_right']
+        except (KeyError, TypeError, ValueError):
+            return None
+        return cls(float(left), float(right), float(top), float(bottom))
+
+    def to_array(self):
+        return np.array([self.left, self.top, self.right, self.bottom], dtype=float)
 
-    def get_width():
+    def get_width(self):
         return (self.right - self.left)
 
-    def get_height():
+    def get_height(self):
         return (self.bottom - self.top)
 
-    def get_size():
-        return [self.get_width(), self.get_height()]
\ No newline at end of file
+    def get_size(self):
+        return [self.get_width(), self.get_height()]
+
+    def get_area(self):
+        return max(0.0, self.get_width()) * max(0.0, self.get_height())
+
+    def get_vertices(self):
+        """Get the 4 corners of the box: top left, top right, bottom right, bottom left"""
+        return np.array([[self.left, self.top], [self.right, self.top], [self.right, self.bottom], [self.left, self.bottom]], dtype=float)
+
+    def scale_box(self, scale):
+        """Scale the box, e.g: when the image is resized"""
+        self.left *= scale
+        self.right *= scale
+        self.top *= scale
+        self.bottom *= scale
+
+# ========================= Batched boxes =========================
+# All the batched functions use (N, 4) arrays of [left, top, right, bottom] boxes, NaN for the objects without box
+
+def get_boxes_from_points(points2d, is_valid = None):
+    """Get the boxes around N sets of 2d points in one vectorized pass
+    Args:
+        points2d: (N, P, 2) array, the NaN points are ignored
+        is_valid: optional (N, P) mask of the points to use, e.g: the points in front of the camera from project_points
+    Return:
+        (N, 4) array, NaN when a set doesn't have any valid point
+    """
+    points2d = np.asarray(points2d, dtype=np.float64)
+    point_mask = ~np.isnan(points2d).any(axis=-1)
+    if not (is_valid is None):
+        point_mask &= is_valid
+    point_mask = point_mask[..., np.newaxis]
+
+    boxes = np.empty(points2d.shape[:-2] + (4,))
+    boxes[..., :2] = np.where(point_mask, points2d, np.inf).min(axis=-2)
+    boxes[..., 2:] = np.where(point_mask, points2d, -np.inf).max(axis=-2)
+    boxes[~point_mask.any(axis=-2)[..., 0]] = np.nan
+    return boxes
+
+def get_box_areas(boxes):
+    boxes = np.asarray(boxes, dtype=np.float64)
+    return np.clip(boxes[..., 2] - boxes[..., 0], 0.0, None) * np.clip(boxes[..., 3] - boxes[..., 1], 0.0, None)
+
+def clip_boxes(boxes, image_width, image_height):
+    """Clip boxes to the image
+    Return:
+        (clipped_boxes, truncations): (N, 4) array and (N,) ratio of each box's area outside of the image
+        (1 when the box is fully outside the image, NaN for the NaN boxes)
+    """
+    boxes = np.asarray(boxes, dtype=np.float64)
+    clipped_boxes = boxes.copy()
+    np.clip(clipped_boxes[..., 0::2], 0.0, image_width, out=clipped_boxes[..., 0::2])
+    np.clip(clipped_boxes[..., 1::2], 0.0, image_height, out=clipped_boxes[..., 1::2])
+
+    box_areas = get_box_areas(boxes)
+    clipped_areas = get_box_areas(clipped_boxes)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        truncations = np.where(box_areas > 0.0, 1.0 - clipped_areas / box_areas, 0.0)
+    # NOTE: A flat box (e.g: a single point) is fully truncated when it's outside of the image
+    is_outside = (boxes[..., 2] < 0.0) | (boxes[..., 0] > image_width) | (boxes[..., 3] < 0.0) | (boxes[..., 1] > image_height)
+    truncations[is_outside] = 1.0
+    truncations[np.isnan(boxes).any(axis=-1)] = np.nan
+    return clipped_boxes, truncations
+
+def get_boxes_from_cuboids(projected_cuboids, is_valid = None):
+    """Get the boxes around projected cuboids: (N, 9, 2) arrays from project_cuboids, only the 8 corners are used"""
+    projected_corners = np.asarray(projected_cuboids)[..., :CuboidVertexType.TotalCornerVertexCount, :]
+    corner_mask = is_valid[..., :CuboidVertexType.TotalCornerVertexCount] if not (is_valid is None) else None
+    return get_boxes_from_points(projected_corners, corner_mask)
+
+# Maximum number of projected vertices in flight when computing the mesh boxes, bound the temporary arrays' memory
+DEFAULT_MESH_BOX_VERTEX_BUDGET = 1 << 22
+
+def get_boxes_from_mesh_vertices(mesh_vertices, transform_matrices, camera_intrinsic_matrices,
+        initial_matrix = None, vertex_budget = DEFAULT_MESH_BOX_VERTEX_BUDGET):
+    """Get the tight boxes around N instances of a mesh by projecting all its vertices
+    Args:
+        mesh_vertices: (V, 3) vertices of the mesh, see load_mesh_vertices
+        transform_matrices: (N, 4, 4) poses of the instances, see poses_to_matrices
+        camera_intrinsic_matrices: (3, 3) or (N, 3, 3), see project_points
+        initial_matrix: the mesh's initial (fixed model) transform, applied before the pose
+        vertex_budget: the instances are processed in batches of vertex_budget projected vertices
+    Return:
+        (N, 4) array, the vertices behind the camera are ignored
+    """
+    mesh_vertices = np.asarray(mesh_vertices, dtype=np.float64)
+    if not (initial_matrix is None):
+        mesh_vertices = transform_points(initial_matrix, mesh_vertices)[0]
+    transform_matrices = np.asarray(transform_matrices, dtype=np.float64).reshape(-1, 4, 4)
+    camera_intrinsic_matrices = np.asarray(camera_intrinsic_matrices, dtype=np.float64)
+
+    instance_count = len(transform_matrices)
+    boxes = np.full((instance_count, 4), np.nan)
+    batch_size = max(1, vertex_budget // max(1, len(mesh_vertices)))
+    for batch_start in range(0, instance_count, batch_size):
+        batch_slice = slice(batch_start, min(instance_count, batch_start + batch_size))
+        batch_intrinsics = camera_intrinsic_matrices[batch_slice] if (camera_intrinsic_matrices.ndim == 3) else camera_intrinsic_matrices
+        projected_vertices, is_valid = project_points(transform_points(transform_matrices[batch_slice], mesh_vertices), batch_intrinsics)
+        boxes[batch_slice] = get_boxes_from_points(projected_vertices, is_valid)
+    return boxes
@@ -94,6 +94,16 @@ class CameraIntrinsicSettings(object):
                     return CameraIntrinsicSettings.from_json_object(viewpoint_obj)
         return None
 
+    def get_scaled(self, scale):
+        """Get the intrinsic settings of the camera for an image scaled by a factor, e.g: 0.5 for a half resolution image
+        NOTE: The projection matrix doesn't depend on the resolution so it's kept as is
+        """
+        scaled_settings = CameraIntrinsicSettings(self.res_width * scale, self.res_height * scale,
+            self.fx * scale, self.fy * scale, self.cx * scale, self.cy * scale, self.projection_matrix)
+        scaled_settings.znear = self.znear
+        scaled_settings.zfar = self.zfar
+        return scaled_settings
+
     def get_intrinsic_matrix(self):
         """
         Get the camera intrinsic matrix as numpy array
@@ -44,9 +44,63 @@ CuboidLineIndexes = [
     [ CuboidVertexType.FrontTopRight,     CuboidVertexType.RearTopRight ],
 ]
 
+# ========================= Batched projection =========================
+# Points closer to the camera than this depth can't be projected
+DEFAULT_MIN_PROJECTION_DEPTH = 1e-6
+
+def transform_points(transform_matrices, points3d):
+    """Transform N sets of 3d points by N transform matrices (pyrr's layout, the translation is in the last row)
+    Args:
+        transform_matrices: (N, 4, 4) array
+        points3d: (N, P, 3) array, or (P, 3) if all the matrices transform the same points
+    Return:
+        (N, P, 3) array of the transformed points
+    """
+    transform_matrices = np.asarray(transform_matrices, dtype=np.float64).reshape(-1, 4, 4)
+    points3d = np.asarray(points3d, dtype=np.float64)
+    # NOTE: pyrr use the row vector convention: transformed point = point * matrix
+    return np.matmul(points3d, transform_matrices[:, :3, :3]) + transform_matrices[:, np.newaxis, 3, :3]
+
+def project_points(points3d, camera_intrinsic_matrices, min_depth = DEFAULT_MIN_PROJECTION_DEPTH):
+    """Project N sets of 3d points in the camera space (OpenCV coordinate system) into the image
+    Args:
+        points3d: (N, P, 3) array
+        camera_intrinsic_matrices: (3, 3) intrinsic matrix shared by all the points or (N, 3, 3) - one per set of points,
+            e.g: the per frame intrinsics indexed by the frame of each object
+    Return:
+        (projected_points, is_valid): (N, P, 2) array of the image coordinates and the (N, P) mask of the points in front of
+        the camera (depth > min_depth). The points which are not valid are NaN
+    """
+    points3d = np.asarray(points3d, dtype=np.float64)
+    camera_intrinsic_matrices = np.asarray(camera_intrinsic_matrices, dtype=np.float64)
+    if (camera_intrinsic_matrices.ndim == 2):
+        homogeneous_points = np.matmul(points3d, camera_intrinsic_matrices.T)
+    else:
+        homogeneous_points = np.matmul(points3d, np.swapaxes(camera_intrinsic_matrices, -1, -2))
+
+    depths = points3d[..., 2]
+    is_valid = depths > min_depth
+    with np.errstate(divide='ignore', invalid='ignore'):
+        projected_points = homogeneous_points[..., :2] / homogeneous_points[..., 2:3]
+    projected_points[~is_valid] = np.nan
+    return projected_points, is_valid
+
+def project_cuboids(cuboid_vertices, transform_matrices, camera_intrinsic_matrices, min_depth = DEFAULT_MIN_PROJECTION_DEPTH):
+    """Project N cuboids into the image in one vectorized pass
+    Args:
+        cuboid_vertices: (N, 9, 3) vertices of the cuboids in their local space, or (9, 3) if all the cuboids have the same size
+        transform_matrices: (N, 4, 4) transforms of the cuboids into the camera space, see poses_to_matrices
+        camera_intrinsic_matrices: (3, 3) or (N, 3, 3), see project_points
+    Return:
+        (projected_vertices, is_valid): (N, 9, 2) array and the (N, 9) mask of the vertices in front of the camera
+    """
+    return project_points(transform_points(transform_matrices, cuboid_vertices), camera_intrinsic_matrices, min_depth)
+
 # ========================= Cuboid2d =========================
 class Cuboid2d(SceneObject):
     """Container for 2d projected points of a cuboid on an image"""
+    __slots__ = ['_vertices']
+
     def __init__(self, vertices=[]):
         """Create a cuboid 2d from a list of 2d points
         Args:
@@ -54,7 +108,10 @@ class Cuboid2d(SceneObject):
         """
         super(Cuboid2d, self).__init__()
 
-        self._vertices = np.array(vertices)
+        if not isinstance(vertices, np.ndarray):
+            # NOTE: The vertices which couldn't be projected may be None, they are stored as NaN so they are not drawn
+            vertices = list((np.nan, np.nan) if (vertex is None) else vertex for vertex in vertices)
+        self._vertices = np.array(vertices, dtype=float)
         # print('Cuboid2d - vertices: {}'.format(self._vertices))
 
     def get_vertex(self, vertex_type):
@@ -69,12 +126,19 @@ class Cuboid2d(SceneObject):
     def get_vertices(self):
         return self._vertices
 
+    def scale_vertices(self, scale):
+        """Scale the 2d points, e.g: to match an image decoded at a different resolution"""
+        self._vertices = self._vertices * scale
+
 # ========================= Cuboid3d =========================
 class Cuboid3d(SceneObject):
+    __slots__ = ['center_location', 'coord_system', 'size3d', '_vertices']
+
     # Create a box with a certain size
     # TODO: Instead of using center_location and coord_system, should pass in a Transform3d
+    # shared_vertices: read-only vertices of another cuboid with the same size, they are used instead of generating new ones
     def __init__(self, size3d = [1.0, 1.0, 1.0], center_location = [0, 0, 0],
-        coord_system = None, parent_object = None):
+        coord_system = None, parent_object = None, shared_vertices = None):
         super(Cuboid3d, self).__init__(parent_object)
 
         # NOTE: This local coordinate system is similar
@@ -82,9 +146,11 @@ class Cuboid3d(SceneObject):
         self.center_location = center_location
         self.coord_system = coord_system
         self.size3d = size3d
-        self._vertices = [0, 0, 0] * CuboidVertexType.TotalVertexCount
 
-        self.generate_vertexes()
+        if (shared_vertices is None):
+            self.generate_vertexes()
+        else:
+            self._vertices = shared_vertices
 
     def get_vertex(self, vertex_type):
         """Get the location of a vertex
@@ -146,6 +212,10 @@ class Cuboid3d(SceneObject):
             ]
             # print("cuboid3d - forward: {} - up: {} - right: {}".format(forward, up, right))
 
+        # NOTE: The vertices can be shared between many cuboids so they must not be modified
+        self._vertices = np.array(self._vertices, dtype=float)
+        self._vertices.setflags(write=False)
+
         # print("cuboid3d - size3d: {}".format(self.size3d))
         # print("cuboid3d - depth: {} - width: {} - height: {}".format(depth, width, height))
         # print("cuboid3d - vertices: {}".format(self._vertices))
@@ -160,19 +230,7 @@ class Cuboid3d(SceneObject):
             Cuboid2d - the projected cuboid points
         """
 
-        # projected_vertices = [0, 0] * CuboidVertexType.TotalVertexCount
         # world_transform_matrix = self.get_world_transform_matrix()
-        world_transform_matrix = cuboid_transform
-        rvec = [0, 0, 0]
-        tvec = [0, 0, 0]
-        dist_coeffs = np.zeros((4, 1))
-
-        transformed_vertices = [0, 0, 0] * CuboidVertexType.TotalVertexCount
-        for vertex_index in range(CuboidVertexType.TotalVertexCount):
-            vertex3d = self._vertices[vertex_index]
-            transformed_vertices[vertex_index] = world_transform_matrix * vertex3d
-
-        projected_vertices = cv2.projectPoints(transformed_vertices, rvec, tvec, 
-                                camera_intrinsic_matrix, dist_coeffs)
-
-        return Cuboid2d(projected_vertices)
+        # NOTE: The vertices behind the camera are NaN, use project_cuboids to project many cuboids at once
+        projected_vertices, _ = project_cuboids(self._vertices, cuboid_transform, camera_intrinsic_matrix)
+        return Cuboid2d(projected_vertices[0])
@@ -0,0 +1,151 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+import os
+from os import path
+import threading
+import numpy as np
+import cv2
+
+# Meters per unit of the 16-bit depth images, NDDS export the depth in 1/10000 of a meter
+DEFAULT_DEPTH_SCALE = 0.0001
+
+# =============================== Depth ===============================
+def read_depth_image(depth_file_path, depth_scale = DEFAULT_DEPTH_SCALE):
+    """Read a depth image as a float32 map of the depth in meters, the pixels without depth are 0
+    Return None if the image can't be read
+    """
+    depth_image = cv2.imread(depth_file_path, cv2.IMREAD_ANYDEPTH)
+    if (depth_image is None):
+        return None
+    depth_data = depth_image.astype(np.float32)
+    depth_data *= np.float32(depth_scale)
+    return depth_data
+
+# =============================== Segmentation ===============================
+def pack_colors(color_data):
+    """Pack the RGB colors of an (..., 3) array into uint32 keys: (R << 16) | (G << 8) | B"""
+    color_data = np.asarray(color_data)
+    return ((color_data[..., 0].astype(np.uint32) << 16) |
+            (color_data[..., 1].astype(np.uint32) << 8) |
+            color_data[..., 2].astype(np.uint32))
+
+def read_segmentation_image(segmentation_file_path):
+    """Read a segmentation image as RGB (H, W, 3) or as a (H, W) map of ids for a single channel image
+    Return None if the image can't be read
+    """
+    segmentation_image = cv2.imread(segmentation_file_path, cv2.IMREAD_UNCHANGED)
+    if (segmentation_image is None) or (len(segmentation_image.shape) < 3):
+        return segmentation_image
+    # NOTE: OpenCV load the color images as BGR(A), the alpha channel is not used
+    return segmentation_image[:, :, 2::-1]
+
+class SegmentationColorTable(object):
+    """Lookup table from the colors of a segmentation image to the class ids of the objects"""
+    def __init__(self, class_colors, class_ids, unknown_class_id = 0):
+        """
+        Args:
+            class_colors: list of RGB colors
+            class_ids: the class id of each color
+            unknown_class_id: id of the pixels whose color is not in the table, e.g: the background
+        """
+        color_keys = pack_colors(np.array(class_colors, dtype=np.uint32).reshape(-1, 3))
+        class_ids = np.array(class_ids, dtype=np.int32).reshape(-1)
+        sorted_indexes = np.argsort(color_keys, kind='stable')
+        self.color_keys = color_keys[sorted_indexes]
+        self.class_ids = class_ids[sorted_indexes]
+        self.unknown_class_id = unknown_class_id
+
+    @classmethod
+    def create_from_dataset_settings(cls, dataset_settings, unknown_class_id = 0):
+        class_colors = []
+        class_ids = []
+        for obj_settings in dataset_settings.obj_settings.values():
+            class_colors.append(obj_settings.class_color[:3])
+            class_ids.append(obj_settings.class_id)
+        return cls(class_colors, class_ids, unknown_class_id)
+
+    def get_class_ids(self, segmentation_data):
+        """Convert a segmentation image into a (H, W) int32 map of class ids
+        NOTE: The single channel segmentation images already store the class id of each pixel
+        """
+        if (len(segmentation_data.shape) < 3):
+            return segmentation_data.astype(np.int32)
+
+        class_id_data = np.full(segmentation_data.shape[:2], self.unknown_class_id, dtype=np.int32)
+        if (len(self.color_keys) == 0):
+            return class_id_data
+
+        pixel_keys = pack_colors(segmentation_data)
+        key_indexes = np.searchsorted(self.color_keys, pixel_keys)
+        np.clip(key_indexes, 0, len(self.color_keys) - 1, out=key_indexes)
+        is_known_color = (self.color_keys[key_indexes] == pixel_keys)
+        class_id_data[is_known_color] = self.class_ids[key_indexes[is_known_color]]
+        return class_id_data
+
+def get_instance_ids(segmentation_data, background_color = (0, 0, 0)):
+    """Give an id to each distinct color (or value) of a segmentation image
+    Return:
+        (instance_id_data, instance_colors): (H, W) int32 map of the instance ids, 0 being the background,
+        and the color of each instance id (instance_colors[0] is the background color)
+    """
+    if (len(segmentation_data.shape) < 3):
+        pixel_keys = segmentation_data.astype(np.uint32)
+        background_key = np.uint32(background_color if np.isscalar(background_color) else 0)
+    else:
+        pixel_keys = pack_colors(segmentation_data)
+        background_key = pack_colors(np.array(background_color, dtype=np.uint32))
+
+    instance_keys, key_indexes = np.unique(pixel_keys, return_inverse=True)
+    # Map the index of each unique key to its instance id: the background is 0 and the other colors start from 1
+    instance_ids = np.arange(1, len(instance_keys) + 1, dtype=np.int32)
+    background_index = np.searchsorted(instance_keys, background_key)
+    if (background_index < len(instance_keys)) and (instance_keys[background_index] == background_key):
+        instance_ids[background_index] = 0
+        instance_ids[background_index + 1:] -= 1
+        instance_keys = np.delete(instance_keys, background_index)
+    instance_keys = np.concatenate(([background_key], instance_keys)).astype(np.uint32)
+    instance_id_data = instance_ids[key_indexes.reshape(pixel_keys.shape)]
+
+    if (len(segmentation_data.shape) < 3):
+        instance_colors = instance_keys
+    else:
+        instance_colors = np.stack([(instance_keys >> 16) & 255, (instance_keys >> 8) & 255, instance_keys & 255], axis=-1).astype(np.uint8)
+    return instance_id_data, instance_colors
+
+# =============================== Array cache ===============================
+def save_array_file(array_file_path, array_data):
+    """Save an array to a .npy file, the file is written to a temporary file first so the readers never see a partial file"""
+    array_dir_path, array_file_name = path.split(array_file_path)
+    if array_dir_path:
+        os.makedirs(array_dir_path, exist_ok=True)
+    temp_file_path = path.join(array_dir_path, '.{}_{}_{}'.format(os.getpid(), threading.get_ident(), array_file_name))
+    with open(temp_file_path, 'wb') as temp_file:
+        np.save(temp_file, array_data)
+    os.replace(temp_file_path, array_file_path)
+
+def load_cached_array(cache_file_path, source_file_path, decode_func, mmap = True):
+    """Load the array decoded from a source file using a .npy sidecar file
+    The array is decoded again when the source file is newer than the sidecar.
+    Args:
+        cache_file_path: path of the .npy sidecar file, if it's empty then the array is always decoded
+        decode_func: function(source_file_path) => numpy array or None
+        mmap: if True, the cached array is memory-mapped (read-only) instead of being read in memory
+    Return:
+        The array or None if the source file can't be decoded
+    """
+    if cache_file_path:
+        try:
+            if (os.stat(cache_file_path).st_mtime_ns >= os.stat(source_file_path).st_mtime_ns):
+                return np.load(cache_file_path, mmap_mode='r' if mmap else None)
+        except (OSError, ValueError):
+            pass
+
+    array_data = decode_func(source_file_path)
+    if cache_file_path and not (array_data is None):
+        try:
+            save_array_file(cache_file_path, array_data)
+        except OSError as ex:
+            print("Can't write cached array file: {} - {}".format(cache_file_path, ex))
+    return array_data
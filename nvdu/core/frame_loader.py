@@ -0,0 +1,150 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+import os
+from os import path
+import collections
+import concurrent.futures
+import multiprocessing
+import numpy as np
+import cv2
+
+from .json_backend import *
+from .image_io import *
+
+# NOTE: multiprocessing.shared_memory is only available from Python 3.8
+try:
+    from multiprocessing import shared_memory
+    from multiprocessing import resource_tracker
+except ImportError:
+    shared_memory = None
+
+# NOTE: On Windows a shared memory block is freed as soon as the worker process close it,
+# so the images are sent back as pickled arrays instead
+IS_SHARED_MEMORY_SUPPORTED = not (shared_memory is None) and (os.name != 'nt')
+
+DEFAULT_LOAD_CHUNK_SIZE = 16
+
+# =============================== Worker side ===============================
+def _share_image(image_data):
+    """Copy an image into a new shared memory block, return the descriptor used to get it back in the main process"""
+    image_shared_memory = shared_memory.SharedMemory(create=True, size=max(1, image_data.nbytes))
+    shared_image = np.ndarray(image_data.shape, dtype=image_data.dtype, buffer=image_shared_memory.buf)
+    shared_image[...] = image_data
+    del shared_image
+    # NOTE: Only close the block here, the main process unlink it after reading the image.
+    # The main process owns the block from now on so the worker must not track it
+    resource_tracker.unregister(image_shared_memory._name, 'shared_memory')
+    image_shared_memory.close()
+    return (image_shared_memory.name, image_data.shape, image_data.dtype.str)
+
+def load_frame_chunk(frame_requests, load_images=True, use_shared_memory=IS_SHARED_MEMORY_SUPPORTED, image_downscale=1):
+    """Load the annotation data and image of a list of frames, this function run in the worker processes
+    Args:
+        frame_requests: list of (frame_index, annotation_file_path, image_file_path, preview_image_file_path)
+            preview_image_file_path is the cached downscaled copy of the image (see read_preview_image), it can be None
+        image_downscale: decode the images at 1/image_downscale of their resolution
+    Return:
+        list of (frame_index, frame_json_data, image) - image is a numpy array, a shared memory descriptor or None
+    """
+    loaded_frames = []
+    for frame_index, annotation_file_path, image_file_path, preview_image_file_path in frame_requests:
+        frame_json_data = load_json_file(annotation_file_path)
+        image_data = None
+        if load_images and image_file_path and path.exists(image_file_path):
+            image_data = read_preview_image(image_file_path, image_downscale, preview_image_file_path)
+            if use_shared_memory and not (image_data is None):
+                image_data = _share_image(image_data)
+        loaded_frames.append((frame_index, frame_json_data, image_data))
+    return loaded_frames
+
+# =============================== Main process side ===============================
+def receive_image(image_data, use_shared_memory=IS_SHARED_MEMORY_SUPPORTED):
+    """Get back an image loaded by load_frame_chunk and free its shared memory block"""
+    if (image_data is None) or not use_shared_memory:
+        return image_data
+
+    shared_memory_name, image_shape, image_dtype = image_data
+    image_shared_memory = shared_memory.SharedMemory(name=shared_memory_name)
+    try:
+        shared_image = np.ndarray(image_shape, dtype=np.dtype(image_dtype), buffer=image_shared_memory.buf)
+        received_image = shared_image.copy()
+        del shared_image
+    finally:
+        image_shared_memory.close()
+        image_shared_memory.unlink()
+    return received_image
+
+def receive_frame_chunk(loaded_frames):
+    """Get back all the frames loaded by a load_frame_chunk task"""
+    # NOTE: Receive all the images first so none of them leak if the caller stop in the middle of the chunk
+    received_images = list(receive_image(image_data) for _, _, image_data in loaded_frames)
+    return list((frame_index, frame_json_data, received_image)
+                for (frame_index, frame_json_data, _), received_image in zip(loaded_frames, received_images))
+
+def discard_frame_chunk(loaded_frames):
+    """Free the shared images of a load_frame_chunk task whose frames will never be read"""
+    for _, _, image_data in loaded_frames:
+        receive_image(image_data)
+
+def map_chunks_in_processes(chunk_func, chunks, process_count=None, chunk_func_args=(), discard_result_func=None):
+    """Run chunk_func(chunk, *chunk_func_args) on each chunk in a process pool
+    NOTE: chunk_func must be a module level function so it can be sent to the worker processes
+    Args:
+        chunks: iterable of chunks, it's only consumed as fast as the results are read
+        process_count: number of worker processes, default is the number of cpu cores
+        discard_result_func: function(chunk_result) called on the results which are never read, e.g: when the caller stop early
+    Return:
+        Generator of the results of the chunks in the same order as the chunks
+    """
+    process_count = process_count if process_count else multiprocessing.cpu_count()
+    # NOTE: Limit the number of chunks in flight so the results don't pile up when the caller is slow
+    max_pending_chunk_count = 2 * process_count
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=process_count) as executor:
+        pending_chunks = collections.deque()
+        try:
+            for chunk in chunks:
+                pending_chunks.append(executor.submit(chunk_func, chunk, *chunk_func_args))
+                if (len(pending_chunks) >= max_pending_chunk_count):
+                    yield pending_chunks.popleft().result()
+
+            while pending_chunks:
+                yield pending_chunks.popleft().result()
+        finally:
+            for pending_chunk in pending_chunks:
+                if pending_chunk.cancel() or (discard_result_func is None):
+                    continue
+                try:
+                    discard_result_func(pending_chunk.result())
+                except Exception:
+                    pass
+
+def load_frames_in_processes(frame_requests, load_images=True, chunk_size=DEFAULT_LOAD_CHUNK_SIZE, process_count=None, image_downscale=1):
+    """Load frames in a process pool
+    Args:
+        frame_requests: iterable of (frame_index, annotation_file_path, image_file_path, preview_image_file_path)
+        chunk_size: number of frames loaded by each task
+        process_count: number of worker processes, default is the number of cpu cores
+        image_downscale: decode the images at 1/image_downscale of their resolution
+    Return:
+        Generator of (frame_index, frame_json_data, image) in the same order as frame_requests
+    """
+    chunk_size = max(1, chunk_size)
+
+    def get_chunks():
+        frame_chunk = []
+        for frame_request in frame_requests:
+            frame_chunk.append(frame_request)
+            if (len(frame_chunk) >= chunk_size):
+                yield frame_chunk
+                frame_chunk = []
+        if frame_chunk:
+            yield frame_chunk
+
+    # NOTE: The shared images of the chunks which will never be read are freed by discard_frame_chunk
+    for loaded_frames in map_chunks_in_processes(load_frame_chunk, get_chunks(), process_count,
+            (load_images, IS_SHARED_MEMORY_SUPPORTED, image_downscale), discard_frame_chunk):
+        for loaded_frame in receive_frame_chunk(loaded_frames):
+            yield loaded_frame
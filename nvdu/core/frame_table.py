@@ -0,0 +1,156 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+import re
+import numpy as np
+
+# Frame names which only contain digits, e.g: 000123
+_NUMBERED_NAME_PATTERN = re.compile(r'[0-9]+$')
+
+def is_numbered_frame_name(frame_name, number_width=0):
+    """Check if a frame name only contains digits (and has number_width digits if number_width > 0)"""
+    if (_NUMBERED_NAME_PATTERN.match(frame_name) is None):
+        return False
+    return (number_width <= 0) or (len(frame_name) == number_width)
+
+# ========================= GrowableArray =========================
+class GrowableArray(object):
+    """Numpy array which can be appended to, the storage grows geometrically"""
+    def __init__(self, dtype, item_shape = ()):
+        self._data = np.zeros((0,) + tuple(item_shape), dtype=dtype)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    @property
+    def values(self):
+        """View of the valid part of the array"""
+        return self._data[:self._count]
+
+    def reserve(self, capacity):
+        if (capacity <= len(self._data)):
+            return
+        new_capacity = max(capacity, 2 * len(self._data), 16)
+        new_data = np.zeros((new_capacity,) + self._data.shape[1:], dtype=self._data.dtype)
+        new_data[:self._count] = self._data[:self._count]
+        self._data = new_data
+
+    def extend(self, new_values):
+        new_values = np.asarray(new_values, dtype=self._data.dtype)
+        new_count = self._count + len(new_values)
+        self.reserve(new_count)
+        self._data[self._count:new_count] = new_values
+        self._count = new_count
+
+# ========================= FrameNameTable =========================
+class FrameNameTable(object):
+    """Compact table of sorted frame names
+    Numbered frame names with the same number of digits (e.g: NDDS's 000123) are stored as an integer array,
+    any other names are stored in one packed utf-8 buffer with an array of offsets.
+    Index => name is O(1) and name => index is O(log n) using binary search.
+    """
+    def __init__(self, frame_names = None):
+        # Numbered mode: each name is stored as its number
+        self._numbers = GrowableArray(np.int64)
+        self._number_width = 0
+        # Packed mode: all the names are concatenated in _name_bytes, name i is _name_bytes[offsets[i]:offsets[i + 1]]
+        self._name_bytes = None
+        self._name_offsets = None
+
+        if frame_names:
+            self.extend(frame_names)
+
+    def __len__(self):
+        return len(self._name_offsets) - 1 if self.is_packed else len(self._numbers)
+
+    def __getitem__(self, index):
+        frame_count = len(self)
+        if (index < 0):
+            index += frame_count
+        if (index < 0) or (index >= frame_count):
+            raise IndexError('FrameNameTable index out of range: {}'.format(index))
+
+        if self.is_packed:
+            name_offsets = self._name_offsets.values
+            return self._name_bytes[name_offsets[index]:name_offsets[index + 1]].decode('utf-8')
+        return str(self._numbers.values[index]).zfill(self._number_width)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def is_packed(self):
+        return not (self._name_bytes is None)
+
+    @property
+    def nbytes(self):
+        """Number of bytes used to store the names"""
+        if self.is_packed:
+            return len(self._name_bytes) + self._name_offsets.values.nbytes
+        return self._numbers.values.nbytes
+
+    def extend(self, new_frame_names):
+        """Add new frame names at the end of the table
+        NOTE: new_frame_names must be sorted and come after the last name in the table
+        """
+        new_frame_names = list(new_frame_names)
+        if not new_frame_names:
+            return
+
+        if not self.is_packed:
+            number_width = self._number_width if (len(self._numbers) > 0) else len(new_frame_names[0])
+            if all(is_numbered_frame_name(check_name, number_width) for check_name in new_frame_names):
+                self._number_width = number_width
+                self._numbers.extend(list(int(check_name) for check_name in new_frame_names))
+                return
+            self._convert_to_packed()
+
+        encoded_names = list(check_name.encode('utf-8') for check_name in new_frame_names)
+        name_offsets = np.cumsum([len(encoded_name) for encoded_name in encoded_names], dtype=np.int64)
+        self._name_offsets.extend(name_offsets + len(self._name_bytes))
+        self._name_bytes.extend(b''.join(encoded_names))
+
+    def _convert_to_packed(self):
+        existing_names = list(self)
+        self._name_bytes = bytearray()
+        self._name_offsets = GrowableArray(np.int64)
+        self._name_offsets.extend([0])
+        self._numbers = GrowableArray(np.int64)
+        self._number_width = 0
+        if existing_names:
+            self.extend(existing_names)
+
+    def find(self, frame_name):
+        """Get the index of a frame name, return -1 if the name is not in the table"""
+        if not self.is_packed:
+            if not is_numbered_frame_name(frame_name, self._number_width):
+                return -1
+            numbers = self._numbers.values
+            frame_number = int(frame_name)
+            found_index = int(np.searchsorted(numbers, frame_number))
+            return found_index if (found_index < len(numbers)) and (numbers[found_index] == frame_number) else -1
+
+        # NOTE: utf-8 bytes are ordered the same way as the unicode strings
+        encoded_name = frame_name.encode('utf-8')
+        name_offsets = self._name_offsets.values
+        min_index = 0
+        max_index = len(name_offsets) - 2
+        while (min_index <= max_index):
+            check_index = int((min_index + max_index) / 2)
+            check_name = bytes(self._name_bytes[name_offsets[check_index]:name_offsets[check_index + 1]])
+            if (check_name == encoded_name):
+                return check_index
+            if (check_name < encoded_name):
+                min_index = check_index + 1
+            else:
+                max_index = check_index - 1
+        return -1
+
+    def __contains__(self, frame_name):
+        return self.find(frame_name) >= 0
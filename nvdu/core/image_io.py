@@ -0,0 +1,60 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+import os
+from os import path
+import threading
+import cv2
+
+# OpenCV read flags to decode a color image at 1/N of its resolution
+IMAGE_DOWNSCALE_READ_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+SUPPORTED_IMAGE_DOWNSCALES = sorted(IMAGE_DOWNSCALE_READ_FLAGS.keys())
+
+def read_image(image_file_path, image_downscale = 1):
+    """Read a BGR image decoded at 1/image_downscale of its resolution (image_downscale: 1, 2, 4 or 8)
+    NOTE: Only JPEG images are decoded faster at a reduced resolution, OpenCV decode the PNG images at full resolution then resize them
+    """
+    if not (image_downscale in IMAGE_DOWNSCALE_READ_FLAGS):
+        raise Exception('Unsupported image downscale: {} - supported downscales: {}'.format(image_downscale, SUPPORTED_IMAGE_DOWNSCALES))
+    return cv2.imread(image_file_path, IMAGE_DOWNSCALE_READ_FLAGS[image_downscale])
+
+def read_preview_image(image_file_path, image_downscale = 1, preview_file_path = None):
+    """Read a BGR image at a reduced resolution using a cached downscaled copy of it
+    The copy is created the first time the image is read and recreated when the image is modified
+    Args:
+        preview_file_path: path of the downscaled copy, if not specified then the image is read without a copy
+    """
+    if (image_downscale == 1) or not preview_file_path:
+        return read_image(image_file_path, image_downscale)
+
+    try:
+        if (os.stat(preview_file_path).st_mtime_ns >= os.stat(image_file_path).st_mtime_ns):
+            preview_image = cv2.imread(preview_file_path, cv2.IMREAD_COLOR)
+            if not (preview_image is None):
+                return preview_image
+    except OSError:
+        pass
+
+    preview_image = read_image(image_file_path, image_downscale)
+    if not (preview_image is None):
+        preview_dir_path, preview_file_name = path.split(preview_file_path)
+        # NOTE: Write a temporary file then rename it so the other readers never see a partially written copy
+        temp_file_path = path.join(preview_dir_path, '.{}_{}_{}'.format(os.getpid(), threading.get_ident(), preview_file_name))
+        try:
+            os.makedirs(preview_dir_path, exist_ok=True)
+            if cv2.imwrite(temp_file_path, preview_image):
+                os.replace(temp_file_path, preview_file_path)
+        except (IOError, OSError, cv2.error) as ex:
+            # NOTE: The cached copy is optional (e.g: read-only dataset), the decoded image is still returned
+            print("Can't write preview image file: {} - {}".format(preview_file_path, ex))
+            try:
+                os.remove(temp_file_path)
+            except OSError:
+                pass
+    return preview_image
@@ -0,0 +1,341 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+import os
+from os import path
+import json
+import numpy as np
+
+from .json_backend import *
+from .frame_aspect import *
+from .frame_loader import *
+from .nvdu_data import *
+
+# =============================== Id maps ===============================
+# All the functions work on (H, W) maps of non-negative ids (e.g: the class ids decoded from a segmentation image),
+# the statistics of every id are computed in a few passes over the whole image instead of one pass per object
+
+def get_id_presences(id_data, id_count):
+    """Find which columns and rows of the image contain each id
+    Return:
+        (column_counts, row_presences): (id_count, W) number of pixels of each id in each column and (id_count, H) mask
+    """
+    id_data = np.asarray(id_data)
+    image_height, image_width = id_data.shape
+    flat_ids = id_data.astype(np.int64).ravel()
+    column_indexes = np.tile(np.arange(image_width, dtype=np.int64), image_height)
+    column_counts = np.bincount(flat_ids * image_width + column_indexes, minlength=id_count * image_width)
+    row_indexes = np.repeat(np.arange(image_height, dtype=np.int64), image_width)
+    row_counts = np.bincount(flat_ids * image_height + row_indexes, minlength=id_count * image_height)
+    column_counts = column_counts[:id_count * image_width].reshape(id_count, image_width)
+    row_presences = row_counts[:id_count * image_height].reshape(id_count, image_height) > 0
+    return column_counts, row_presences
+
+def get_id_areas_and_boxes(id_data, id_count):
+    """Get the pixel area and the tight box of each id of an id map
+    NOTE: The ids outside of [0, id_count) are ignored
+    Return:
+        (areas, boxes): (id_count,) pixel counts and (id_count, 4) [left, top, right, bottom] boxes in pixels,
+        right and bottom are exclusive (a one pixel mask has a 1x1 box), NaN for the ids which are not in the image
+    """
+    id_data = np.asarray(id_data)
+    is_in_range = (id_data >= 0) & (id_data < id_count)
+    if not is_in_range.all():
+        # NOTE: The ignored pixels are counted in an extra id
+        id_data = np.where(is_in_range, id_data, id_count)
+    column_counts, row_presences = get_id_presences(id_data, id_count + 1)
+    column_counts = column_counts[:id_count]
+    row_presences = row_presences[:id_count]
+    column_presences = column_counts > 0
+    areas = column_counts.sum(axis=1)
+
+    image_height, image_width = id_data.shape
+    boxes = np.empty((id_count, 4))
+    boxes[:, 0] = np.argmax(column_presences, axis=1)
+    boxes[:, 1] = np.argmax(row_presences, axis=1)
+    boxes[:, 2] = image_width - np.argmax(column_presences[:, ::-1], axis=1)
+    boxes[:, 3] = image_height - np.argmax(row_presences[:, ::-1], axis=1)
+    boxes[areas == 0] = np.nan
+    return areas, boxes
+
+def encode_id_rles(id_data, ids):
+    """Run-length encode the mask of each id of an id map
+    The encoding is the uncompressed COCO RLE: the pixels are read in column-major order and the counts alternate
+    between the runs outside and inside of the mask, starting with the pixels outside of it (the first count can be 0)
+    Return:
+        list of the RLE counts (list of int) of each id, in the same order as ids
+    """
+    flat_ids = np.asarray(id_data).ravel(order='F')
+    pixel_count = len(flat_ids)
+    if (pixel_count == 0):
+        return list([0] for _ in ids)
+
+    # Split the whole image into runs of same id once, then group the runs by id
+    run_starts = np.concatenate(([0], np.flatnonzero(flat_ids[1:] != flat_ids[:-1]) + 1))
+    run_ends = np.append(run_starts[1:], pixel_count)
+    run_ids = flat_ids[run_starts]
+    run_order = np.argsort(run_ids, kind='stable')
+    sorted_run_ids = run_ids[run_order]
+
+    id_rles = []
+    for check_id in ids:
+        first_run = np.searchsorted(sorted_run_ids, check_id, 'left')
+        last_run = np.searchsorted(sorted_run_ids, check_id, 'right')
+        id_runs = run_order[first_run:last_run]
+        if (len(id_runs) == 0):
+            id_rles.append([pixel_count])
+            continue
+        starts = run_starts[id_runs]
+        ends = run_ends[id_runs]
+        rle_counts = np.empty(2 * len(id_runs), dtype=np.int64)
+        rle_counts[0::2] = starts - np.concatenate(([0], ends[:-1]))
+        rle_counts[1::2] = ends - starts
+        rle_counts = rle_counts.tolist()
+        if (ends[-1] < pixel_count):
+            rle_counts.append(int(pixel_count - ends[-1]))
+        id_rles.append(rle_counts)
+    return id_rles
+
+def decode_rle(rle_counts, image_height, image_width):
+    """Decode the RLE counts of encode_id_rles back to a (H, W) bool mask"""
+    rle_counts = np.asarray(rle_counts, dtype=np.int64)
+    run_values = np.zeros(len(rle_counts), dtype=bool)
+    run_values[1::2] = True
+    return np.repeat(run_values, rle_counts).reshape(image_width, image_height).T
+
+# =============================== Frame masks ===============================
+def get_frame_instance_masks(class_id_data, object_class_ids, full_class_id_data=None, encode_rles=True):
+    """Get the mask statistics of the annotated objects of a frame from its segmentation id maps
+    Each object is matched to the pixels of its class id (see ExportedObjectSettings.class_color)
+    NOTE: The objects of a same class in a frame can't be told apart in the class segmentation, they share the same mask
+    Args:
+        class_id_data: (H, W) class ids of the segmentation with occlusion ('pls')
+        object_class_ids: class id of each object, the objects with an id <= 0 (background or unknown class) have no mask
+        full_class_id_data: optional (H, W) class ids of the segmentation without occlusion ('pls_no')
+    Return:
+        dict of the per object arrays: 'areas', 'boxes' ((N, 4) see get_id_areas_and_boxes), 'full_areas' (area without occlusion),
+        'visible_fractions' (areas / full_areas, NaN if unknown) and 'rles' (list of RLE counts or None)
+    """
+    object_class_ids = np.asarray(object_class_ids, dtype=np.int64).reshape(-1)
+    object_count = len(object_class_ids)
+    has_mask = object_class_ids > 0
+    id_count = int(object_class_ids.max()) + 1 if (object_count > 0) else 1
+    mask_ids = np.where(has_mask, object_class_ids, 0)
+
+    id_areas, id_boxes = get_id_areas_and_boxes(class_id_data, id_count)
+    areas = np.where(has_mask, id_areas[mask_ids], 0)
+    boxes = id_boxes[mask_ids]
+    boxes[~has_mask] = np.nan
+
+    full_areas = np.full(object_count, -1, dtype=np.int64)
+    visible_fractions = np.full(object_count, np.nan)
+    if not (full_class_id_data is None):
+        full_id_areas = np.bincount(np.asarray(full_class_id_data).ravel().clip(0, id_count), minlength=id_count + 1)[:id_count]
+        full_areas = np.where(has_mask, full_id_areas[mask_ids], 0)
+        is_visible_known = has_mask & (full_areas > 0)
+        # NOTE: The occluded area can't be bigger than the full area, the extra pixels come from anti-aliasing
+        visible_fractions[is_visible_known] = np.minimum(1.0, areas[is_visible_known] / full_areas[is_visible_known])
+
+    rles = [None] * object_count
+    if encode_rles and has_mask.any():
+        unique_mask_ids = np.unique(object_class_ids[has_mask])
+        unique_rles = encode_id_rles(class_id_data, unique_mask_ids)
+        for object_index in np.flatnonzero(has_mask):
+            rles[object_index] = unique_rles[np.searchsorted(unique_mask_ids, object_class_ids[object_index])]
+
+    return {
+        'areas': areas.astype(np.int64),
+        'boxes': boxes,
+        'full_areas': full_areas.astype(np.int64),
+        'visible_fractions': visible_fractions,
+        'rles': rles,
+    }
+
+# =============================== Dataset masks ===============================
+DEFAULT_MASK_CHUNK_SIZE = 32
+
+# Settings parsed by each worker process: object settings path => (DatasetSettings, SegmentationColorTable)
+_worker_mask_settings_cache = {}
+
+def _get_worker_mask_settings(object_settings_path):
+    if not (object_settings_path in _worker_mask_settings_cache):
+        dataset_settings = DatasetSettings.parse_from_file(object_settings_path)
+        color_table = dataset_settings.get_segmentation_color_table() if not (dataset_settings is None) else SegmentationColorTable([], [])
+        _worker_mask_settings_cache[object_settings_path] = (dataset_settings, color_table)
+    return _worker_mask_settings_cache[object_settings_path]
+
+def _read_class_ids(segmentation_file_path, color_table):
+    if not path.exists(segmentation_file_path):
+        return None
+    segmentation_data = read_segmentation_image(segmentation_file_path)
+    return color_table.get_class_ids(segmentation_data) if not (segmentation_data is None) else None
+
+def extract_mask_chunk(chunk, encode_rles=True):
+    """Extract the instance masks of the objects in a chunk of frames, this function run in the worker processes
+    Args:
+        chunk: (object_settings_path, [(frame_index, annotation_file_path, pls_file_path, pls_no_file_path), ...]),
+            all the frames of a chunk share the same settings
+    Return:
+        dict of the per object arrays: 'frame_indexes', 'object_indexes', 'class_names' (list), 'class_ids', 'image_sizes' ((N, 2) width, height)
+        and the arrays of get_frame_instance_masks. The objects of the frames without 'pls' image are not listed
+    """
+    object_settings_path, frame_requests = chunk
+    dataset_settings, color_table = _get_worker_mask_settings(object_settings_path)
+
+    frame_indexes = []
+    object_indexes = []
+    class_names = []
+    class_ids = []
+    image_sizes = []
+    frame_masks = []
+    for frame_index, annotation_file_path, pls_file_path, pls_no_file_path in frame_requests:
+        class_id_data = _read_class_ids(pls_file_path, color_table)
+        if (class_id_data is None):
+            continue
+        try:
+            frame_json_data = load_json_file(annotation_file_path)
+        except (OSError, ValueError) as ex:
+            print("Can't read annotation file: {} - {}".format(annotation_file_path, ex))
+            continue
+
+        frame_class_names = list(check_obj.get('class', '') for check_obj in frame_json_data.get('objects', []))
+        frame_class_ids = []
+        for class_name in frame_class_names:
+            class_settings = dataset_settings.get_object_settings(class_name) if not (dataset_settings is None) else None
+            frame_class_ids.append(class_settings.class_id if not (class_settings is None) else 0)
+
+        frame_indexes.extend([frame_index] * len(frame_class_names))
+        object_indexes.extend(range(len(frame_class_names)))
+        class_names.extend(frame_class_names)
+        class_ids.extend(frame_class_ids)
+        image_sizes.extend([(class_id_data.shape[1], class_id_data.shape[0])] * len(frame_class_names))
+        frame_masks.append(get_frame_instance_masks(class_id_data, frame_class_ids,
+            _read_class_ids(pls_no_file_path, color_table), encode_rles))
+
+    def concatenate_arrays(array_name, empty_shape, dtype):
+        arrays = list(frame_mask[array_name] for frame_mask in frame_masks)
+        return np.concatenate(arrays) if arrays else np.zeros(empty_shape, dtype=dtype)
+    return {
+        'frame_indexes': np.array(frame_indexes, dtype=np.int64),
+        'object_indexes': np.array(object_indexes, dtype=np.int32),
+        'class_names': class_names,
+        'class_ids': np.array(class_ids, dtype=np.int32),
+        'image_sizes': np.array(image_sizes, dtype=np.int32).reshape(-1, 2),
+        'areas': concatenate_arrays('areas', (0,), np.int64),
+        'boxes': concatenate_arrays('boxes', (0, 4), np.float64),
+        'full_areas': concatenate_arrays('full_areas', (0,), np.int64),
+        'visible_fractions': concatenate_arrays('visible_fractions', (0,), np.float64),
+        'rles': list(rle for frame_mask in frame_masks for rle in frame_mask['rles']),
+    }
+
+def get_mask_chunks(dataset, frame_indexes, chunk_size=DEFAULT_MASK_CHUNK_SIZE, object_settings_path=None):
+    """Split the frames into the chunks sent to extract_mask_chunk, the frames of a chunk are in the same subset
+    object_settings_path: override the object settings files of the dataset's subsets
+    """
+    chunk_size = max(1, chunk_size)
+    frame_requests = []
+    chunk_settings_path = None
+    for frame_index in frame_indexes:
+        frame_subset = dataset.get_subset_of_frame(frame_index)
+        if (frame_subset is None):
+            continue
+        frame_settings_path = object_settings_path if object_settings_path else frame_subset.object_setting_file_path
+        if frame_requests and ((frame_settings_path != chunk_settings_path) or (len(frame_requests) >= chunk_size)):
+            yield (chunk_settings_path, frame_requests)
+            frame_requests = []
+        chunk_settings_path = frame_settings_path
+        frame_name = dataset.get_frame_name_from_index(frame_index)
+        frame_requests.append((frame_index, dataset.get_annotation_file_path_of_frame(frame_name),
+            dataset.get_aspect_image_file_path_of_frame(frame_name, 'pls'),
+            dataset.get_aspect_image_file_path_of_frame(frame_name, 'pls_no')))
+    if frame_requests:
+        yield (chunk_settings_path, frame_requests)
+
+def extract_dataset_instance_masks(dataset, frame_indexes=None, chunk_size=DEFAULT_MASK_CHUNK_SIZE, process_count=None,
+        object_settings_path=None, encode_rles=True):
+    """Extract the instance masks of all the objects in a dataset using a process pool
+    Return:
+        InstanceMaskSet
+    """
+    if not dataset.is_scanned:
+        dataset.scan()
+    if (frame_indexes is None):
+        frame_indexes = range(dataset.frame_count)
+
+    chunks = get_mask_chunks(dataset, frame_indexes, chunk_size, object_settings_path)
+    chunk_results = list(map_chunks_in_processes(extract_mask_chunk, chunks, process_count, (encode_rles,)))
+    return InstanceMaskSet(chunk_results, dataset.get_frame_name_from_index)
+
+# =============================== InstanceMaskSet ===============================
+class InstanceMaskSet(object):
+    """Instance masks of all the extracted objects"""
+    def __init__(self, chunk_results, get_frame_name_func=None):
+        """
+        Args:
+            chunk_results: list of the results of extract_mask_chunk
+            get_frame_name_func: function(frame_index) => frame name, used in the saved file
+        """
+        self._get_frame_name = get_frame_name_func if not (get_frame_name_func is None) else str
+
+        def concatenate_arrays(array_name, empty_shape, dtype):
+            arrays = list(chunk_result[array_name] for chunk_result in chunk_results)
+            return np.concatenate(arrays) if arrays else np.zeros(empty_shape, dtype=dtype)
+        self.frame_indexes = concatenate_arrays('frame_indexes', (0,), np.int64)
+        self.object_indexes = concatenate_arrays('object_indexes', (0,), np.int32)
+        self.class_ids = concatenate_arrays('class_ids', (0,), np.int32)
+        self.image_sizes = concatenate_arrays('image_sizes', (0, 2), np.int32)
+        self.areas = concatenate_arrays('areas', (0,), np.int64)
+        self.boxes = concatenate_arrays('boxes', (0, 4), np.float64)
+        self.full_areas = concatenate_arrays('full_areas', (0,), np.int64)
+        self.visible_fractions = concatenate_arrays('visible_fractions', (0,), np.float64)
+        self.class_names = list(class_name for chunk_result in chunk_results for class_name in chunk_result['class_names'])
+        self.rles = list(rle for chunk_result in chunk_results for rle in chunk_result['rles'])
+
+    @property
+    def object_count(self):
+        return len(self.frame_indexes)
+
+    def get_summary(self):
+        visible_fractions = self.visible_fractions[~np.isnan(self.visible_fractions)]
+        summary = {
+            'frame_count': int(len(np.unique(self.frame_indexes))),
+            'object_count': int(self.object_count),
+            'visible_object_count': int(np.count_nonzero(self.areas > 0)),
+        }
+        if (len(visible_fractions) > 0):
+            summary['mean_visible_fraction'] = float(np.mean(visible_fractions))
+        return summary
+
+    def get_object_data(self, object_id):
+        """Get the json data of one extracted object"""
+        def get_optional_value(value):
+            return None if np.isnan(value) else float(value)
+        image_width, image_height = self.image_sizes[object_id]
+        box = self.boxes[object_id]
+        return {
+            'frame': self._get_frame_name(int(self.frame_indexes[object_id])),
+            'object_index': int(self.object_indexes[object_id]),
+            'class': self.class_names[object_id],
+            'class_id': int(self.class_ids[object_id]),
+            'area': int(self.areas[object_id]),
+            'full_area': int(self.full_areas[object_id]) if (self.full_areas[object_id] >= 0) else None,
+            'visible_fraction': get_optional_value(self.visible_fractions[object_id]),
+            'bounding_box': None if np.isnan(box).any() else {
+                'top_left': [int(box[1]), int(box[0])],
+                'bottom_right': [int(box[3]), int(box[2])]},
+            'segmentation': None if (self.rles[object_id] is None) else {
+                'size': [int(image_height), int(image_width)],
+                'counts': self.rles[object_id]},
+        }
+
+    def save(self, output_dir_path, file_name='instance_masks.json'):
+        """Save the summary and the masks of all the objects in a json file
+        NOTE: The boxes use the same layout as the NDDS annotations: (y, x) corners
+        """
+        os.makedirs(output_dir_path, exist_ok=True)
+        summary = self.get_summary()
+        with open(path.join(output_dir_path, file_name), 'w') as mask_file:
+            json.dump({'summary': summary, 'objects': list(self.get_object_data(object_id) for object_id in range(self.object_count))},
+                mask_file)
+        return summary
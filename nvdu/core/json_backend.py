@@ -0,0 +1,57 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+import json
+
+# =============================== JSON backend ===============================
+# The annotation files are parsed using the fastest json module installed: orjson, ujson or the standard json module
+def _stdlib_json_loads(json_bytes):
+    return json.loads(json_bytes.decode('utf-8'))
+
+_json_loaders = {
+    'json': _stdlib_json_loads,
+}
+
+try:
+    import orjson
+    _json_loaders['orjson'] = orjson.loads
+except ImportError:
+    pass
+
+try:
+    import ujson
+    _json_loaders['ujson'] = ujson.loads
+except ImportError:
+    pass
+
+_json_backend_name = 'json'
+_json_loads = _stdlib_json_loads
+
+def get_available_json_backends():
+    return sorted(_json_loaders.keys())
+
+def get_json_backend():
+    return _json_backend_name
+
+def set_json_backend(backend_name):
+    """Select the module used to parse json: 'orjson', 'ujson' or 'json'"""
+    global _json_backend_name, _json_loads
+    if not (backend_name in _json_loaders):
+        raise Exception('JSON backend is not available: {} - available backends: {}'.format(
+            backend_name, get_available_json_backends()))
+    _json_backend_name = backend_name
+    _json_loads = _json_loaders[backend_name]
+
+for _backend_name in ['orjson', 'ujson']:
+    if (_backend_name in _json_loaders):
+        set_json_backend(_backend_name)
+        break
+
+def load_json_bytes(json_bytes):
+    return _json_loads(json_bytes)
+
+def load_json_file(json_file_path):
+    """Parse a json file using the selected json backend"""
+    with open(json_file_path, 'rb') as json_file:
+        return _json_loads(json_file.read())
@@ -0,0 +1,81 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+import collections
+
+# ========================= LRUCache =========================
+class LRUCache(object):
+    """Least recently used cache bounded by the total size (in bytes) of its values
+    The most recently used value is never evicted, even if it's bigger than the budget.
+    NOTE: This cache is not thread safe
+    """
+    def __init__(self, max_bytes, get_value_size_func = None, on_evict_func = None):
+        """
+        Args:
+            max_bytes: the byte budget of the cache
+            get_value_size_func: function(value) => size of the value in bytes, used when put() doesn't get the size
+            on_evict_func: function(key, value) called when a value is removed from the cache, e.g: to free its resources
+        """
+        self.max_bytes = max_bytes
+        self._get_value_size = get_value_size_func
+        self._on_evict = on_evict_func
+        # Key => (value, size in bytes), the least recently used key is first
+        self._entries = collections.OrderedDict()
+        self._total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def get(self, key, default_value = None):
+        """Get a value and mark it as the most recently used, return default_value if the key is not cached"""
+        if not (key in self._entries):
+            return default_value
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def put(self, key, value, value_size = None):
+        if (value_size is None):
+            value_size = self._get_value_size(value) if not (self._get_value_size is None) else 0
+
+        if (key in self._entries):
+            old_value, old_value_size = self._entries.pop(key)
+            self._total_bytes -= old_value_size
+            if not (old_value is value):
+                self._evict(key, old_value)
+
+        self._entries[key] = (value, value_size)
+        self._total_bytes += value_size
+        self.trim(self.max_bytes)
+
+    def pop(self, key, default_value = None):
+        """Remove a value from the cache without evicting it"""
+        if not (key in self._entries):
+            return default_value
+        value, value_size = self._entries.pop(key)
+        self._total_bytes -= value_size
+        return value
+
+    def trim(self, max_bytes):
+        """Evict the least recently used values until the cache fit in max_bytes"""
+        while (self._total_bytes > max_bytes) and (len(self._entries) > 1):
+            evicted_key, (evicted_value, evicted_value_size) = self._entries.popitem(last=False)
+            self._total_bytes -= evicted_value_size
+            self._evict(evicted_key, evicted_value)
+
+    def clear(self):
+        while self._entries:
+            evicted_key, (evicted_value, evicted_value_size) = self._entries.popitem(last=False)
+            self._evict(evicted_key, evicted_value)
+        self._total_bytes = 0
+
+    def _evict(self, key, value):
+        if not (self._on_evict is None):
+            self._on_evict(key, value)
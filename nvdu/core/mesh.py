@@ -2,18 +2,42 @@
 # This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International 
 # License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
 
+import numpy as np
+
 from .scene_object import *
 
+# Vertices of the loaded meshes: file path => read-only (V, 3) array
+_mesh_vertices_cache = {}
+
+def load_mesh_vertices(mesh_file_path):
+    """Load the vertices of a wavefront (.obj) mesh as a read-only (V, 3) array, the result is cached
+    NOTE: Only the vertex positions are parsed, e.g: to compute the 2d box of the mesh, use the viz module to draw meshes
+    """
+    if not (mesh_file_path in _mesh_vertices_cache):
+        with open(mesh_file_path, 'r') as mesh_file:
+            mesh_vertices = np.array(list(line.split()[1:4] for line in mesh_file if line.startswith('v ')), dtype=np.float64)
+        mesh_vertices = mesh_vertices.reshape(-1, 3)
+        mesh_vertices.setflags(write=False)
+        _mesh_vertices_cache[mesh_file_path] = mesh_vertices
+    return _mesh_vertices_cache[mesh_file_path]
+
 # ========================= Cuboid2d =========================
 class Mesh(SceneObject):
     """Container for a 3d model"""
+    __slots__ = ['source_file_path']
+
     def __init__(self, mesh_file_path=None, in_parent_object = None):
         super(Mesh, self).__init__(in_parent_object)
 
         self.source_file_path = mesh_file_path
 
     def set_initial_matrix(self, new_initial_matrix):
-        self._relative_transform.set_initial_matrix(new_initial_matrix)
+        self.get_relative_transform().set_initial_matrix(new_initial_matrix)
+
+    def get_vertices(self):
+        return load_mesh_vertices(self.source_file_path)
 
     def get_initial_matrix(self):
+        if (self._relative_transform is None):
+            return Matrix44.identity()
         return self._relative_transform.initial_matrix
@@ -3,12 +3,19 @@
 # License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
 
 import future
+import os
 from os import listdir, path
 from ctypes import *
 import json
 # from typing import List, Dict, Tuple
 import fnmatch
 import glob
+import hashlib
+import bisect
+import heapq
+import re
+import concurrent.futures
+import collections.abc
 
 import numpy as np
 import cv2
@@ -22,6 +29,12 @@ from .cuboid import *
 from .pivot_axis import *
 from .mesh import *
 from .camera import *
+from .box import *
+from .frame_table import *
+from .json_backend import *
+from .frame_loader import *
+from .image_io import *
+from .frame_aspect import *
 
 FrameDataExt = ".json"
 FrameImageExt = ".png"
@@ -80,6 +93,12 @@ def get_dataset_setting_file_path(data_dir_path):
 def get_dataset_object_setting_file_path(data_dir_path):
     return path.join(data_dir_path, '_object_settings.json')
 
+def get_dataset_output_dir_path(data_dir_path, output_postfix):
+    """Default output directory of a tool, next to the dataset directory, e.g: <data_dir>_reprojection_report
+    NOTE: Writing inside the dataset directory would change its mtime and invalidate its cached frame index
+    """
+    return path.normpath(path.abspath(data_dir_path)) + output_postfix
+
 def get_frame_data_path(data_dir_path, frame_index, frame_name_format=DEFAULT_FRAME_NAME_FORMAT):
     frame_data_file_name = get_frame_name(frame_index, frame_name_format) + FrameDataExt
     frame_data_file_path = path.join(data_dir_path, frame_data_file_name)
@@ -92,37 +111,246 @@ def get_frame_image_path(data_dir_path, frame_index, frame_name_format=DEFAULT_F
     frame_aspect_image_file = path.join(data_dir_path, frame_name) + aspect_ext + FrameImageExt
     return frame_aspect_image_file
 
+# NOTE: Frames may be missing in a dataset, a frame index is considered past the last frame
+# only when none of the DEFAULT_MAX_FRAME_GAP frames starting from it exist. Bigger gaps need NVDUDataset.scan()
+DEFAULT_MAX_FRAME_GAP = 8
+# Memoized results of get_number_of_frames: (data_dir_path, frame_name_format, max_frame_gap) => (dir_mtime, number_of_frame)
+_number_of_frames_cache = {}
+
+def find_frame_near(data_dir_path, frame_index, max_frame_gap=DEFAULT_MAX_FRAME_GAP, frame_name_format=DEFAULT_FRAME_NAME_FORMAT):
+    """Find the first existing frame in [frame_index, frame_index + max_frame_gap], return None if there is none"""
+    for check_index in range(frame_index, frame_index + max_frame_gap + 1):
+        if is_frame_exists(data_dir_path, check_index, frame_name_format):
+            return check_index
+    return None
+
 # Get the total number of frames in a data set
 # data_dir_path: path to the dataset's directory
-def get_number_of_frames(data_dir_path, frame_name_format=DEFAULT_FRAME_NAME_FORMAT):
-    number_of_frame = 0
-    min_index = 1
-    # NOTE: We only count till 1000000 frames for now
-    max_index = 1000000
-    while (min_index <= max_index):
-        check_index = int((min_index + max_index) / 2)
-        frame_exists = is_frame_exists(data_dir_path, check_index, frame_name_format)
-        if frame_exists:
-            # NOTE: The frame start from 0 => the number of frame will be the last index + 1
-            number_of_frame = check_index + 1
-            min_index = check_index + 1
-        else:
-            max_index = check_index - 1
-
+# NOTE: The frame start from 0 => the number of frame will be the last index + 1
+def get_number_of_frames(data_dir_path, frame_name_format=DEFAULT_FRAME_NAME_FORMAT, max_frame_gap=DEFAULT_MAX_FRAME_GAP, use_cache=True):
+    if not path.isdir(data_dir_path):
+        return 0
+
+    cache_key = (path.abspath(data_dir_path), frame_name_format, max_frame_gap)
+    dir_mtime = os.stat(data_dir_path).st_mtime_ns
+    if use_cache and (cache_key in _number_of_frames_cache):
+        cached_dir_mtime, cached_number_of_frame = _number_of_frames_cache[cache_key]
+        if (cached_dir_mtime == dir_mtime):
+            return cached_number_of_frame
+
+    last_frame_index = find_frame_near(data_dir_path, 0, max_frame_gap, frame_name_format)
+    if (last_frame_index is None):
+        number_of_frame = 0
+    else:
+        while True:
+            # Probe exponentially bigger indexes until we go past the last frame, there is no upper limit
+            past_last_index = max(1, last_frame_index * 2)
+            while is_frame_exists(data_dir_path, past_last_index, frame_name_format):
+                last_frame_index = past_last_index
+                past_last_index *= 2
+
+            # Binary search the last frame between the last found frame and the first missing index
+            while (past_last_index - last_frame_index > 1):
+                middle_index = int((last_frame_index + past_last_index) / 2)
+                if is_frame_exists(data_dir_path, middle_index, frame_name_format):
+                    last_frame_index = middle_index
+                else:
+                    past_last_index = middle_index
+
+            # NOTE: The gaps are only looked for after the last frame found by the search, one probe per step costs
+            # a single file system call. If the search stopped at a gap, keep searching from the frame after it
+            found_index = find_frame_near(data_dir_path, last_frame_index + 2, max_frame_gap - 1, frame_name_format)
+            if (found_index is None):
+                break
+            last_frame_index = found_index
+
+        number_of_frame = last_frame_index + 1
+
+    _number_of_frames_cache[cache_key] = (dir_mtime, number_of_frame)
     return number_of_frame
 
+class NVDUDatasetSubset(object):
+    """A directory inside a dataset which have its own object and camera settings"""
+    def __init__(self, dataset_dir, relative_dir = '', frame_start = 0):
+        self.dataset_dir = dataset_dir
+        # Path of the subset's directory relative to the dataset's directory
+        self.relative_dir = relative_dir
+        # The subset's frames are [frame_start, frame_start + frame_count) in the dataset
+        self.frame_start = frame_start
+        # Names of the subset's frames, relative to the subset's directory
+        self.frame_names = FrameNameTable()
+        # The image file name of each frame is its name followed by one of the image postfixes (e.g: '.png')
+        self._image_postfixes = []
+        self._frame_image_postfix_ids = GrowableArray(np.uint16)
+
+        self._dataset_settings = {}
+        self._camera_intrinsic_settings = None
+
+    def __str__(self):
+        return "({} - frames: {} - {})".format(self.relative_dir, self.frame_start, self.frame_count)
+
+    @property
+    def frame_count(self):
+        return len(self.frame_names)
+
+    def add_frames(self, new_frames):
+        """Add new frames at the end of the subset
+        Args:
+            new_frames: sorted list of (frame_name, image_file_name), both relative to the dataset's directory
+        """
+        frame_names = []
+        image_postfix_ids = []
+        for frame_name, image_file_name in new_frames:
+            image_postfix = image_file_name[len(frame_name):]
+            try:
+                image_postfix_id = self._image_postfixes.index(image_postfix)
+            except ValueError:
+                image_postfix_id = len(self._image_postfixes)
+                self._image_postfixes.append(image_postfix)
+            frame_names.append(path.basename(frame_name) if self.relative_dir else frame_name)
+            image_postfix_ids.append(image_postfix_id)
+
+        self.frame_names.extend(frame_names)
+        self._frame_image_postfix_ids.extend(image_postfix_ids)
+
+    def merge_frames(self, new_frames):
+        """Add new frames to the subset, keeping its frames sorted by name
+        Args:
+            new_frames: sorted list of (frame_name, image_file_name) which are not in the subset yet, see add_frames
+        """
+        if not new_frames:
+            return
+        if (self.frame_count == 0) or (new_frames[0][0] > self.get_frame_name(self.frame_count - 1)):
+            self.add_frames(new_frames)
+            return
+
+        # NOTE: Some new frames go between the existing ones (e.g: frames written after a gap in the numbers),
+        # the frame table is rebuilt since it only support adding names at its end
+        existing_frames = list((self.get_frame_name(frame_index), self.get_image_file_name(frame_index))
+            for frame_index in range(self.frame_count))
+        self.frame_names = FrameNameTable()
+        self._image_postfixes = []
+        self._frame_image_postfix_ids = GrowableArray(np.uint16)
+        self.add_frames(heapq.merge(existing_frames, new_frames))
+
+    @property
+    def image_postfixes(self):
+        """The different image postfixes of the subset's frames, e.g: ['.png']"""
+        return self._image_postfixes
+
+    def get_frame_name(self, subset_frame_index):
+        """Get the name (relative to the dataset's directory) of a frame using its index in the subset"""
+        frame_name = self.frame_names[subset_frame_index]
+        return path.join(self.relative_dir, frame_name) if self.relative_dir else frame_name
+
+    def get_image_file_name(self, subset_frame_index):
+        """Get the image file path (relative to the dataset's directory) of a frame using its index in the subset"""
+        image_postfix = self._image_postfixes[self._frame_image_postfix_ids[subset_frame_index]]
+        return self.get_frame_name(subset_frame_index) + image_postfix
+
+    def find_frame(self, frame_name):
+        """Get the index in the subset of a frame using its name relative to the subset's directory, -1 if not found"""
+        return self.frame_names.find(frame_name)
+
+    @property
+    def dir_path(self):
+        return path.join(self.dataset_dir, self.relative_dir) if self.relative_dir else self.dataset_dir
+
+    @property
+    def camera_setting_file_path(self):
+        return NVDUDataset.get_default_camera_setting_file_path(self.dir_path)
+
+    @property
+    def object_setting_file_path(self):
+        return NVDUDataset.get_default_object_setting_file_path(self.dir_path)
+
+    def load_dataset_settings(self, mesh_dir_path=''):
+        """Parse the subset's object settings (and its exporter settings from the camera settings), the result is cached"""
+        if not (mesh_dir_path in self._dataset_settings):
+            dataset_settings = DatasetSettings.parse_from_file(self.object_setting_file_path, mesh_dir_path)
+            if not (dataset_settings is None) and path.exists(self.camera_setting_file_path):
+                dataset_settings.exporter_settings = ExporterSettings.parse_from_json_data(load_json_file(self.camera_setting_file_path))
+            self._dataset_settings[mesh_dir_path] = dataset_settings
+        return self._dataset_settings[mesh_dir_path]
+
+    def load_camera_intrinsic_settings(self):
+        if (self._camera_intrinsic_settings is None):
+            self._camera_intrinsic_settings = CameraIntrinsicSettings.from_json_file(self.camera_setting_file_path)
+        return self._camera_intrinsic_settings
+
+class _DatasetFrameNames(collections.abc.Sequence):
+    """Read only sequence of all the frame names in a dataset, the names are stored in the subsets' frame tables"""
+    def __init__(self, dataset):
+        self._dataset = dataset
+
+    def __len__(self):
+        return self._dataset.frame_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self[check_index] for check_index in range(*index.indices(len(self))))
+        if (index < 0):
+            index += len(self)
+        if (index < 0) or (index >= len(self)):
+            raise IndexError('Frame index out of range: {}'.format(index))
+        return self._dataset.get_frame_name_from_index(index)
+
+    def index(self, frame_name, *args):
+        frame_index = self._dataset.get_frame_index_from_name(frame_name)
+        if (frame_index < 0):
+            raise ValueError('{} is not in the dataset'.format(frame_name))
+        return frame_index
+
+    def __contains__(self, frame_name):
+        return self._dataset.get_frame_index_from_name(frame_name) >= 0
+
 class NVDUDataset(object):
     DEFAULT_IMAGE_NAME_FILTERS = ["*.png"]
+    CAMERA_SETTING_FILE_NAME = "_camera_settings.json"
+    OBJECT_SETTING_FILE_NAME = "_object_settings.json"
+    # Name of the cached frame index file written next to the dataset
+    FRAME_INDEX_FILE_NAME = "_frame_index.json"
+    FRAME_INDEX_VERSION = 2
+    # Postfix of the directory where the downscaled copies of the images are cached, see read_preview_image
+    PREVIEW_CACHE_DIR_NAME = "_preview_cache"
+    # Postfix of the directory where the arrays decoded from the depth and segmentation images are cached as .npy files
+    ARRAY_CACHE_DIR_NAME = "_array_cache"
+    # NOTE: Scanning is mostly waiting on the file system so we can use more threads than cores
+    DEFAULT_SCAN_THREAD_COUNT = 16
     
     def __init__(self, in_dataset_dir, 
             in_annotation_dir = None,
-            in_img_name_filters = None):
+            in_img_name_filters = None,
+            in_index_cache_dir = None,
+            in_recursive = False,
+            in_scan_thread_count = DEFAULT_SCAN_THREAD_COUNT,
+            in_preview_cache_dir = None):
         self._dataset_dir = in_dataset_dir
         self._annotation_dr = in_annotation_dir if (not in_annotation_dir is None) else self._dataset_dir
         self._img_name_filters = in_img_name_filters if (not in_img_name_filters is None) else NVDUDataset.DEFAULT_IMAGE_NAME_FILTERS
+        # Directory to store the frame index, if not specified then the index is written in the dataset directory
+        self._index_cache_dir = in_index_cache_dir
+        # If True, scan all the sub-directories which have both the object and camera settings files
+        self._recursive = in_recursive
+        self._scan_thread_count = in_scan_thread_count
+        # Directory to store the downscaled copies of the images, if not specified then they are stored next to the frame index
+        # or next to the dataset directory
+        self._preview_cache_dir = in_preview_cache_dir
         
-        self._frame_names = []
+        self._frame_names = _DatasetFrameNames(self)
+        # Image file path (relative to the dataset directory) of the frames which are not found by scan()
+        self._extra_image_file_names = {}
         self._frame_count = 0
+        self._subsets = []
+        self._subset_frame_starts = []
+        # Map from each subset's relative directory to the subset
+        self._subset_of_dir = {}
+        # Modified time of the scanned directories, used to find out which directories changed since the last scan
+        self._dir_mtimes = {}
+        self._annotation_dir_mtimes = {}
+        # Map from each subset's relative directory to its (dir_mtime, annotation_dir_mtime) when it was last listed
+        self._listed_subset_mtimes = {}
+        self._is_scanned = False
 
     @property
     def frame_names(self):
@@ -132,6 +360,18 @@ class NVDUDataset(object):
     def frame_count(self):
         return self._frame_count
 
+    @property
+    def subsets(self):
+        return self._subsets
+
+    @property
+    def is_recursive(self):
+        return self._recursive
+
+    @property
+    def is_scanned(self):
+        return self._is_scanned
+
     @property
     def camera_setting_file_path(self):
         return NVDUDataset.get_camera_setting_file_path(self._dataset_dir)
@@ -139,46 +379,535 @@ class NVDUDataset(object):
     @property
     def object_setting_file_path(self):
         return NVDUDataset.get_object_setting_file_path(self._dataset_dir)
+
+    @property
+    def frame_index_file_path(self):
+        if not self._index_cache_dir:
+            return path.join(self._dataset_dir, NVDUDataset.FRAME_INDEX_FILE_NAME)
+        index_file_name = self._get_dataset_cache_key() + '.json'
+        return path.join(self._index_cache_dir, index_file_name)
+
+    @property
+    def preview_cache_dir(self):
+        if self._preview_cache_dir:
+            return self._preview_cache_dir
+        if self._index_cache_dir:
+            return path.join(self._index_cache_dir, self._get_dataset_cache_key() + NVDUDataset.PREVIEW_CACHE_DIR_NAME)
+        # NOTE: Creating the cache inside the dataset directory would change its mtime and invalidate the frame index
+        return get_dataset_output_dir_path(self._dataset_dir, NVDUDataset.PREVIEW_CACHE_DIR_NAME)
+
+    @property
+    def array_cache_dir(self):
+        if self._index_cache_dir:
+            return path.join(self._index_cache_dir, self._get_dataset_cache_key() + NVDUDataset.ARRAY_CACHE_DIR_NAME)
+        # NOTE: Same as the preview cache, it's kept out of the dataset directory so it doesn't invalidate the frame index
+        return get_dataset_output_dir_path(self._dataset_dir, NVDUDataset.ARRAY_CACHE_DIR_NAME)
+
+    def _get_dataset_cache_key(self):
+        # NOTE: Many datasets can share the same cache directory => name the cached files using the dataset's paths
+        dataset_key = "{}|{}".format(path.abspath(self._dataset_dir), path.abspath(self._annotation_dr))
+        return hashlib.md5(dataset_key.encode('utf-8')).hexdigest()
     
-    # Scane the dataset and return how many frames are in it
-    def scan(self):
-        self._frame_names = []
+    # Scan the dataset and return how many frames are in it
+    # use_index: if True, reuse the cached frame index when the dataset directories didn't change since it was written
+    # rebuild_index: if True, ignore the existing frame index and build a new one
+    def scan(self, use_index=True, rebuild_index=False):
+        self._extra_image_file_names = {}
+        self._frame_count = 0
+        self._subsets = []
+        self._subset_frame_starts = []
+        self._subset_of_dir = {}
+        self._dir_mtimes = {}
+        self._annotation_dir_mtimes = {}
+        self._listed_subset_mtimes = {}
+        self._is_scanned = True
         if not path.exists(self._dataset_dir):
             return 0
-        
-        print("scan - _dataset_dir: {} - _img_name_filters: {}".format(self._dataset_dir, self._img_name_filters))
-        for file_name in listdir(self._dataset_dir):
-            check_file_path = path.join(self._dataset_dir, file_name)
-            if path.isfile(check_file_path):
-                is_name_match_filters = any(fnmatch.fnmatch(file_name, check_filter) for check_filter in self._img_name_filters)
-                # is_name_match_filters = False
-                # for check_filter in self._img_name_filters:
-                #     if fnmatch.fnmatch(file_name, check_filter):
-                #         is_name_match_filters = True
-                #         print("check_filter: {} - file_name: {} - is good".format(check_filter, file_name))
-                #         break
-                        
-                if (is_name_match_filters):
-                    # NOTE: Consider frame name as the file name without its extension
-                    frame_name = path.splitext(file_name)[0]
-                    # NOTE: Consider frame name as the first part of the string before the '.'
-                    # frame_name = file_name.split(".")[0]
-                    # Check if it have annotation data or not
-                    check_annotation_file_path = self.get_annotation_file_path_of_frame(frame_name)
-                    # print("file_name: {} - check_file_path: {} - frame_name: {} - check_annotation_file_path: {}".format(file_name, check_file_path, frame_name, check_annotation_file_path))
-                    if path.exists(check_annotation_file_path):
-                        self._frame_names.append(frame_name)
-        
-        self._frame_names = sorted(self._frame_names)
-        self._frame_count = len(self._frame_names)
-        # print("_frame_names: {}".format(self._frame_names))
+
+        print("scan - _dataset_dir: {} - _img_name_filters: {} - recursive: {}".format(
+            self._dataset_dir, self._img_name_filters, self._recursive))
+        scan_result = None
+        if use_index and not rebuild_index:
+            scan_result = self._load_frame_index()
+
+        if scan_result is None:
+            if use_index:
+                # NOTE: Create the index file before checking the directories' modified time
+                # so creating it doesn't invalidate the index we are about to write
+                self._create_frame_index_file()
+            scan_result = self._scan_dataset_dirs()
+            if use_index:
+                self._save_frame_index(*scan_result)
+
+        dir_mtimes, annotation_dir_mtimes, subset_entries = scan_result
+        self._dir_mtimes = dir_mtimes
+        self._annotation_dir_mtimes = annotation_dir_mtimes
+        for subset_dir, subset_frame_entries in subset_entries:
+            new_subset = NVDUDatasetSubset(self._dataset_dir, subset_dir, self._frame_count)
+            new_subset.add_frames((entry[0], entry[1]) for entry in subset_frame_entries)
+            self._subsets.append(new_subset)
+            self._subset_of_dir[subset_dir] = new_subset
+            self._listed_subset_mtimes[subset_dir] = self._get_saved_subset_mtimes(new_subset)
+            self._frame_count += new_subset.frame_count
+        self._subset_frame_starts = list(subset.frame_start for subset in self._subsets)
+
         return self._frame_count
 
+    def scan_new_frames(self, list_changed_dirs=False):
+        """Find the frames added to the scanned subsets since the last scan, without scanning the existing frames again
+        The subsets whose directories didn't change are skipped. For numbered frame names (e.g: 000123),
+        only the names following the last seen frame are checked, so the frames written after a gap in the numbers
+        are found by the next listing of the directory. The subsets whose frame names are not numbered are listed.
+        NOTE: The new frames are not written to the frame index, and new subsets are only found by scan()
+        Args:
+            list_changed_dirs: if True, also list the directories which changed since they were last listed.
+                Listing a big directory is slow, so this should be done much less often than looking for the next frames
+        Return:
+            Number of new frames
+        """
+        if not self._is_scanned:
+            return self.scan()
+
+        new_frame_count = 0
+        for subset in self._subsets:
+            subset_mtimes = self._get_subset_mtimes(subset)
+            is_changed = (subset_mtimes != self._get_saved_subset_mtimes(subset))
+            is_unlisted = list_changed_dirs and (subset_mtimes != self._listed_subset_mtimes.get(subset.relative_dir))
+            if not (is_changed or is_unlisted):
+                continue
+
+            # NOTE: Save the modified times read before looking for the frames, so the frames written meanwhile change them again
+            self._dir_mtimes[subset.relative_dir], annotation_dir_mtime = subset_mtimes
+            if not (annotation_dir_mtime is None):
+                self._annotation_dir_mtimes[subset.relative_dir] = annotation_dir_mtime
+
+            new_frames = None if is_unlisted else self._probe_next_frames(subset)
+            if (new_frames is None):
+                self._listed_subset_mtimes[subset.relative_dir] = subset_mtimes
+                new_frames = self._list_new_frames(subset)
+            if new_frames:
+                self._add_subset_frames(subset, new_frames)
+                new_frame_count += len(new_frames)
+
+        return new_frame_count
+
+    def _get_subset_mtimes(self, subset):
+        """Get the current (dir_mtime, annotation_dir_mtime) of a subset, annotation_dir_mtime is None if the annotations are in the dataset directory"""
+        dir_mtime = NVDUDataset._get_dir_mtime(subset.dir_path)
+        if self._is_annotation_in_dataset_dir():
+            return (dir_mtime, None)
+        subset_annotation_dir_path = path.join(self._annotation_dr, subset.relative_dir) if subset.relative_dir else self._annotation_dr
+        return (dir_mtime, NVDUDataset._get_dir_mtime(subset_annotation_dir_path))
+
+    def _get_saved_subset_mtimes(self, subset):
+        return (self._dir_mtimes.get(subset.relative_dir), self._annotation_dir_mtimes.get(subset.relative_dir))
+
+    def _probe_next_frames(self, subset):
+        """Check the names following the subset's last frame until a frame is missing
+        NOTE: Only the subsets whose frame names are all numbers of the same width (e.g: 000123) and share one image
+        postfix are probed, e.g: the stereo frames (000123.left, 000123.right) need the directory to be listed
+        Return:
+            List of (frame_name, image_file_name) of the new frames, None if the subset's frames can't be probed
+        """
+        if (subset.frame_count == 0) or subset.frame_names.is_packed or (len(subset.image_postfixes) != 1):
+            return None
+
+        last_frame_name = subset.frame_names[subset.frame_count - 1]
+        number_width = len(last_frame_name)
+        frame_number = int(last_frame_name)
+        image_name_postfix = subset.image_postfixes[0]
+
+        new_frames = []
+        while True:
+            frame_number += 1
+            frame_name = str(frame_number).zfill(number_width)
+            # NOTE: A wider number (e.g: 1000000 after 999999) is sorted before the existing names, let the listing handle it
+            if (len(frame_name) > number_width):
+                break
+            if subset.relative_dir:
+                frame_name = path.join(subset.relative_dir, frame_name)
+            image_file_name = frame_name + image_name_postfix
+            # NOTE: The frame is only added when both its image and annotation data are written
+            if not path.exists(path.join(self._dataset_dir, image_file_name)) \
+                    or not path.exists(self.get_annotation_file_path_of_frame(frame_name)):
+                break
+            new_frames.append((frame_name, image_file_name))
+
+        return new_frames
+
+    def _list_new_frames(self, subset):
+        """List the subset's directory and find the frames which are not in the subset yet
+        Return:
+            Sorted list of (frame_name, image_file_name) of the new frames
+        """
+        new_frames = []
+        for file_name in listdir(subset.dir_path):
+            if not any(fnmatch.fnmatch(file_name, check_filter) for check_filter in self._img_name_filters):
+                continue
+            frame_name = path.splitext(file_name)[0]
+            if (subset.find_frame(frame_name) >= 0):
+                continue
+            if subset.relative_dir:
+                frame_name = path.join(subset.relative_dir, frame_name)
+                file_name = path.join(subset.relative_dir, file_name)
+            if path.exists(self.get_annotation_file_path_of_frame(frame_name)):
+                new_frames.append((frame_name, file_name))
+
+        new_frames.sort(key=lambda new_frame: new_frame[0])
+        return new_frames
+
+    def _add_subset_frames(self, subset, new_frames):
+        subset.merge_frames(new_frames)
+        # NOTE: The subsets are stored in the same order as their frames
+        subset_index = self._subsets.index(subset)
+        for check_subset in self._subsets[subset_index + 1:]:
+            check_subset.frame_start += len(new_frames)
+        self._subset_frame_starts = list(check_subset.frame_start for check_subset in self._subsets)
+        self._frame_count += len(new_frames)
+
+    def _scan_dataset_dirs(self):
+        """Find all the frames in the dataset directory (and its sub-directories if the dataset is recursive)
+        Return:
+            dir_mtimes: map from each scanned directory to its modified time
+            annotation_dir_mtimes: map from each scanned annotation directory to its modified time
+            subset_entries: sorted list of [subset_dir, frame_entries] pairs
+        """
+        dir_mtimes = {}
+        annotation_dir_mtimes = {}
+        subset_entries = []
+        if not self._recursive:
+            scanned_dir, dir_mtime, annotation_dir_mtime, _, frame_entries = self._scan_dir('', True)
+            dir_mtimes[scanned_dir] = dir_mtime
+            if not (annotation_dir_mtime is None):
+                annotation_dir_mtimes[scanned_dir] = annotation_dir_mtime
+            subset_entries.append([scanned_dir, frame_entries])
+            return dir_mtimes, annotation_dir_mtimes, subset_entries
+
+        # Walk the directory tree breadth first, each directory is listed in the thread pool
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._scan_thread_count) as executor:
+            pending_scans = set([executor.submit(self._scan_dir, '')])
+            while pending_scans:
+                done_scans, pending_scans = concurrent.futures.wait(pending_scans, return_when=concurrent.futures.FIRST_COMPLETED)
+                for done_scan in done_scans:
+                    scanned_dir, dir_mtime, annotation_dir_mtime, sub_dirs, frame_entries = done_scan.result()
+                    dir_mtimes[scanned_dir] = dir_mtime
+                    if not (frame_entries is None):
+                        subset_entries.append([scanned_dir, frame_entries])
+                        if not (annotation_dir_mtime is None):
+                            annotation_dir_mtimes[scanned_dir] = annotation_dir_mtime
+                    for sub_dir in sub_dirs:
+                        pending_scans.add(executor.submit(self._scan_dir, sub_dir))
+
+        subset_entries.sort(key=lambda entry: entry[0])
+        print("scan - found {} subsets in {} directories".format(len(subset_entries), len(dir_mtimes)))
+        return dir_mtimes, annotation_dir_mtimes, subset_entries
+
+    def _scan_dir(self, relative_dir, is_subset=None):
+        """List a directory of the dataset
+        Args:
+            relative_dir: path of the directory relative to the dataset's directory
+            is_subset: if None, the directory is a subset if it has both the object and camera settings files
+        Return:
+            (relative_dir, dir_mtime, annotation_dir_mtime, sub_dirs, frame_entries) - frame_entries is None if the directory is not a subset
+        """
+        dir_path = path.join(self._dataset_dir, relative_dir) if relative_dir else self._dataset_dir
+        # NOTE: Get the modified time before listing so any change made during the listing invalidate the index
+        dir_mtime = os.stat(dir_path).st_mtime_ns
+        sub_dirs = []
+        file_entries = {}
+        with os.scandir(dir_path) as dir_entries:
+            for check_entry in dir_entries:
+                if check_entry.is_dir(follow_symlinks=False):
+                    # NOTE: Skip the caches written inside the dataset directory by the older versions
+                    if not relative_dir and (check_entry.name in (NVDUDataset.PREVIEW_CACHE_DIR_NAME, NVDUDataset.ARRAY_CACHE_DIR_NAME)):
+                        continue
+                    sub_dirs.append(path.join(relative_dir, check_entry.name) if relative_dir else check_entry.name)
+                elif check_entry.is_file():
+                    file_entries[check_entry.name] = check_entry
+
+        if (is_subset is None):
+            is_subset = (NVDUDataset.CAMERA_SETTING_FILE_NAME in file_entries) and (NVDUDataset.OBJECT_SETTING_FILE_NAME in file_entries)
+        if not is_subset:
+            return relative_dir, dir_mtime, None, sub_dirs, None
+
+        annotation_dir_mtime, frame_entries = self._scan_frame_entries(relative_dir, file_entries)
+        return relative_dir, dir_mtime, annotation_dir_mtime, sub_dirs, frame_entries
+
+    def _scan_frame_entries(self, relative_dir, image_entries):
+        """Find all the frames in a directory which have both an image and annotation data
+        Return:
+            annotation_dir_mtime: modified time of the annotation directory, None if it's the same as the image directory
+            frame_entries: sorted list of [frame_name, image_file_name, image_size, image_mtime, annotation_file_name, annotation_size, annotation_mtime]
+        """
+        annotation_dir_mtime = None
+        if self._is_annotation_in_dataset_dir():
+            annotation_entries = image_entries
+        else:
+            annotation_dir_path = path.join(self._annotation_dr, relative_dir) if relative_dir else self._annotation_dr
+            annotation_dir_mtime = NVDUDataset._get_dir_mtime(annotation_dir_path)
+            annotation_entries = {}
+            if path.isdir(annotation_dir_path):
+                with os.scandir(annotation_dir_path) as dir_entries:
+                    annotation_entries = dict((check_entry.name, check_entry) for check_entry in dir_entries if check_entry.is_file())
+
+        frame_entries = []
+        for file_name, image_entry in image_entries.items():
+            is_name_match_filters = any(fnmatch.fnmatch(file_name, check_filter) for check_filter in self._img_name_filters)
+            if not is_name_match_filters:
+                continue
+
+            # NOTE: Consider frame name as the file name without its extension
+            frame_name = path.splitext(file_name)[0]
+            # Check if it have annotation data or not
+            annotation_file_name = frame_name + FrameDataExt
+            annotation_entry = annotation_entries.get(annotation_file_name)
+            if annotation_entry is None:
+                continue
+
+            image_stat = image_entry.stat()
+            annotation_stat = annotation_entry.stat()
+            if relative_dir:
+                frame_name = path.join(relative_dir, frame_name)
+                file_name = path.join(relative_dir, file_name)
+                annotation_file_name = path.join(relative_dir, annotation_file_name)
+            frame_entries.append([frame_name,
+                file_name, image_stat.st_size, image_stat.st_mtime_ns,
+                annotation_file_name, annotation_stat.st_size, annotation_stat.st_mtime_ns])
+
+        frame_entries.sort(key=lambda entry: entry[0])
+        return annotation_dir_mtime, frame_entries
+
+    def _is_annotation_in_dataset_dir(self):
+        return (path.abspath(self._annotation_dr) == path.abspath(self._dataset_dir))
+
+    @staticmethod
+    def _get_dir_mtime(dir_path):
+        return os.stat(dir_path).st_mtime_ns if path.isdir(dir_path) else 0
+
+    def _is_dir_mtimes_valid(self, dir_mtimes, annotation_dir_mtimes):
+        check_dirs = list((path.join(self._dataset_dir, check_dir) if check_dir else self._dataset_dir, check_mtime)
+                            for check_dir, check_mtime in dir_mtimes.items())
+        check_dirs.extend((path.join(self._annotation_dr, check_dir) if check_dir else self._annotation_dr, check_mtime)
+                            for check_dir, check_mtime in annotation_dir_mtimes.items())
+        if (len(check_dirs) == 1):
+            return NVDUDataset._get_dir_mtime(check_dirs[0][0]) == check_dirs[0][1]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._scan_thread_count) as executor:
+            current_mtimes = executor.map(NVDUDataset._get_dir_mtime, list(check_dir for check_dir, _ in check_dirs))
+            return all(current_mtime == check_mtime for current_mtime, (_, check_mtime) in zip(current_mtimes, check_dirs))
+
+    def _get_frame_index_key(self):
+        return {
+            'version': NVDUDataset.FRAME_INDEX_VERSION,
+            'annotation_dir': path.abspath(self._annotation_dr),
+            'img_name_filters': list(self._img_name_filters),
+            'recursive': self._recursive,
+        }
+
+    def _load_frame_index(self):
+        """Load the cached scan result, return None if the index doesn't exist or is outdated"""
+        index_file_path = self.frame_index_file_path
+        try:
+            index_data = load_json_file(index_file_path)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if not isinstance(index_data, dict) or (index_data.get('key') != self._get_frame_index_key()):
+            return None
+        dir_mtimes = index_data['dir_mtimes']
+        annotation_dir_mtimes = index_data['annotation_dir_mtimes']
+        if not self._is_dir_mtimes_valid(dir_mtimes, annotation_dir_mtimes):
+            return None
+
+        print("scan - using frame index: {}".format(index_file_path))
+        subset_entries = []
+        frame_entries = index_data['frames']
+        frame_start = 0
+        for subset_dir, subset_frame_count in index_data['subsets']:
+            subset_entries.append([subset_dir, frame_entries[frame_start:frame_start + subset_frame_count]])
+            frame_start += subset_frame_count
+        return dir_mtimes, annotation_dir_mtimes, subset_entries
+
+    def _create_frame_index_file(self):
+        index_file_path = self.frame_index_file_path
+        if path.exists(index_file_path):
+            return
+        try:
+            index_dir = path.dirname(index_file_path)
+            if index_dir and not path.exists(index_dir):
+                os.makedirs(index_dir)
+            open(index_file_path, 'a').close()
+        except (IOError, OSError) as ex:
+            print("Can't create frame index file: {} - {}".format(index_file_path, ex))
+
+    def _save_frame_index(self, dir_mtimes, annotation_dir_mtimes, subset_entries):
+        index_file_path = self.frame_index_file_path
+        frame_entries = []
+        for _, subset_frame_entries in subset_entries:
+            frame_entries.extend(subset_frame_entries)
+        index_data = {
+            'key': self._get_frame_index_key(),
+            'dir_mtimes': dir_mtimes,
+            'annotation_dir_mtimes': annotation_dir_mtimes,
+            'subsets': list([subset_dir, len(subset_frame_entries)] for subset_dir, subset_frame_entries in subset_entries),
+            'columns': ['frame_name', 'image_file_name', 'image_size', 'image_mtime',
+                        'annotation_file_name', 'annotation_size', 'annotation_mtime'],
+            'frames': frame_entries,
+        }
+        # NOTE: Overwrite the existing file in place so the dataset directory's modified time doesn't change
+        try:
+            with open(index_file_path, 'w') as index_file:
+                json.dump(index_data, index_file)
+        except (IOError, OSError) as ex:
+            print("Can't write frame index file: {} - {}".format(index_file_path, ex))
+
+    def get_subset_of_frame(self, in_frame_index):
+        """Get the NVDUDatasetSubset which contains a frame, return None if the frame index is invalid"""
+        if (in_frame_index < 0) or (in_frame_index >= self._frame_count):
+            return None
+        subset_index = bisect.bisect_right(self._subset_frame_starts, in_frame_index) - 1
+        return self._subsets[subset_index]
+
+    def get_dataset_settings_of_frame(self, in_frame_index, mesh_dir_path=''):
+        """Get the DatasetSettings of the subset which contains a frame"""
+        frame_subset = self.get_subset_of_frame(in_frame_index)
+        return frame_subset.load_dataset_settings(mesh_dir_path) if not (frame_subset is None) else None
+
+    def get_camera_intrinsic_settings_of_frame(self, in_frame_index):
+        """Get the CameraIntrinsicSettings of the subset which contains a frame"""
+        frame_subset = self.get_subset_of_frame(in_frame_index)
+        return frame_subset.load_camera_intrinsic_settings() if not (frame_subset is None) else None
+
+    def load_frames(self, frame_indexes=None, dataset_settings=None, load_images=True,
+            chunk_size=DEFAULT_LOAD_CHUNK_SIZE, process_count=None, object_fields=None, lazy=False,
+            image_downscale=1, use_preview_cache=True):
+        """Load many frames using a process pool, the json parsing and image decoding are done in the worker processes
+        Args:
+            frame_indexes: list or range of the frame indexes to load, all the frames if None
+            dataset_settings: DatasetSettings used to create the scenes, if None then each frame's subset settings are used
+            chunk_size: number of frames loaded by each task of the process pool
+            process_count: number of worker processes, default is the number of cpu cores
+            object_fields, lazy: see AnnotatedSceneInfo.create_from_json_data
+            image_downscale: decode the images at 1/image_downscale of their resolution (1, 2, 4 or 8),
+                the image space annotations and the scenes' camera intrinsics are scaled to match
+            use_preview_cache: if True, the downscaled images are read from (and written to) the preview cache directory
+        Return:
+            Generator of (frame_index, AnnotatedSceneInfo) in the same order as frame_indexes
+        """
+        if not self._is_scanned:
+            self.scan()
+        if (frame_indexes is None):
+            frame_indexes = range(self._frame_count)
+
+        def get_frame_requests():
+            for frame_index in frame_indexes:
+                image_file_path, annotation_file_path = self.get_frame_file_path_from_index(frame_index)
+                preview_image_file_path = None
+                if use_preview_cache and (image_downscale != 1):
+                    preview_image_file_path = self.get_preview_image_file_path_of_frame(self.get_frame_name_from_index(frame_index), image_downscale)
+                yield frame_index, annotation_file_path, image_file_path, preview_image_file_path
+
+        image_scale = 1.0 / image_downscale
+        for frame_index, frame_json_data, image_data in load_frames_in_processes(get_frame_requests(), load_images, chunk_size, process_count, image_downscale):
+            if not (image_data is None):
+                image_data = image_data[:,:,::-1] # Reorder color channels to be RGB
+            frame_dataset_settings = dataset_settings if not (dataset_settings is None) else self.get_dataset_settings_of_frame(frame_index)
+            frame_scene_info = AnnotatedSceneInfo.create_from_json_data(frame_dataset_settings, frame_json_data, image_data, object_fields, lazy, image_scale)
+            frame_scene_info.source_file_path = self.get_annotation_file_path_of_frame(self.get_frame_name_from_index(frame_index))
+            frame_camera_intrinsics = self.get_camera_intrinsic_settings_of_frame(frame_index)
+            if not (frame_camera_intrinsics is None):
+                frame_scene_info.camera_intrinsics = frame_camera_intrinsics.get_scaled(image_scale) if (image_downscale != 1) else frame_camera_intrinsics
+            yield frame_index, frame_scene_info
+
+    def get_preview_image_file_path_of_frame(self, in_frame_name, image_downscale):
+        """Get the path of the cached downscaled copy of a frame's image"""
+        image_file_name = path.relpath(self.get_image_file_path_of_frame(in_frame_name), self._dataset_dir)
+        return path.join(self.preview_cache_dir, 'x{}'.format(image_downscale), image_file_name)
+
+    def get_aspect_image_file_path_of_frame(self, in_frame_name, aspect_id):
+        """Get the path of one of the frame's images listed in FrameAspectDict, e.g: 000123.depth.png for the 'depth' aspect"""
+        image_file_path = self.get_image_file_path_of_frame(in_frame_name)
+        if (aspect_id == 'main'):
+            return image_file_path
+        return path.splitext(image_file_path)[0] + FrameAspectDict[aspect_id]['ext'] + FrameImageExt
+
+    def get_array_cache_file_path_of_frame(self, in_frame_name, array_name):
+        """Get the path of the .npy file caching an array decoded from a frame, e.g: 000123.depth.npy"""
+        image_file_name = path.relpath(self.get_image_file_path_of_frame(in_frame_name), self._dataset_dir)
+        return path.join(self.array_cache_dir, path.splitext(image_file_name)[0] + '.' + array_name + '.npy')
+
+    def load_depth_of_frame(self, in_frame_index, use_cache=True):
+        """Load the depth of a frame as a float32 map of the depth in meters (0 where there is no depth), None if it doesn't have depth
+        NOTE: The cached arrays are memory-mapped read-only arrays
+        """
+        frame_name = self.get_frame_name_from_index(in_frame_index)
+        depth_file_path = self.get_aspect_image_file_path_of_frame(frame_name, 'depth')
+        if not path.exists(depth_file_path):
+            return None
+        frame_dataset_settings = self.get_dataset_settings_of_frame(in_frame_index)
+        depth_scale = frame_dataset_settings.exporter_settings.depth_scale if not (frame_dataset_settings is None) else DEFAULT_DEPTH_SCALE
+        cache_file_path = self.get_array_cache_file_path_of_frame(frame_name, 'depth') if use_cache else ''
+        return load_cached_array(cache_file_path, depth_file_path, lambda file_path: read_depth_image(file_path, depth_scale))
+
+    def load_class_segmentation_of_frame(self, in_frame_index, aspect_id='pls', use_cache=True):
+        """Load a segmentation image of a frame ('pls' or 'pls_no') as an int32 map of the class ids, None if it doesn't exist
+        The colors of the segmentation image are converted using the class colors of the frame's object settings
+        """
+        frame_name = self.get_frame_name_from_index(in_frame_index)
+        segmentation_file_path = self.get_aspect_image_file_path_of_frame(frame_name, aspect_id)
+        if not path.exists(segmentation_file_path):
+            return None
+        frame_dataset_settings = self.get_dataset_settings_of_frame(in_frame_index)
+        color_table = frame_dataset_settings.get_segmentation_color_table() if not (frame_dataset_settings is None) else SegmentationColorTable([], [])
+
+        def decode_class_ids(file_path):
+            segmentation_data = read_segmentation_image(file_path)
+            return color_table.get_class_ids(segmentation_data) if not (segmentation_data is None) else None
+
+        cache_file_path = self.get_array_cache_file_path_of_frame(frame_name, aspect_id + '.class_ids') if use_cache else ''
+        return load_cached_array(cache_file_path, segmentation_file_path, decode_class_ids)
+
+    def load_instance_segmentation_of_frame(self, in_frame_index, aspect_id='pls', use_cache=True):
+        """Load a segmentation image of a frame ('pls' or 'pls_no') as an int32 map of instance ids (0 is the background),
+        each distinct color of the image is an instance. Return None if the image doesn't exist
+        """
+        frame_name = self.get_frame_name_from_index(in_frame_index)
+        segmentation_file_path = self.get_aspect_image_file_path_of_frame(frame_name, aspect_id)
+        if not path.exists(segmentation_file_path):
+            return None
+
+        def decode_instance_ids(file_path):
+            segmentation_data = read_segmentation_image(file_path)
+            return get_instance_ids(segmentation_data)[0] if not (segmentation_data is None) else None
+
+        cache_file_path = self.get_array_cache_file_path_of_frame(frame_name, aspect_id + '.instance_ids') if use_cache else ''
+        return load_cached_array(cache_file_path, segmentation_file_path, decode_instance_ids)
+
     def get_image_file_path_of_frame(self, in_frame_name):
-        for existing_file in glob.glob(in_frame_name + '*'):
+        frame_index = self.get_frame_index_from_name(in_frame_name)
+        if (frame_index >= 0):
+            frame_subset = self.get_subset_of_frame(frame_index)
+            image_file_name = frame_subset.get_image_file_name(frame_index - frame_subset.frame_start)
+        else:
+            image_file_name = self._extra_image_file_names.get(in_frame_name)
+            if image_file_name is None:
+                image_file_name = self._find_image_file_name_of_frame(in_frame_name)
+                self._extra_image_file_names[in_frame_name] = image_file_name
+
+        return path.join(self._dataset_dir, image_file_name)
+
+    # NOTE: Only used for the frames which are not found by scan()
+    def _find_image_file_name_of_frame(self, in_frame_name):
+        search_pattern = path.join(glob.escape(self._dataset_dir), glob.escape(in_frame_name)) + '*'
+        for existing_file in sorted(glob.glob(search_pattern)):
+            existing_file_name = path.basename(existing_file)
+            # NOTE: Same as scan(), the frame name is the image file name without its extension, e.g: not 000123.depth.png
+            if (path.splitext(existing_file_name)[0] != path.basename(in_frame_name)):
+                continue
             for name_filter in self._img_name_filters:
-                if fnmatch.fnmatch(existing_file, name_filter):
-                    return path.join(self._dataset_dir, existing_file)
+                if fnmatch.fnmatch(existing_file_name, name_filter):
+                    # NOTE: The frames of a recursive dataset are in sub-directories, e.g: sub/000123
+                    return path.relpath(existing_file, self._dataset_dir)
 
         raise Exception('File not found: {}.*'.format(in_frame_name))
     
@@ -186,7 +915,17 @@ class NVDUDataset(object):
         return path.join(self._annotation_dr, in_frame_name + FrameDataExt)
 
     def get_frame_name_from_index(self, in_frame_index):
-        return self._frame_names[in_frame_index] if ((in_frame_index >= 0) and (in_frame_index < len(self._frame_names))) else ""
+        frame_subset = self.get_subset_of_frame(in_frame_index)
+        return frame_subset.get_frame_name(in_frame_index - frame_subset.frame_start) if not (frame_subset is None) else ""
+
+    def get_frame_index_from_name(self, in_frame_name):
+        """Get the index of a frame using its name, return -1 if the frame is not in the dataset"""
+        frame_subset_dir, subset_frame_name = path.split(in_frame_name) if self._recursive else ('', in_frame_name)
+        frame_subset = self._subset_of_dir.get(frame_subset_dir)
+        if (frame_subset is None):
+            return -1
+        subset_frame_index = frame_subset.find_frame(subset_frame_name)
+        return (frame_subset.frame_start + subset_frame_index) if (subset_frame_index >= 0) else -1
 
     # Return the frame's image file path and annotation file path when know its index
     def get_frame_file_path_from_index(self, in_frame_index):
@@ -204,11 +943,11 @@ class NVDUDataset(object):
 
     @staticmethod
     def get_default_camera_setting_file_path(data_dir_path):
-        return path.join(data_dir_path, '_camera_settings.json')
+        return path.join(data_dir_path, NVDUDataset.CAMERA_SETTING_FILE_NAME)
 
     @staticmethod
     def get_default_object_setting_file_path(data_dir_path):
-        return path.join(data_dir_path, '_object_settings.json')
+        return path.join(data_dir_path, NVDUDataset.OBJECT_SETTING_FILE_NAME)
 
 
 # =============================== Dataset Settings ===============================
@@ -217,7 +956,7 @@ class ExportedObjectSettings(object):
     def __init__(self, name = '', mesh_file_path = '', initial_matrix = None,
             cuboid_dimension = Vector3([0, 0, 0]), cuboid_center = Vector3([0, 0, 0]),
             coord_system = CoordinateSystem(), obj_class_id = 0, obj_color = None):
-        self.name = ''
+        self.name = name
         self.mesh_file_path = mesh_file_path
         self.initial_matrix = initial_matrix
 
@@ -234,7 +973,11 @@ class ExportedObjectSettings(object):
         self.cuboid_dimension = cuboid_dimension
         self.cuboid_center_local = cuboid_center
         self.coord_system = coord_system
+        # NOTE: The geometry of the class is shared as read-only data by all the annotated objects of this class,
+        # each object only have its own pose
         self.cuboid3d = Cuboid3d(self.cuboid_dimension, self.cuboid_center_local, self.coord_system)
+        if not (self.initial_matrix is None):
+            self.initial_matrix.setflags(write=False)
 
         self.mesh_model = None
         self.pivot_axis = PivotAxis(np.array(self.cuboid_dimension))
@@ -242,25 +985,108 @@ class ExportedObjectSettings(object):
     def __str__(self):
         return "({} - {} - {})".format(self.name, self.mesh_file_path, self.initial_matrix)
 
+    def create_cuboid3d(self):
+        """Create a cuboid 3d of this class which share the class's cuboid vertices"""
+        return Cuboid3d(self.cuboid_dimension, self.cuboid_center_local, self.coord_system,
+            shared_vertices=self.cuboid3d.get_vertices())
+
+    def create_mesh(self):
+        new_mesh = Mesh(self.mesh_file_path)
+        new_mesh.set_initial_matrix(self.initial_matrix)
+        return new_mesh
+
+    def create_pivot_axis(self):
+        """Create a pivot axis of this class which share the class's pivot axis vertexes"""
+        return PivotAxis(self.pivot_axis.size3d, in_shared_pivot_axis=self.pivot_axis)
+
 class ExporterSettings(object):
     def __init__(self):
         self.captured_image_size = [0, 0]
+        # Meters per unit of the depth images
+        self.depth_scale = DEFAULT_DEPTH_SCALE
 
     @classmethod
     def parse_from_json_data(cls, json_data):
         parsed_exporter_settings = ExporterSettings()
         parsed_exporter_settings.captured_image_size = [json_data['camera_settings'][0]['captured_image_size']['width'],
                                                         json_data['camera_settings'][0]['captured_image_size']['height']]
+        if ('depth_scale' in json_data['camera_settings'][0]):
+            parsed_exporter_settings.depth_scale = float(json_data['camera_settings'][0]['depth_scale'])
         print("parsed_exporter_settings.captured_image_size: {}".format(parsed_exporter_settings.captured_image_size))
         
         return parsed_exporter_settings
 
+# =============================== ObjectSettingsDict ===============================
+class ObjectSettingsDict(collections.abc.MutableMapping):
+    """Dictionary of ExportedObjectSettings by class name
+    The settings of each class are only created from their json data when they are accessed
+    """
+    def __init__(self, create_object_settings_func=None):
+        self._create_object_settings = create_object_settings_func
+        # Class name => ExportedObjectSettings, or its json data if it's not created yet
+        self._object_settings = {}
+        # Memo of the object class names which were resolved: class name => class name in the settings (or None)
+        self._resolved_classes = {}
+        self._sorted_object_classes = None
+
+    def add_object_json_data(self, object_class, object_json_data):
+        """Add the json data of a class, its settings will be created when it's accessed"""
+        self._object_settings[object_class] = object_json_data
+        self._clear_resolved_classes()
+
+    def __getitem__(self, object_class):
+        object_settings = self._object_settings[object_class]
+        if not isinstance(object_settings, ExportedObjectSettings):
+            object_settings = self._create_object_settings(object_settings)
+            self._object_settings[object_class] = object_settings
+        return object_settings
+
+    def __setitem__(self, object_class, object_settings):
+        self._object_settings[object_class] = object_settings
+        self._clear_resolved_classes()
+
+    def __delitem__(self, object_class):
+        del self._object_settings[object_class]
+        self._clear_resolved_classes()
+
+    def __iter__(self):
+        return iter(self._object_settings)
+
+    def __len__(self):
+        return len(self._object_settings)
+
+    def __contains__(self, object_class):
+        return object_class in self._object_settings
+
+    def _clear_resolved_classes(self):
+        self._resolved_classes = {}
+        self._sorted_object_classes = None
+
+    def resolve_class(self, object_class):
+        """Get the name of the class in the settings which match an object class, use fuzzy find if there are no exact match
+        Return:
+            The matched class name or None if no class match
+        """
+        if (object_class in self._object_settings):
+            return object_class
+        if (object_class in self._resolved_classes):
+            return self._resolved_classes[object_class]
+
+        if (self._sorted_object_classes is None):
+            self._sorted_object_classes = sorted(self._object_settings.keys())
+        fuzzy_object_classes = list(fuzzyfinder(object_class, self._sorted_object_classes))
+        resolved_class = fuzzy_object_classes[0] if (len(fuzzy_object_classes) > 0) else None
+        # print("fuzzy_object_classes: {} - resolved_class: {}".format(fuzzy_object_classes, resolved_class))
+        self._resolved_classes[object_class] = resolved_class
+        return resolved_class
+
 class DatasetSettings():
     def __init__(self, mesh_dir_path=''):
         self.mesh_dir_path = mesh_dir_path
-        self.obj_settings = {}
+        self.obj_settings = ObjectSettingsDict(self.create_object_settings_from_json_data)
         self.exporter_settings = ExporterSettings()
         self.coord_system = CoordinateSystem()
+        self._segmentation_color_table = None
 
     @classmethod
     def parse_from_json_data(cls, json_data, mesh_dir_path=''):
@@ -269,30 +1095,40 @@ class DatasetSettings():
         coord_system = None
         parsed_settings.coord_system = coord_system
         
+        # NOTE: The settings of each class are only created when the class is used
         for check_obj in json_data['exported_objects']:
-            obj_class = check_obj['class']
-            obj_mesh_file_path = get_mesh_file_path(parsed_settings.mesh_dir_path, obj_class)
-            obj_initial_matrix = Matrix44(check_obj['fixed_model_transform'])
-            obj_cuboid_dimension = check_obj['cuboid_dimensions'] if ('cuboid_dimensions' in check_obj) else Vector3([0, 0, 0])
-            obj_cuboid_center = check_obj['cuboid_center_local'] if ('cuboid_center_local' in check_obj) else Vector3([0, 0, 0])
-            obj_class_id = int(check_obj['segmentation_class_id']) if ('segmentation_class_id' in check_obj) else 0
-            obj_color = check_obj['color'] if ('color' in check_obj) else None
-
-            new_obj_info = ExportedObjectSettings(obj_class, obj_mesh_file_path, 
-                obj_initial_matrix, obj_cuboid_dimension, obj_cuboid_center, coord_system, obj_class_id, obj_color)
-
-            # print('scan_settings_data: {}'.format(new_obj_info))
-            # print('obj_mesh_file_path: {}'.format(obj_mesh_file_path))
-            parsed_settings.obj_settings[obj_class] = new_obj_info
+            parsed_settings.obj_settings.add_object_json_data(check_obj['class'], check_obj)
         
         return parsed_settings
 
+    def get_segmentation_color_table(self):
+        """Get the SegmentationColorTable which convert the segmentation colors to class ids, it's created once"""
+        if (self._segmentation_color_table is None):
+            self._segmentation_color_table = SegmentationColorTable.create_from_dataset_settings(self)
+        return self._segmentation_color_table
+
+    def create_object_settings_from_json_data(self, obj_json_data):
+        obj_class = obj_json_data['class']
+        obj_mesh_file_path = get_mesh_file_path(self.mesh_dir_path, obj_class)
+        obj_initial_matrix = Matrix44(obj_json_data['fixed_model_transform'])
+        obj_cuboid_dimension = obj_json_data['cuboid_dimensions'] if ('cuboid_dimensions' in obj_json_data) else Vector3([0, 0, 0])
+        obj_cuboid_center = obj_json_data['cuboid_center_local'] if ('cuboid_center_local' in obj_json_data) else Vector3([0, 0, 0])
+        obj_class_id = int(obj_json_data['segmentation_class_id']) if ('segmentation_class_id' in obj_json_data) else 0
+        obj_color = obj_json_data['color'] if ('color' in obj_json_data) else None
+
+        new_obj_info = ExportedObjectSettings(obj_class, obj_mesh_file_path, 
+            obj_initial_matrix, obj_cuboid_dimension, obj_cuboid_center, self.coord_system, obj_class_id, obj_color)
+
+        # print('scan_settings_data: {}'.format(new_obj_info))
+        # print('obj_mesh_file_path: {}'.format(obj_mesh_file_path))
+        return new_obj_info
+
     @classmethod
     def parse_from_file(cls, setting_file_path, mesh_dir_path=''):
         parsed_settings = None
 
         if (path.exists(setting_file_path)):
-            json_data = json.load(open(setting_file_path))
+            json_data = load_json_file(setting_file_path)
             parsed_settings = cls.parse_from_json_data(json_data, mesh_dir_path)
             print('parse_from_file: setting_file_path: {} - mesh_dir_path: {} - parsed_settings: {}'.format(
                 setting_file_path, mesh_dir_path, parsed_settings))
@@ -306,22 +1142,20 @@ class DatasetSettings():
         return cls.parse_from_file(setting_file_path, mesh_dir_path)
         
     # Get the settings info for a specified object class
+    # If there are no match object_class name then try to find the closest match using fuzzy find
     def get_object_settings(self, object_class):
-        if (object_class in self.obj_settings):
-            return self.obj_settings[object_class]
-        # TODO: If there are no match object_class name then try to find the closest match using fuzzy find
-        all_object_classes = list(self.obj_settings.keys())
-        fuzzy_object_classes = list(fuzzyfinder(object_class, all_object_classes))
-        if (len(fuzzy_object_classes) > 0):
-            fuzzy_object_class = fuzzy_object_classes[0]
-            # print("fuzzy_object_classes: {} - fuzzy_object_class: {}".format(fuzzy_object_classes, fuzzy_object_class))
-            return self.obj_settings[fuzzy_object_class]
-
-        return None
+        resolved_object_class = self.obj_settings.resolve_class(object_class)
+        if (resolved_object_class is None):
+            return None
+        return self.obj_settings[resolved_object_class]
 
 # =============================== AnnotatedObjectInfo ===============================
 # Class contain annotation data of each object in the scene
 class AnnotatedObjectInfo(SceneObject):
+    # NOTE: Use slots to keep the memory usage low when a lot of scenes are kept in memory
+    __slots__ = ['name', 'obj_class', 'object_settings', 'location', 'cuboid_center', 'quaternion', 'cuboid2d', 'bounding_box', 'keypoints',
+        'dimension', '_cuboid3d', '_mesh', '_pivot_axis', 'is_modified']
+
     def __init__(self, dataset_settings, obj_class = '', name = ''):
         super(AnnotatedObjectInfo, self).__init__()
 
@@ -332,28 +1166,24 @@ class AnnotatedObjectInfo(SceneObject):
         self.location = pyrr.Vector3()
         self.cuboid_center = None
         self.quaternion = pyrr.Quaternion([0.0, 0.0, 0.0, 1.0])
-        # self.bb2d = BoundingBox()
+        # Annotated 2d box of the object in image space (Box2d)
+        self.bounding_box = None
         self.cuboid2d = None
         self.keypoints = []
 
-        if not (self.object_settings is None):
-            self.dimension = self.object_settings.cuboid_dimension
-            self.cuboid3d = copy.deepcopy(self.object_settings.cuboid3d) if (not self.object_settings is None) else None
-            self.mesh = Mesh(self.object_settings.mesh_file_path)
-            self.mesh.set_initial_matrix(self.object_settings.initial_matrix)
-            self.pivot_axis = self.object_settings.pivot_axis
-        else:
-            self.dimension = None
-            self.cuboid3d = None
-            self.mesh = None
-            self.pivot_axis = None
+        self.dimension = self.object_settings.cuboid_dimension if not (self.object_settings is None) else None
+        # NOTE: The cuboid 3d, mesh and pivot axis are only created when they are accessed,
+        # they share their geometry with the object settings of the class
+        self._cuboid3d = None
+        self._mesh = None
+        self._pivot_axis = None
         
         self.is_modified = False
-        self.relative_transform = transform3d()
 
     # Parse and create an annotated object from a json object
+    # image_scale: scale applied to the image space annotations (projected cuboid, keypoints), e.g: 0.5 for a half resolution image
     @classmethod
-    def parse_from_json_object(self, dataset_settings, json_obj):
+    def parse_from_json_object(self, dataset_settings, json_obj, image_scale=1.0):
         try:
             obj_class = json_obj['class']
             # print('parse_from_json_object: dataset_settings: {} - name: {} - class: {}'.format(
@@ -370,8 +1200,14 @@ class AnnotatedObjectInfo(SceneObject):
         if ('cuboid_centroid' in json_obj):
             parsed_object.cuboid_center = json_obj['cuboid_centroid']
 
-        # TODO: Parse bounding box 2d
-        # json_obj['bounding_rectangle_imagespace']
+        # Parse the box in image space
+        for box_field_name in ['bounding_box', 'bounding_rectangle_imagespace']:
+            if (box_field_name in json_obj):
+                parsed_object.bounding_box = Box2d.parse_from_json_data(json_obj[box_field_name])
+                if not (parsed_object.bounding_box is None):
+                    if (image_scale != 1.0):
+                        parsed_object.bounding_box.scale_box(image_scale)
+                    break
 
         # Parse the cuboid in image space
         if ('projected_cuboid' in json_obj):
@@ -383,11 +1219,18 @@ class AnnotatedObjectInfo(SceneObject):
             # print('img_width: {} - img_height: {}'.format(img_width, img_height))
             # print('cuboid2d_vertices: {}'.format(cuboid2d_vertices))
             parsed_object.cuboid2d = Cuboid2d(cuboid2d_vertices)
+            if (image_scale != 1.0):
+                parsed_object.cuboid2d.scale_vertices(image_scale)
 
         # Parse the keypoints
         if ('keypoints' in json_obj):
             annotated_keypoints_json_data = json_obj['keypoints']
             for check_keypoint_json_obj in annotated_keypoints_json_data:
+                if (image_scale != 1.0) and ('projected_location' in check_keypoint_json_obj):
+                    # NOTE: Scale a copy of the keypoint so the json data is not modified
+                    check_keypoint_json_obj = dict(check_keypoint_json_obj)
+                    check_keypoint_json_obj['projected_location'] = list(
+                        image_scale * coordinate for coordinate in check_keypoint_json_obj['projected_location'])
                 parsed_object.keypoints.append(check_keypoint_json_obj)
 
         parsed_object.update_transform()
@@ -407,33 +1250,98 @@ class AnnotatedObjectInfo(SceneObject):
         self.quaternion = new_quaternion
         self.is_modified = True
 
-    def update_transform(self):
-        self.set_relative_transform(self.location, self.quaternion)
+    @property
+    def cuboid3d(self):
+        if (self._cuboid3d is None) and not (self.object_settings is None):
+            self._cuboid3d = self.object_settings.create_cuboid3d()
+            self._update_cuboid3d_transform()
+        return self._cuboid3d
 
-        # print('update_transform: location: {} - quaternion: {}'.format(self.location, self.quaternion))
-        should_show = not (self.location is None) and not (self.quaternion is None)
-        if (not self.mesh is None) and should_show:
-            self.mesh.set_relative_transform(self.location, self.quaternion)
+    @property
+    def mesh(self):
+        if (self._mesh is None) and not (self.object_settings is None):
+            self._mesh = self.object_settings.create_mesh()
+            self._update_mesh_transform()
+        return self._mesh
 
-        if (not self.cuboid3d is None) and should_show:
+    @property
+    def pivot_axis(self):
+        if (self._pivot_axis is None) and not (self.object_settings is None):
+            self._pivot_axis = self.object_settings.create_pivot_axis()
+            self._update_pivot_axis_transform()
+        return self._pivot_axis
+
+    def has_valid_transform(self):
+        return not (self.location is None) and not (self.quaternion is None)
+
+    def _update_cuboid3d_transform(self):
+        if (not self._cuboid3d is None) and self.has_valid_transform():
             cuboid_location = self.cuboid_center if (not self.cuboid_center is None) else self.location
-            # self.cuboid3d.set_relative_transform(self.location, self.quaternion)
-            self.cuboid3d.set_relative_transform(cuboid_location, self.quaternion)
+            # self._cuboid3d.set_relative_transform(self.location, self.quaternion)
+            self._cuboid3d.set_relative_transform(cuboid_location, self.quaternion)
 
-        if (not self.pivot_axis is None) and should_show:
-            self.pivot_axis.set_relative_transform(self.location, self.quaternion)
+    def _update_mesh_transform(self):
+        if (not self._mesh is None) and self.has_valid_transform():
+            self._mesh.set_relative_transform(self.location, self.quaternion)
+
+    def _update_pivot_axis_transform(self):
+        if (not self._pivot_axis is None) and self.has_valid_transform():
+            self._pivot_axis.set_relative_transform(self.location, self.quaternion)
+
+    def update_transform(self):
+        if self.has_valid_transform():
+            self.set_relative_transform(self.location, self.quaternion)
+
+        # print('update_transform: location: {} - quaternion: {}'.format(self.location, self.quaternion))
+        # NOTE: The cuboid 3d, mesh and pivot axis which are not created yet get the transform when they are created
+        self._update_mesh_transform()
+        self._update_cuboid3d_transform()
+        self._update_pivot_axis_transform()
+        # NOTE: Compute the matrices of the object and its parts in one batch
+        update_transform_matrices(list(scene_object._relative_transform
+            for scene_object in (self, self._mesh, self._cuboid3d, self._pivot_axis) if not (scene_object is None)))
 
         self.is_modified = False
 
+# =============================== LazyAnnotatedObjectList ===============================
+class LazyAnnotatedObjectList(collections.abc.Sequence):
+    """List of AnnotatedObjectInfo which only parse each object's json data when the object is accessed"""
+    def __init__(self, dataset_settings, objects_json_data, image_scale=1.0):
+        self._dataset_settings = dataset_settings
+        self._objects_json_data = objects_json_data
+        self._image_scale = image_scale
+        self._parsed_objects = [None] * len(objects_json_data)
+
+    def __len__(self):
+        return len(self._objects_json_data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self[check_index] for check_index in range(*index.indices(len(self))))
+        parsed_object = self._parsed_objects[index]
+        if (parsed_object is None):
+            parsed_object = AnnotatedObjectInfo.parse_from_json_object(self._dataset_settings, self._objects_json_data[index], self._image_scale)
+            self._parsed_objects[index] = parsed_object
+        return parsed_object
+
+    def get_object_json_data(self, index):
+        """Get the raw json data of an object without parsing it"""
+        return self._objects_json_data[index]
+
 # =============================== AnnotatedSceneInfo ===============================
 class AnnotatedSceneInfo(object):
     """Annotation data of a scene"""
+    # Approximated number of bytes used by each parsed object
+    OBJECT_SIZE_ESTIMATE = 2048
+
     def __init__(self, dataset_settings):
         self.source_file_path = ""
         self.dataset_settings = dataset_settings
         self.objects = []
         # Numpy array of pixel data
         self.image_data = None
+        # Scale of the image space annotations relative to the captured image, e.g: 0.5 when the image is decoded at half resolution
+        self.image_scale = 1.0
         self.camera_intrinsics = None
 
     def get_object_info(self, object_class_name):
@@ -447,14 +1355,112 @@ class AnnotatedSceneInfo(object):
         self.image_data = new_image_numpy_data
         # print("set_image_data: {}".format(self.image_data.shape))
 
+    # Approximated number of bytes used by the scene's data
+    @property
+    def nbytes(self):
+        image_size = self.image_data.nbytes if not (self.image_data is None) else 0
+        return image_size + self.OBJECT_SIZE_ESTIMATE * len(self.objects)
+
+    def get_projected_cuboids(self, camera_intrinsic_matrix=None):
+        """Project the cuboids of all the objects into the image in one batch, see project_cuboids
+        camera_intrinsic_matrix: the scene's camera intrinsics are used if not specified
+        Return:
+            (projected_vertices, is_valid): (N, 9, 2) array and (N, 9) mask in the objects' order,
+            the objects without class settings or pose are NaN and not valid
+        """
+        if (camera_intrinsic_matrix is None):
+            if (self.camera_intrinsics is None):
+                raise Exception("Can't project the cuboids of the scene without camera intrinsics: {}".format(self.source_file_path))
+            camera_intrinsic_matrix = self.camera_intrinsics.get_intrinsic_matrix()
+
+        object_count = len(self.objects)
+        cuboid_vertices = np.full((object_count, CuboidVertexType.TotalVertexCount, 3), np.nan)
+        cuboid_locations = np.full((object_count, 3), np.nan)
+        cuboid_quaternions = np.full((object_count, 4), np.nan)
+        for object_index, check_object in enumerate(self.objects):
+            if (check_object is None) or (check_object.object_settings is None) or not check_object.has_valid_transform():
+                continue
+            # NOTE: Same transform as AnnotatedObjectInfo's cuboid 3d
+            cuboid_vertices[object_index] = check_object.object_settings.cuboid3d.get_vertices()
+            cuboid_locations[object_index] = check_object.cuboid_center if not (check_object.cuboid_center is None) else check_object.location
+            cuboid_quaternions[object_index] = check_object.quaternion
+        return project_cuboids(cuboid_vertices, poses_to_matrices(cuboid_locations, cuboid_quaternions), camera_intrinsic_matrix)
+
+    def get_image_size(self):
+        """Get the (width, height) of the scene's image space, the image space annotations are in it"""
+        if not (self.image_data is None):
+            return self.image_data.shape[1], self.image_data.shape[0]
+        if not (self.camera_intrinsics is None):
+            return self.camera_intrinsics.res_width, self.camera_intrinsics.res_height
+        captured_width, captured_height = self.dataset_settings.exporter_settings.captured_image_size
+        return captured_width * self.image_scale, captured_height * self.image_scale
+
+    def get_annotated_boxes(self):
+        """Get the annotated 2d boxes of the objects as a (N, 4) array of [left, top, right, bottom], NaN for the objects without box"""
+        boxes = np.full((len(self.objects), 4), np.nan)
+        for object_index, check_object in enumerate(self.objects):
+            if not (check_object is None) and not (check_object.bounding_box is None):
+                boxes[object_index] = check_object.bounding_box.to_array()
+        return boxes
+
+    def get_cuboid_boxes(self, camera_intrinsic_matrix=None, clip=True):
+        """Get the 2d boxes around the projected cuboids of the objects
+        Return:
+            (boxes, truncations): (N, 4) array and the (N,) ratio of each box outside of the image, see clip_boxes
+        """
+        projected_cuboids, is_valid = self.get_projected_cuboids(camera_intrinsic_matrix)
+        boxes = get_boxes_from_cuboids(projected_cuboids, is_valid)
+        if not clip:
+            return boxes, np.zeros(len(boxes))
+        image_width, image_height = self.get_image_size()
+        return clip_boxes(boxes, image_width, image_height)
+
+    def get_mesh_boxes(self, camera_intrinsic_matrix=None, clip=True, use_initial_matrix=True):
+        """Get the tight 2d boxes around the projected meshes of the objects (NaN if the mesh file doesn't exist)
+        Return:
+            (boxes, truncations): see get_cuboid_boxes
+        """
+        if (camera_intrinsic_matrix is None):
+            if (self.camera_intrinsics is None):
+                raise Exception("Can't project the meshes of the scene without camera intrinsics: {}".format(self.source_file_path))
+            camera_intrinsic_matrix = self.camera_intrinsics.get_intrinsic_matrix()
+
+        boxes = np.full((len(self.objects), 4), np.nan)
+        # Group the objects by mesh so each mesh is projected in one batch
+        mesh_object_indexes = collections.OrderedDict()
+        for object_index, check_object in enumerate(self.objects):
+            if (check_object is None) or (check_object.object_settings is None) or not check_object.has_valid_transform():
+                continue
+            mesh_object_indexes.setdefault(check_object.object_settings, []).append(object_index)
+
+        for obj_settings, object_indexes in mesh_object_indexes.items():
+            if not path.exists(obj_settings.mesh_file_path):
+                continue
+            locations = list(self.objects[object_index].location for object_index in object_indexes)
+            quaternions = list(self.objects[object_index].quaternion for object_index in object_indexes)
+            initial_matrix = obj_settings.initial_matrix if use_initial_matrix else None
+            boxes[object_indexes] = get_boxes_from_mesh_vertices(load_mesh_vertices(obj_settings.mesh_file_path),
+                poses_to_matrices(locations, quaternions), camera_intrinsic_matrix, initial_matrix)
+
+        if not clip:
+            return boxes, np.zeros(len(boxes))
+        image_width, image_height = self.get_image_size()
+        return clip_boxes(boxes, image_width, image_height)
+
     def get_scene_info_str(self):
         info_str = path.splitext(path.basename(self.source_file_path))[0]
         return info_str
 
     # Parse and create an annotated scene from a json object
+    # object_fields: if specified, only these fields of each object are parsed (the 'class' field is always parsed)
+    #   e.g: ['location', 'quaternion_xyzw']
+    # lazy: if True, each AnnotatedObjectInfo is only created when it's accessed
+    # image_scale: scale of image_data relative to the captured image, the image space annotations
+    #   (projected cuboid, keypoints) are scaled by it so they stay aligned with the image. e.g: 0.25 for a 1/4 resolution image
     @classmethod
-    def create_from_json_data(cls, dataset_settings, frame_json_data, image_data):
+    def create_from_json_data(cls, dataset_settings, frame_json_data, image_data, object_fields=None, lazy=False, image_scale=1.0):
         parsed_scene = AnnotatedSceneInfo(dataset_settings)
+        parsed_scene.image_scale = image_scale
 
         # self.camera_intrinsics = dataset_settings.camera_intrinsics
         if ('view_data' in frame_json_data):
@@ -468,9 +1474,18 @@ class AnnotatedSceneInfo(object):
         parsed_scene.objects = []
         try:
             objects_data = frame_json_data['objects']
-            for check_obj_info in objects_data:
-                new_obj = AnnotatedObjectInfo.parse_from_json_object(dataset_settings, check_obj_info)
-                parsed_scene.objects.append(new_obj)
+            if not (object_fields is None):
+                selected_fields = set(object_fields)
+                selected_fields.add('class')
+                objects_data = list(dict((field_name, field_value) for field_name, field_value in check_obj_info.items()
+                                        if field_name in selected_fields) for check_obj_info in objects_data)
+
+            if lazy:
+                parsed_scene.objects = LazyAnnotatedObjectList(dataset_settings, objects_data, image_scale)
+            else:
+                for check_obj_info in objects_data:
+                    new_obj = AnnotatedObjectInfo.parse_from_json_object(dataset_settings, check_obj_info, image_scale)
+                    parsed_scene.objects.append(new_obj)
         except KeyError:
             print("*** Error ***:  'objects' is not present in annotation file.  No annotations will be displayed.")
 
@@ -483,15 +1498,20 @@ class AnnotatedSceneInfo(object):
         return parsed_scene
 
     # Parse and create an annotated scene from a json object
+    # image_downscale: decode the image at 1/image_downscale of its resolution (1, 2, 4 or 8)
+    # scale_annotations: if True, the image space annotations are scaled to match the downscaled image
+    # preview_image_file_path: path of the cached downscaled copy of the image, see read_preview_image
     @classmethod
-    def create_from_file(cls, dataset_settings, frame_file_path, image_file_path=""):
-        json_data = json.load(open(frame_file_path))
+    def create_from_file(cls, dataset_settings, frame_file_path, image_file_path="", object_fields=None, lazy=False,
+            image_downscale=1, scale_annotations=True, preview_image_file_path=None):
+        json_data = load_json_file(frame_file_path)
+        image_data = None
         if (path.exists(image_file_path)):
-            image_data = np.array(cv2.imread(image_file_path))
+            image_data = read_preview_image(image_file_path, image_downscale, preview_image_file_path)
+        if not (image_data is None):
             image_data = image_data[:,:,::-1] # Reorder color channels to be RGB
-        else:
-            image_data = None
 
-        new_scene_info = cls.create_from_json_data(dataset_settings, json_data, image_data)
+        image_scale = 1.0 / image_downscale if scale_annotations else 1.0
+        new_scene_info = cls.create_from_json_data(dataset_settings, json_data, image_data, object_fields, lazy, image_scale)
         new_scene_info.source_file_path = frame_file_path
         return new_scene_info
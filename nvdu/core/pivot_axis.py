@@ -7,16 +7,26 @@ from .scene_object import *
 # ========================= Cuboid2d =========================
 class PivotAxis(SceneObject):
     """Object represent a pivot axis in 3d space"""
-    def __init__(self, in_size3d = [1.0, 1.0, 1.0], in_parent_object = None):
+    __slots__ = ['size3d', 'origin_loc', 'x_axis', 'y_axis', 'z_axis']
+
+    # in_shared_pivot_axis: another pivot axis with the same size, its vertexes are used instead of generating new ones
+    def __init__(self, in_size3d = [1.0, 1.0, 1.0], in_parent_object = None, in_shared_pivot_axis = None):
         super(PivotAxis, self).__init__(in_parent_object)
 
         self.size3d = in_size3d
-        self.generate_vertexes()
+        if (in_shared_pivot_axis is None):
+            self.generate_vertexes()
+        else:
+            self.origin_loc = in_shared_pivot_axis.origin_loc
+            self.x_axis = in_shared_pivot_axis.x_axis
+            self.y_axis = in_shared_pivot_axis.y_axis
+            self.z_axis = in_shared_pivot_axis.z_axis
 
     def generate_vertexes(self):
-        self.origin_loc = [0.0, 0.0, 0.0]
+        # NOTE: The vertexes can be shared between many pivot axes so they are stored as tuples
+        self.origin_loc = (0.0, 0.0, 0.0)
         x, y, z = self.size3d
-        self.x_axis = [x, 0.0, 0.0]
-        self.y_axis = [0.0, y, 0.0]
-        self.z_axis = [0.0, 0.0, z]
+        self.x_axis = (x, 0.0, 0.0)
+        self.y_axis = (0.0, y, 0.0)
+        self.z_axis = (0.0, 0.0, z)
 
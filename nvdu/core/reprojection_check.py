@@ -0,0 +1,323 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+import os
+from os import path
+import csv
+import json
+import numpy as np
+
+from .cuboid import *
+from .camera import *
+from .json_backend import *
+from .frame_loader import *
+from .nvdu_data import *
+
+# =============================== Reprojection check ===============================
+# Reproject the 3d annotations of the objects (pose + class cuboid, keypoint locations) with the camera intrinsics
+# and measure how far (in pixels) they are from the annotated 2d data (projected_cuboid, keypoints' projected_location)
+DEFAULT_CHECK_CHUNK_SIZE = 256
+DEFAULT_WORST_OBJECT_COUNT = 20
+
+# Settings parsed by each worker process: (object settings path, camera settings path) => (DatasetSettings, intrinsic matrix)
+_worker_settings_cache = {}
+# Cuboid vertices of each class parsed by each worker process: (object settings path, class name) => (9, 3) array or None
+_worker_class_vertices_cache = {}
+
+def _get_worker_settings(object_settings_path, camera_settings_path):
+    settings_key = (object_settings_path, camera_settings_path)
+    if not (settings_key in _worker_settings_cache):
+        dataset_settings = DatasetSettings.parse_from_file(object_settings_path)
+        camera_intrinsics = CameraIntrinsicSettings.from_json_file(camera_settings_path)
+        intrinsic_matrix = camera_intrinsics.get_intrinsic_matrix() if not (camera_intrinsics is None) else None
+        _worker_settings_cache[settings_key] = (dataset_settings, intrinsic_matrix)
+    return _worker_settings_cache[settings_key]
+
+def _get_class_cuboid_vertices(dataset_settings, object_settings_path, class_name):
+    class_key = (object_settings_path, class_name)
+    if not (class_key in _worker_class_vertices_cache):
+        class_settings = dataset_settings.get_object_settings(class_name) if not (dataset_settings is None) else None
+        _worker_class_vertices_cache[class_key] = class_settings.cuboid3d.get_vertices() if not (class_settings is None) else None
+    return _worker_class_vertices_cache[class_key]
+
+def _get_json_points(json_points, point_count, point_size):
+    points = np.full((point_count, point_size), np.nan)
+    if json_points:
+        json_points = np.array(json_points, dtype=np.float64).reshape(-1, point_size)[:point_count]
+        points[:len(json_points)] = json_points
+    return points
+
+def check_frame_chunk(chunk):
+    """Measure the reprojection errors of the objects in a chunk of frames, this function run in the worker processes
+    Args:
+        chunk: (object_settings_path, camera_settings_path, [(frame_index, annotation_file_path), ...]),
+            all the frames of a chunk share the same settings
+    Return:
+        dict of the per object arrays: 'frame_indexes', 'object_indexes', 'class_names' (list),
+        'cuboid_mean_errors', 'cuboid_max_errors', 'keypoint_max_errors' - NaN when there is nothing to compare
+    """
+    object_settings_path, camera_settings_path, frame_requests = chunk
+    dataset_settings, intrinsic_matrix = _get_worker_settings(object_settings_path, camera_settings_path)
+
+    frame_indexes = []
+    object_indexes = []
+    class_names = []
+    cuboid_vertices = []
+    cuboid_locations = []
+    cuboid_quaternions = []
+    annotated_cuboids = []
+    keypoint_locations = []
+    keypoint_projected_locations = []
+    keypoint_owner_indexes = []
+    missing_vertices = np.full((CuboidVertexType.TotalVertexCount, 3), np.nan)
+    for frame_index, annotation_file_path in frame_requests:
+        try:
+            frame_json_data = load_json_file(annotation_file_path)
+        except (OSError, ValueError) as ex:
+            print("Can't read annotation file: {} - {}".format(annotation_file_path, ex))
+            continue
+
+        for object_index, check_obj in enumerate(frame_json_data.get('objects', [])):
+            owner_index = len(frame_indexes)
+            class_name = check_obj.get('class', '')
+            frame_indexes.append(frame_index)
+            object_indexes.append(object_index)
+            class_names.append(class_name)
+
+            class_vertices = _get_class_cuboid_vertices(dataset_settings, object_settings_path, class_name)
+            cuboid_vertices.append(class_vertices if not (class_vertices is None) else missing_vertices)
+            # NOTE: Same transform as AnnotatedObjectInfo's cuboid 3d, placed at the cuboid centroid if there is one
+            cuboid_location = check_obj.get('cuboid_centroid', check_obj.get('location'))
+            cuboid_locations.append(cuboid_location if cuboid_location else [np.nan] * 3)
+            cuboid_quaternion = check_obj.get('quaternion_xyzw')
+            cuboid_quaternions.append(cuboid_quaternion if cuboid_quaternion else [np.nan] * 4)
+
+            annotated_cuboid = _get_json_points(check_obj.get('projected_cuboid'), CuboidVertexType.TotalVertexCount, 2)
+            if ('projected_cuboid_centroid' in check_obj):
+                annotated_cuboid[CuboidVertexType.Center] = check_obj['projected_cuboid_centroid']
+            annotated_cuboids.append(annotated_cuboid)
+
+            for check_keypoint in check_obj.get('keypoints', []):
+                if ('location' in check_keypoint) and ('projected_location' in check_keypoint):
+                    keypoint_locations.append(check_keypoint['location'])
+                    keypoint_projected_locations.append(check_keypoint['projected_location'])
+                    keypoint_owner_indexes.append(owner_index)
+
+    object_count = len(frame_indexes)
+    cuboid_mean_errors = np.full(object_count, np.nan, dtype=np.float32)
+    cuboid_max_errors = np.full(object_count, np.nan, dtype=np.float32)
+    keypoint_max_errors = np.full(object_count, np.nan, dtype=np.float32)
+    if (object_count > 0) and not (intrinsic_matrix is None):
+        projected_cuboids, is_valid = project_cuboids(np.array(cuboid_vertices),
+            poses_to_matrices(cuboid_locations, cuboid_quaternions), intrinsic_matrix)
+        vertex_errors = np.linalg.norm(projected_cuboids - np.array(annotated_cuboids), axis=-1)
+        # Only compare the vertices which are in front of the camera and annotated
+        is_compared = is_valid & ~np.isnan(vertex_errors)
+        compared_counts = is_compared.sum(axis=-1)
+        has_compared = compared_counts > 0
+        vertex_errors[~is_compared] = 0.0
+        cuboid_mean_errors[has_compared] = vertex_errors.sum(axis=-1)[has_compared] / compared_counts[has_compared]
+        cuboid_max_errors[has_compared] = vertex_errors.max(axis=-1)[has_compared]
+
+        if keypoint_owner_indexes:
+            projected_keypoints, is_keypoint_valid = project_points(np.array(keypoint_locations, dtype=np.float64)[np.newaxis],
+                intrinsic_matrix)
+            keypoint_errors = np.linalg.norm(projected_keypoints[0] - np.array(keypoint_projected_locations, dtype=np.float64), axis=-1)
+            is_keypoint_compared = is_keypoint_valid[0] & ~np.isnan(keypoint_errors)
+            np.fmax.at(keypoint_max_errors, np.array(keypoint_owner_indexes)[is_keypoint_compared],
+                keypoint_errors[is_keypoint_compared].astype(np.float32))
+
+    return {
+        'frame_indexes': np.array(frame_indexes, dtype=np.int64),
+        'object_indexes': np.array(object_indexes, dtype=np.int32),
+        'class_names': class_names,
+        'cuboid_mean_errors': cuboid_mean_errors,
+        'cuboid_max_errors': cuboid_max_errors,
+        'keypoint_max_errors': keypoint_max_errors,
+    }
+
+def get_check_chunks(dataset, frame_indexes, chunk_size=DEFAULT_CHECK_CHUNK_SIZE, object_settings_path=None, camera_settings_path=None):
+    """Split the frames into the chunks sent to check_frame_chunk, the frames of a chunk are in the same subset
+    object_settings_path, camera_settings_path: override the settings files of the dataset's subsets
+    """
+    chunk_size = max(1, chunk_size)
+    frame_requests = []
+    chunk_settings = None
+    for frame_index in frame_indexes:
+        frame_subset = dataset.get_subset_of_frame(frame_index)
+        if (frame_subset is None):
+            continue
+        frame_settings = (object_settings_path if object_settings_path else frame_subset.object_setting_file_path,
+                          camera_settings_path if camera_settings_path else frame_subset.camera_setting_file_path)
+        if frame_requests and ((frame_settings != chunk_settings) or (len(frame_requests) >= chunk_size)):
+            yield chunk_settings + (frame_requests,)
+            frame_requests = []
+        chunk_settings = frame_settings
+        frame_name = dataset.get_frame_name_from_index(frame_index)
+        frame_requests.append((frame_index, dataset.get_annotation_file_path_of_frame(frame_name)))
+    if frame_requests:
+        yield chunk_settings + (frame_requests,)
+
+def check_dataset_reprojection(dataset, frame_indexes=None, chunk_size=DEFAULT_CHECK_CHUNK_SIZE, process_count=None,
+        object_settings_path=None, camera_settings_path=None):
+    """Measure the reprojection errors of all the objects in a dataset using a process pool
+    Return:
+        ReprojectionReport
+    """
+    if not dataset.is_scanned:
+        dataset.scan()
+    if (frame_indexes is None):
+        frame_indexes = range(dataset.frame_count)
+
+    chunks = get_check_chunks(dataset, frame_indexes, chunk_size, object_settings_path, camera_settings_path)
+    chunk_results = list(map_chunks_in_processes(check_frame_chunk, chunks, process_count))
+    return ReprojectionReport(chunk_results, dataset.get_frame_name_from_index)
+
+# =============================== ReprojectionReport ===============================
+class ReprojectionReport(object):
+    """Reprojection errors (in pixels) of all the checked objects and their statistics"""
+    def __init__(self, chunk_results, get_frame_name_func=None):
+        """
+        Args:
+            chunk_results: list of the results of check_frame_chunk
+            get_frame_name_func: function(frame_index) => frame name, used in the reports
+        """
+        self._get_frame_name = get_frame_name_func if not (get_frame_name_func is None) else str
+
+        self.class_names = []
+        class_ids_by_name = {}
+        class_ids = []
+        for chunk_result in chunk_results:
+            for class_name in chunk_result['class_names']:
+                if not (class_name in class_ids_by_name):
+                    class_ids_by_name[class_name] = len(self.class_names)
+                    self.class_names.append(class_name)
+                class_ids.append(class_ids_by_name[class_name])
+        self.class_ids = np.array(class_ids, dtype=np.int32)
+
+        def concatenate_arrays(array_name, dtype):
+            arrays = list(chunk_result[array_name] for chunk_result in chunk_results)
+            return np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtype)
+        self.frame_indexes = concatenate_arrays('frame_indexes', np.int64)
+        self.object_indexes = concatenate_arrays('object_indexes', np.int32)
+        self.cuboid_mean_errors = concatenate_arrays('cuboid_mean_errors', np.float32)
+        self.cuboid_max_errors = concatenate_arrays('cuboid_max_errors', np.float32)
+        self.keypoint_max_errors = concatenate_arrays('keypoint_max_errors', np.float32)
+
+    @property
+    def object_count(self):
+        return len(self.frame_indexes)
+
+    @property
+    def max_errors(self):
+        """Worst error of each object between its cuboid and keypoints, NaN if the object has nothing to compare"""
+        return np.fmax(self.cuboid_max_errors, self.keypoint_max_errors)
+
+    @staticmethod
+    def get_error_stats(errors, max_error=None):
+        """Get the statistics of a list of errors, the NaN errors are only counted as not checked"""
+        checked_errors = errors[~np.isnan(errors)]
+        error_stats = {
+            'object_count': int(len(errors)),
+            'checked_object_count': int(len(checked_errors)),
+        }
+        if (len(checked_errors) > 0):
+            error_stats['mean_error'] = float(np.mean(checked_errors))
+            error_stats['median_error'] = float(np.median(checked_errors))
+            error_stats['p95_error'] = float(np.percentile(checked_errors, 95))
+            error_stats['max_error'] = float(np.max(checked_errors))
+        if not (max_error is None):
+            error_stats['failed_object_count'] = int(np.count_nonzero(checked_errors > max_error))
+        return error_stats
+
+    def get_summary(self, max_error=None):
+        summary = self.get_error_stats(self.max_errors, max_error)
+        summary['frame_count'] = int(len(np.unique(self.frame_indexes)))
+        return summary
+
+    def get_class_stats(self, max_error=None):
+        """Get the error statistics of each class: list of dict sorted by class name"""
+        max_errors = self.max_errors
+        class_stats = []
+        for class_id in np.argsort(self.class_names):
+            check_class_stats = {'class': self.class_names[class_id]}
+            check_class_stats.update(self.get_error_stats(max_errors[self.class_ids == class_id], max_error))
+            class_stats.append(check_class_stats)
+        return class_stats
+
+    def get_frame_stats(self):
+        """Get the error statistics of each frame: (frame_indexes, object_counts, mean_errors, max_errors) arrays
+        NOTE: Only the frames with objects are listed
+        """
+        frame_indexes, object_frame_ids = np.unique(self.frame_indexes, return_inverse=True)
+        object_counts = np.bincount(object_frame_ids, minlength=len(frame_indexes))
+
+        max_errors = self.max_errors
+        is_checked = ~np.isnan(max_errors)
+        checked_counts = np.bincount(object_frame_ids[is_checked], minlength=len(frame_indexes))
+        error_sums = np.bincount(object_frame_ids[is_checked], weights=max_errors[is_checked], minlength=len(frame_indexes))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frame_mean_errors = np.where(checked_counts > 0, error_sums / checked_counts, np.nan)
+        frame_max_errors = np.full(len(frame_indexes), np.nan)
+        np.fmax.at(frame_max_errors, object_frame_ids[is_checked], max_errors[is_checked])
+        return frame_indexes, object_counts, frame_mean_errors, frame_max_errors
+
+    def get_worst_objects(self, count=DEFAULT_WORST_OBJECT_COUNT):
+        """Get the objects with the biggest errors: list of dict sorted from the worst object"""
+        max_errors = self.max_errors
+        checked_object_ids = np.flatnonzero(~np.isnan(max_errors))
+        count = min(count, len(checked_object_ids))
+        if (count <= 0):
+            return []
+        worst_object_ids = checked_object_ids[np.argpartition(-max_errors[checked_object_ids], count - 1)[:count]]
+        worst_object_ids = worst_object_ids[np.argsort(-max_errors[worst_object_ids], kind='stable')]
+
+        def get_error_value(error):
+            return None if np.isnan(error) else float(error)
+        return list({
+            'frame': self._get_frame_name(int(self.frame_indexes[object_id])),
+            'object_index': int(self.object_indexes[object_id]),
+            'class': self.class_names[self.class_ids[object_id]],
+            'max_error': float(max_errors[object_id]),
+            'cuboid_mean_error': get_error_value(self.cuboid_mean_errors[object_id]),
+            'cuboid_max_error': get_error_value(self.cuboid_max_errors[object_id]),
+            'keypoint_max_error': get_error_value(self.keypoint_max_errors[object_id]),
+        } for object_id in worst_object_ids)
+
+    def save(self, output_dir_path, max_error=None, worst_object_count=DEFAULT_WORST_OBJECT_COUNT):
+        """Save the report into a directory: report.json (summary, per class stats and worst objects),
+        frames.csv, classes.csv and worst_objects.csv
+        """
+        os.makedirs(output_dir_path, exist_ok=True)
+        summary = self.get_summary(max_error)
+        class_stats = self.get_class_stats(max_error)
+        worst_objects = self.get_worst_objects(worst_object_count)
+
+        with open(path.join(output_dir_path, 'report.json'), 'w') as report_file:
+            json.dump({'max_error': max_error, 'summary': summary, 'classes': class_stats, 'worst_objects': worst_objects},
+                report_file, indent=2)
+
+        frame_indexes, object_counts, frame_mean_errors, frame_max_errors = self.get_frame_stats()
+        with open(path.join(output_dir_path, 'frames.csv'), 'w', newline='') as csv_file:
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(['frame', 'object_count', 'mean_error', 'max_error'])
+            for frame_index, object_count, mean_error, frame_max_error in zip(frame_indexes, object_counts, frame_mean_errors, frame_max_errors):
+                csv_writer.writerow([self._get_frame_name(int(frame_index)), int(object_count),
+                    '' if np.isnan(mean_error) else '{:.4f}'.format(mean_error),
+                    '' if np.isnan(frame_max_error) else '{:.4f}'.format(frame_max_error)])
+
+        class_fields = ['class', 'object_count', 'checked_object_count', 'mean_error', 'median_error', 'p95_error', 'max_error']
+        if not (max_error is None):
+            class_fields.append('failed_object_count')
+        with open(path.join(output_dir_path, 'classes.csv'), 'w', newline='') as csv_file:
+            csv_writer = csv.DictWriter(csv_file, class_fields)
+            csv_writer.writeheader()
+            csv_writer.writerows(class_stats)
+
+        with open(path.join(output_dir_path, 'worst_objects.csv'), 'w', newline='') as csv_file:
+            csv_writer = csv.DictWriter(csv_file, ['frame', 'object_index', 'class', 'max_error',
+                'cuboid_mean_error', 'cuboid_max_error', 'keypoint_max_error'])
+            csv_writer.writeheader()
+            csv_writer.writerows(worst_objects)
+        return summary
@@ -9,16 +9,27 @@ from .utils3d import *
 from .transform3d import *
 
 class SceneObject(object):
+    __slots__ = ['_relative_transform', '_child_objects', 'parent_object', '_world_transform_matrix']
+
     def __init__(self, in_parent_object = None):
         # Relative transform relate to the parent object
-        self._relative_transform = transform3d()
+        # NOTE: The transform is only allocated when it's needed, None mean the identity transform
+        self._relative_transform = None
 
         # List of child object attached to this scene object
-        self.child_objects = []
+        self._child_objects = None
         # The object which this object is attached to
-        self.parent_object = in_parent_object
+        self.parent_object = None
+        # Cached world transform matrix, None when it need to be computed again
+        self._world_transform_matrix = None
         self.attach_to_object(in_parent_object)
 
+    @property
+    def child_objects(self):
+        if (self._child_objects is None):
+            self._child_objects = []
+        return self._child_objects
+
     def attach_to_object(self, new_parent_object):
         if (self.parent_object):
             self.parent_object.remove_child_object(self)
@@ -26,6 +37,7 @@ class SceneObject(object):
         self.parent_object = new_parent_object
         if (self.parent_object):
             self.parent_object.child_objects.append(self)
+        self.mark_world_transform_dirty()
     
     def remove_child_object(self, child_object_to_be_removed):
         print('***********************************')
@@ -36,19 +48,40 @@ class SceneObject(object):
                 pass        
 
     def set_relative_transform(self, new_location, new_quaternion):
-        self._relative_transform.set_location(new_location)
-        self._relative_transform.set_quaternion(new_quaternion)
+        relative_transform = self.get_relative_transform()
+        relative_transform.set_location(new_location)
+        relative_transform.set_quaternion(new_quaternion)
 
     def get_relative_transform(self):
+        if (self._relative_transform is None):
+            self._relative_transform = transform3d(self)
         return self._relative_transform
 
     def get_relative_transform_matrix(self):
+        if (self._relative_transform is None):
+            return Matrix44.identity()
         return self._relative_transform.to_matrix()
 
+    def on_relative_transform_changed(self):
+        self.mark_world_transform_dirty()
+
+    def mark_world_transform_dirty(self):
+        """Make the world transform of this object and all its children be computed again when it's needed"""
+        dirty_objects = [self]
+        while dirty_objects:
+            check_object = dirty_objects.pop()
+            check_object._world_transform_matrix = None
+            # NOTE: The children of a dirty object are always dirty, only go down to the children which have a cached matrix
+            if check_object._child_objects:
+                dirty_objects.extend(child_object for child_object in check_object._child_objects
+                    if not (child_object._world_transform_matrix is None))
+
     def get_world_transform_matrix(self):
-        """Get the World-to-Object transform matrix"""
-        if (self.parent_object is None):
-            return self.get_relative_transform_matrix()       
-        parent_world_matrix = self.parent_object.get_world_transform_matrix()
-        world_transform_matrix = parent_world_matrix * self.get_relative_transform_matrix()
-        return world_transform_matrix
+        """Get the World-to-Object transform matrix, it's cached until the object or one of its parents move"""
+        if (self._world_transform_matrix is None):
+            if (self.parent_object is None):
+                self._world_transform_matrix = self.get_relative_transform_matrix()
+            else:
+                parent_world_matrix = self.parent_object.get_world_transform_matrix()
+                self._world_transform_matrix = parent_world_matrix * self.get_relative_transform_matrix()
+        return self._world_transform_matrix
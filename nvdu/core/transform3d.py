@@ -7,46 +7,169 @@ import numpy as np
 
 from .utils3d import *
 
+# =============================== Batched pose to matrix ===============================
+def quaternions_to_matrices33(quaternions, flip_quaternion_xyz = True):
+    """Convert (N, 4) quaternions (x, y, z, w) into (N, 3, 3) rotation matrices, same as pyrr's Matrix33.from_quaternion
+    The quaternions don't need to be normalized, the zero quaternions give the identity rotation
+    flip_quaternion_xyz: flip the sign of the x, y, z part of the quaternions like transform3d does for the NDDS data
+    """
+    quaternions = np.array(quaternions, dtype=np.float64).reshape(-1, 4)
+    if flip_quaternion_xyz:
+        quaternions[:, :3] *= -1.0
+    qx, qy, qz, qw = quaternions.T
+
+    squared_norms = np.einsum('ij,ij->i', quaternions, quaternions)
+    is_zero_quaternion = (squared_norms == 0.0)
+    if is_zero_quaternion.any():
+        qw[is_zero_quaternion] = 1.0
+        squared_norms[is_zero_quaternion] = 1.0
+    inv_squared_norms = 1.0 / squared_norms
+
+    sqx, sqy, sqz, sqw = qx * qx, qy * qy, qz * qz, qw * qw
+    qxy, qzw, qxz, qyw, qyz, qxw = qx * qy, qz * qw, qx * qz, qy * qw, qy * qz, qx * qw
+
+    matrices = np.empty((len(quaternions), 3, 3))
+    matrices[:, 0, 0] = (sqx - sqy - sqz + sqw) * inv_squared_norms
+    matrices[:, 1, 1] = (-sqx + sqy - sqz + sqw) * inv_squared_norms
+    matrices[:, 2, 2] = (-sqx - sqy + sqz + sqw) * inv_squared_norms
+    matrices[:, 1, 0] = 2.0 * (qxy + qzw) * inv_squared_norms
+    matrices[:, 0, 1] = 2.0 * (qxy - qzw) * inv_squared_norms
+    matrices[:, 2, 0] = 2.0 * (qxz - qyw) * inv_squared_norms
+    matrices[:, 0, 2] = 2.0 * (qxz + qyw) * inv_squared_norms
+    matrices[:, 2, 1] = 2.0 * (qyz + qxw) * inv_squared_norms
+    matrices[:, 1, 2] = 2.0 * (qyz - qxw) * inv_squared_norms
+    return matrices
+
+def poses_to_matrices(locations, quaternions, scales = None, flip_quaternion_xyz = True):
+    """Convert N poses into (N, 4, 4) transform matrices in one call
+    The matrices are the same as transform3d's: Matrix44.from_translation(location) * from_scale(scale) * from_quaternion(quaternion)
+    (pyrr's layout: the translation is in the last row)
+    Args:
+        locations: (N, 3) array
+        quaternions: (N, 4) array of (x, y, z, w) quaternions
+        scales: (N, 3) array, no scaling if None
+    """
+    locations = np.asarray(locations, dtype=np.float64).reshape(-1, 3)
+    matrices = np.zeros((len(locations), 4, 4))
+    rotation_matrices = quaternions_to_matrices33(quaternions, flip_quaternion_xyz)
+    if (scales is None):
+        matrices[:, :3, :3] = rotation_matrices
+    else:
+        # NOTE: The row vector convention of pyrr apply the scale to the columns of the rotation matrix
+        matrices[:, :3, :3] = rotation_matrices * np.asarray(scales, dtype=np.float64).reshape(-1, 1, 3)
+    matrices[:, 3, :3] = locations
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+def pose_arrays_to_matrices(pose_arrays, flip_quaternion_xyz = True):
+    """Convert (N, 10) pose arrays, with transform3d's layout (location, quaternion, scale), into (N, 4, 4) transform matrices"""
+    pose_arrays = np.asarray(pose_arrays).reshape(-1, 10)
+    return poses_to_matrices(pose_arrays[:, transform3d.LOCATION_SLICE], pose_arrays[:, transform3d.QUATERNION_SLICE],
+        pose_arrays[:, transform3d.SCALE_SLICE], flip_quaternion_xyz)
+
+def update_transform_matrices(transforms):
+    """Update the transform matrices of many transform3d in one batch, only the changed transforms are updated"""
+    changed_transforms = list(check_transform for check_transform in transforms
+        if not (check_transform is None) and (check_transform.is_changed or (check_transform._transform_matrix is None)))
+    if not changed_transforms:
+        return
+
+    transform_matrices = pose_arrays_to_matrices(np.stack(list(check_transform._pose for check_transform in changed_transforms)))
+    for check_transform, transform_matrix in zip(changed_transforms, transform_matrices):
+        check_transform._transform_matrix = transform_matrix.view(Matrix44)
+        check_transform.is_changed = False
+
 class transform3d():
-    def __init__(self):
-        self.location = Vector3()
-        self.scale = Vector3([1, 1, 1])
-        self.rotation = Rotator([0.0, 0.0, 0.0])
-        self.quaternion = Quaternion([0, 0, 0, 1])
-        self.initial_matrix = Matrix44.identity()
-        
-        self.transform_matrix = Matrix44.identity()
+    # NOTE: Use slots to keep the memory usage low since there is a transform in every scene object
+    __slots__ = ['_pose', '_rotation', '_initial_matrix', '_transform_matrix', 'is_changed', '_owner']
+
+    # Offsets of each part in the pose array
+    LOCATION_SLICE = slice(0, 3)
+    QUATERNION_SLICE = slice(3, 7)
+    SCALE_SLICE = slice(7, 10)
+
+    def __init__(self, owner = None):
+        # The location, quaternion (x, y, z, w) and scale are stored in one small contiguous array
+        self._pose = np.array([0.0, 0.0, 0.0,  0.0, 0.0, 0.0, 1.0,  1.0, 1.0, 1.0])
+        # NOTE: The rotator and the matrices are only allocated when they are needed
+        self._rotation = None
+        self._initial_matrix = None
+        self._transform_matrix = None
         # Flag indicate whether the transformation is modified or not
         self.is_changed = False
+        # The scene object which use this transform, it's notified when the transform change
+        self._owner = owner
+
+    @property
+    def location(self):
+        return self._pose[self.LOCATION_SLICE].view(Vector3)
+
+    @location.setter
+    def location(self, new_location):
+        self._pose[self.LOCATION_SLICE] = new_location
+        self.mark_changed()
+
+    @property
+    def quaternion(self):
+        return self._pose[self.QUATERNION_SLICE].view(Quaternion)
+
+    @quaternion.setter
+    def quaternion(self, new_quaternion):
+        self._pose[self.QUATERNION_SLICE] = new_quaternion
+        self.mark_changed()
+
+    @property
+    def scale(self):
+        return self._pose[self.SCALE_SLICE].view(Vector3)
+
+    @scale.setter
+    def scale(self, new_scale):
+        self._pose[self.SCALE_SLICE] = new_scale
+        self.mark_changed()
+
+    @property
+    def rotation(self):
+        if (self._rotation is None):
+            self._rotation = Rotator([0.0, 0.0, 0.0])
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, new_rotation):
+        self._rotation = new_rotation
+
+    @property
+    def initial_matrix(self):
+        if (self._initial_matrix is None):
+            return Matrix44.identity()
+        return self._initial_matrix
+
+    @initial_matrix.setter
+    def initial_matrix(self, new_initial_matrix):
+        self._initial_matrix = new_initial_matrix
+
+    @property
+    def transform_matrix(self):
+        return self.to_matrix()
 
     def to_matrix(self):
-        if self.is_changed:
+        if self.is_changed or (self._transform_matrix is None):
             self.update_transform_matrix()
 
-        return self.transform_matrix
+        return self._transform_matrix
     
     def update_transform_matrix(self):
-        scale_matrix = Matrix44.from_scale(self.scale)
-        translation_matrix = Matrix44.from_translation(self.location)
-        
         # TODO: For some reason the qx, qy, qz part of the quaternion must be flipped
         # Need to understand why and fix it
         # The change need to be made together with the coordinate conversion in NDDS
-
-        # rotation_matrix = Matrix44.from_quaternion(self.quaternion)
-        qx, qy, qz, qw = self.quaternion
-        test_quaternion = Quaternion([-qx, -qy, -qz, qw])
-        rotation_matrix = Matrix44.from_quaternion(test_quaternion)
-
-        # print('update_transform_matrix: rotation_matrix = {}'.format(rotation_matrix))
-
-        relative_matrix = (translation_matrix * scale_matrix * rotation_matrix)
-        # self.transform_matrix =  relative_matrix * self.initial_matrix
-        self.transform_matrix = relative_matrix
-        # print('update_transform_matrix: transform_matrix = {}'.format(self.transform_matrix))
+        # NOTE: Same as translation_matrix * scale_matrix * rotation_matrix, see poses_to_matrices
+        self._transform_matrix = pose_arrays_to_matrices(self._pose, flip_quaternion_xyz=True)[0].view(Matrix44)
+        # self._transform_matrix =  relative_matrix * self.initial_matrix
+        self.is_changed = False
 
     def mark_changed(self):
         self.is_changed = True
+        if not (self._owner is None):
+            self._owner.on_relative_transform_changed()
 
     # ======================== Rotation ========================
     def set_euler_rotation(self, new_rotation):
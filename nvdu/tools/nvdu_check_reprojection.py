@@ -0,0 +1,59 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+#!/usr/bin/env python
+import argparse
+import sys
+import time
+from os import path
+
+import nvdu
+from nvdu.core.nvdu_data import *
+from nvdu.core.reprojection_check import *
+
+DEFAULT_REPORT_DIR_POSTFIX = '_reprojection_report'
+
+# ============================= MAIN  =============================
+def main():
+    parser = argparse.ArgumentParser(description='NVDU Reprojection Checker')
+    parser.add_argument('dataset_dir', type=str, nargs='?',
+        help="Dataset directory. Default is the current directory", default='.')
+    parser.add_argument('-a', '--data_annot_dir', type=str, help="Directory path - where to find the annotation data. Default is the same directory as the dataset directory", default="")
+    parser.add_argument('-n', '--name_filters', type=str, nargs='*', help="The name filter of each frame. e.g: *.png", default=["*.png"])
+    parser.add_argument('-r', '--recursive', action='store_true', help="If specified, check all the sub-directories of the dataset which have their own object and camera settings files", default=False)
+    parser.add_argument('-o', '--object_settings_path', type=str, help="Object settings file path. Default is the object settings of the dataset (or of each sub-directory)", default=None)
+    parser.add_argument('-c', '--camera_settings_path', type=str, help="Camera settings file path. Default is the camera settings of the dataset (or of each sub-directory)", default=None)
+    parser.add_argument('--output_dir', type=str, help="Directory path - where to save the report. Default is <dataset_dir>{} next to the dataset directory".format(DEFAULT_REPORT_DIR_POSTFIX), default="")
+    parser.add_argument('--max_error', type=float, help="Maximum reprojection error (in pixels) of an object. If specified, the command fail when any object has a bigger error", default=None)
+    parser.add_argument('--worst', type=int, help="Number of worst objects to report", default=DEFAULT_WORST_OBJECT_COUNT)
+    parser.add_argument('--processes', type=int, help="Number of worker processes. Default is the number of cpu cores", default=None)
+    parser.add_argument('--chunk_size', type=int, help="Number of frames checked by each task of the worker processes", default=DEFAULT_CHECK_CHUNK_SIZE)
+
+    args = parser.parse_args()
+    print("args: {}".format(args))
+
+    dataset_dir_path = args.dataset_dir
+    data_annot_dir_path = args.data_annot_dir if (args.data_annot_dir) else dataset_dir_path
+    output_dir_path = args.output_dir if (args.output_dir) else get_dataset_output_dir_path(dataset_dir_path, DEFAULT_REPORT_DIR_POSTFIX)
+
+    dataset = NVDUDataset(dataset_dir_path, data_annot_dir_path, args.name_filters, in_recursive=args.recursive)
+    frame_count = dataset.scan()
+    print("Number of frames in the dataset: {}".format(frame_count))
+
+    start_time = time.time()
+    report = check_dataset_reprojection(dataset, chunk_size=args.chunk_size, process_count=args.processes,
+        object_settings_path=args.object_settings_path, camera_settings_path=args.camera_settings_path)
+    summary = report.save(output_dir_path, args.max_error, args.worst)
+    print("Checked {} objects in {:.1f}s - report: {}".format(report.object_count, time.time() - start_time, output_dir_path))
+    print("Summary: {}".format(summary))
+
+    for worst_object in report.get_worst_objects(min(args.worst, 5)):
+        print("  {frame} - object {object_index} ({class}): {max_error:.2f} px".format(**worst_object))
+
+    if not (args.max_error is None) and (summary.get('failed_object_count', 0) > 0):
+        print("*** Error ***: {} objects have a reprojection error bigger than {} px".format(summary['failed_object_count'], args.max_error))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
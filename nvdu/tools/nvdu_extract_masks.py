@@ -0,0 +1,50 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+#!/usr/bin/env python
+import argparse
+import time
+from os import path
+
+import nvdu
+from nvdu.core.nvdu_data import *
+from nvdu.core.instance_mask import *
+
+DEFAULT_MASK_DIR_POSTFIX = '_instance_masks'
+
+# ============================= MAIN  =============================
+def main():
+    parser = argparse.ArgumentParser(description='NVDU Instance Mask Extractor')
+    parser.add_argument('dataset_dir', type=str, nargs='?',
+        help="Dataset directory. Default is the current directory", default='.')
+    parser.add_argument('-a', '--data_annot_dir', type=str, help="Directory path - where to find the annotation data. Default is the same directory as the dataset directory", default="")
+    parser.add_argument('-n', '--name_filters', type=str, nargs='*', help="The name filter of each frame. e.g: *.png", default=["*.png"])
+    parser.add_argument('-r', '--recursive', action='store_true', help="If specified, extract the masks of all the sub-directories of the dataset which have their own object and camera settings files", default=False)
+    parser.add_argument('-o', '--object_settings_path', type=str, help="Object settings file path. Default is the object settings of the dataset (or of each sub-directory)", default=None)
+    parser.add_argument('--output_dir', type=str, help="Directory path - where to save the masks. Default is <dataset_dir>{} next to the dataset directory".format(DEFAULT_MASK_DIR_POSTFIX), default="")
+    parser.add_argument('--no_rle', action='store_true', help="If specified, only the areas, boxes and visible fractions are extracted, without the run-length encoded masks", default=False)
+    parser.add_argument('--processes', type=int, help="Number of worker processes. Default is the number of cpu cores", default=None)
+    parser.add_argument('--chunk_size', type=int, help="Number of frames processed by each task of the worker processes", default=DEFAULT_MASK_CHUNK_SIZE)
+
+    args = parser.parse_args()
+    print("args: {}".format(args))
+
+    dataset_dir_path = args.dataset_dir
+    data_annot_dir_path = args.data_annot_dir if (args.data_annot_dir) else dataset_dir_path
+    output_dir_path = args.output_dir if (args.output_dir) else get_dataset_output_dir_path(dataset_dir_path, DEFAULT_MASK_DIR_POSTFIX)
+
+    # NOTE: Only the main images are listed as frames, the segmentation images are found next to them
+    dataset = NVDUDataset(dataset_dir_path, data_annot_dir_path, args.name_filters, in_recursive=args.recursive)
+    frame_count = dataset.scan()
+    print("Number of frames in the dataset: {}".format(frame_count))
+
+    start_time = time.time()
+    mask_set = extract_dataset_instance_masks(dataset, chunk_size=args.chunk_size, process_count=args.processes,
+        object_settings_path=args.object_settings_path, encode_rles=not args.no_rle)
+    summary = mask_set.save(output_dir_path)
+    print("Extracted the masks of {} objects in {:.1f}s - output: {}".format(mask_set.object_count, time.time() - start_time, output_dir_path))
+    print("Summary: {}".format(summary))
+
+if __name__ == '__main__':
+    main()
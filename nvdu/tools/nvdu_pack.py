@@ -0,0 +1,38 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+#!/usr/bin/env python
+import argparse
+from os import path
+
+import nvdu
+from nvdu.core.nvdu_data import *
+from nvdu.core.annotation_store import *
+
+DEFAULT_STORE_DIR_POSTFIX = '_annotation_store'
+
+# ============================= MAIN  =============================
+def main():
+    parser = argparse.ArgumentParser(description='NVDU Annotation Packer')
+    parser.add_argument('dataset_dir', type=str, nargs='?',
+        help="Dataset directory. Default is the current directory", default='.')
+    parser.add_argument('-a', '--data_annot_dir', type=str, help="Directory path - where to find the annotation data. Default is the same directory as the dataset directory", default="")
+    parser.add_argument('-n', '--name_filters', type=str, nargs='*', help="The name filter of each frame. e.g: *.png", default=["*.png"])
+    parser.add_argument('-r', '--recursive', action='store_true', help="If specified, pack all the sub-directories of the dataset which have their own object and camera settings files", default=False)
+    parser.add_argument('-o', '--output_dir', type=str, help="Directory path - where to save the annotation store. Default is <dataset_dir>{} next to the dataset directory".format(DEFAULT_STORE_DIR_POSTFIX), default="")
+
+    args = parser.parse_args()
+    print("args: {}".format(args))
+
+    dataset_dir_path = args.dataset_dir
+    data_annot_dir_path = args.data_annot_dir if (args.data_annot_dir) else dataset_dir_path
+    output_dir_path = args.output_dir if (args.output_dir) else get_dataset_output_dir_path(dataset_dir_path, DEFAULT_STORE_DIR_POSTFIX)
+
+    dataset = NVDUDataset(dataset_dir_path, data_annot_dir_path, args.name_filters, in_recursive=args.recursive)
+    frame_count = dataset.scan()
+    print("Number of frames in the dataset: {}".format(frame_count))
+    build_annotation_store(dataset, output_dir_path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+#!/usr/bin/env python
+import argparse
+import time
+from os import path
+
+import nvdu
+from nvdu.core.nvdu_data import *
+# NOTE: Only the OpenCV drawing is used, this tool doesn't need pyglet or a display
+from nvdu.viz.image_export import *
+
+DEFAULT_EXPORT_DIR_POSTFIX = '_viz_export'
+
+# ============================= MAIN  =============================
+def main():
+    parser = argparse.ArgumentParser(description='NVDU Headless Visualized Frame Exporter')
+    parser.add_argument('dataset_dir', type=str, nargs='?',
+        help="Dataset directory. Default is the current directory", default='.')
+    parser.add_argument('-a', '--data_annot_dir', type=str, help="Directory path - where to find the annotation data. Default is the same directory as the dataset directory", default="")
+    parser.add_argument('-n', '--name_filters', type=str, nargs='*', help="The name filter of each frame. e.g: *.png", default=["*.png"])
+    parser.add_argument('-r', '--recursive', action='store_true', help="If specified, export all the sub-directories of the dataset which have their own object and camera settings files", default=False)
+    parser.add_argument('-o', '--object_settings_path', type=str, help="Object settings file path. Default is the object settings of the dataset (or of each sub-directory)", default=None)
+    parser.add_argument('-c', '--camera_settings_path', type=str, help="Camera settings file path. Default is the camera settings of the dataset (or of each sub-directory)", default=None)
+    parser.add_argument('-e', '--export_dir', type=str, help="Directory path - where to store the visualized images. Default is <dataset_dir>{} next to the dataset directory".format(DEFAULT_EXPORT_DIR_POSTFIX), default="")
+    parser.add_argument('--start_frame', type=int, help="Index of the first frame to export", default=0)
+    parser.add_argument('--frame_count', type=int, help="Number of frames to export. Default is all the frames from the start frame", default=None)
+    parser.add_argument('--no_cuboid2d', action='store_true', help="If specified, the 2d cuboids are not drawn", default=False)
+    parser.add_argument('--no_pivot_axis', action='store_true', help="If specified, the pivot axes are not drawn", default=False)
+    parser.add_argument('--keypoints', action='store_true', help="If specified, the keypoints are drawn", default=False)
+    parser.add_argument('--no_info_text', action='store_true', help="If specified, the frame name is not drawn", default=False)
+    parser.add_argument('--processes', type=int, help="Number of worker processes. Default is the number of cpu cores", default=None)
+    parser.add_argument('--chunk_size', type=int, help="Number of frames exported by each task of the worker processes", default=DEFAULT_EXPORT_CHUNK_SIZE)
+
+    args = parser.parse_args()
+    print("args: {}".format(args))
+
+    dataset_dir_path = args.dataset_dir
+    data_annot_dir_path = args.data_annot_dir if (args.data_annot_dir) else dataset_dir_path
+    export_dir_path = args.export_dir if (args.export_dir) else get_dataset_output_dir_path(dataset_dir_path, DEFAULT_EXPORT_DIR_POSTFIX)
+
+    overlay_settings = ImageOverlaySettings()
+    overlay_settings.show_cuboid2d = not args.no_cuboid2d
+    overlay_settings.show_pivot_axis = not args.no_pivot_axis
+    overlay_settings.show_keypoint2d = args.keypoints
+    overlay_settings.show_info_text = not args.no_info_text
+
+    dataset = NVDUDataset(dataset_dir_path, data_annot_dir_path, args.name_filters, in_recursive=args.recursive)
+    frame_count = dataset.scan()
+    print("Number of frames in the dataset: {}".format(frame_count))
+
+    start_frame = max(0, args.start_frame)
+    end_frame = frame_count if (args.frame_count is None) else min(frame_count, start_frame + args.frame_count)
+
+    start_time = time.time()
+    exported_frame_count = export_dataset_overlays(dataset, export_dir_path, range(start_frame, end_frame), overlay_settings,
+        args.chunk_size, args.processes, args.object_settings_path, args.camera_settings_path)
+    elapsed_time = time.time() - start_time
+    print("Exported {} frames in {:.1f}s ({:.1f} frames/s) - export directory: {}".format(exported_frame_count, elapsed_time,
+        exported_frame_count / elapsed_time if (elapsed_time > 0) else 0.0, export_dir_path))
+
+if __name__ == '__main__':
+    main()
@@ -29,6 +29,7 @@ CAMERA_FOV_HORIZONTAL = 90
 DEFAULT_data_dir_path = '.'
 DEFAULT_output_dir_path = ''
 DEFAULT_CAMERA_SETTINGS_FILE_PATH = './config/camera_lov.json'
+DEFAULT_FRAME_CACHE_SIZE_MB = 512
 
 data_dir_path = DEFAULT_data_dir_path
 # mesh_file_name = 'textured.obj'
@@ -48,10 +49,20 @@ def main():
     parser.add_argument('-o', '--object_settings_path', type=str, help="Object settings file path")
     parser.add_argument('-c', '--camera_settings_path', type=str, help="Camera settings file path", default=None)
     parser.add_argument('-n', '--name_filters', type=str, nargs='*', help="The name filter of each frame. e.g: *.png", default=["*.png"])
+    parser.add_argument('--start_frame', type=str, help="Name of the first frame to visualize, e.g: 000123", default=None)
     parser.add_argument('--fps', type=float, help="How fast do we want to automatically change frame", default=10)
     parser.add_argument('--auto_change', action='store_true', help="If specified, the visualizer will automatically change the frame", default=False)
+    parser.add_argument('--follow', action='store_true', help="If specified, the visualizer will keep looking for the new frames written to the dataset and follow the newest frame", default=False)
+    parser.add_argument('--follow_interval', type=float, help="How often (in seconds) to look for new frames when following the dataset", default=1.0)
+    parser.add_argument('--prefetch', type=int, help="Number of frames to load ahead in the background. 0 disable the prefetching", default=FramePrefetcher.DEFAULT_PREFETCH_COUNT)
+    parser.add_argument('--preview_scale', type=int, choices=SUPPORTED_IMAGE_DOWNSCALES, help="Show the images at 1/preview_scale of their resolution while playing or holding an arrow key. The downscaled images are cached in the <dataset_dir>_preview_cache directory next to the dataset directory (or next to the frame index if --index_cache_dir is specified)", default=1)
+    parser.add_argument('--cache_size', type=int, help="Memory budget (in MB) of the cache of visualized frames. 0 disable the caching", default=DEFAULT_FRAME_CACHE_SIZE_MB)
     parser.add_argument('-e', '--export_dir', type=str, help="Directory path - where to store the visualized images. If specified, the script will automatically export the visualized image to the export directory. If not specified, the current directory will be used.", default='')
     parser.add_argument('--auto_export', action='store_true', help="If specified, the visualizer will automatically export the visualized frame to image file in the `export_dir` directory", default=False)
+    parser.add_argument('--rebuild_index', action='store_true', help="If specified, the dataset's cached frame index will be rebuilt instead of reused", default=False)
+    parser.add_argument('--index_cache_dir', type=str, help="Directory path - where to store the cached frame index. If not specified, the index is stored in the dataset directory", default=None)
+    parser.add_argument('-r', '--recursive', action='store_true', help="If specified, scan all the sub-directories of the dataset which have their own object and camera settings files", default=False)
+    parser.add_argument('--scan_threads', type=int, help="Number of threads used to scan the dataset's directories", default=NVDUDataset.DEFAULT_SCAN_THREAD_COUNT)
     parser.add_argument('--ignore_fixed_transform', action='store_true', help="If specified, the visualizer will not use the fixed transform matrix for the 3d model", default=False)
     # parser.add_argument('--gui', type=str, help="Show GUI window")
     
@@ -73,9 +84,9 @@ def main():
 
     name_filters = args.name_filters
     print("name_filters: {}".format(name_filters))
-    viz_dataset = NVDUDataset(dataset_dir_path, data_annot_dir_path, name_filters)
-    # frame_count = viz_dataset.scan()
-    # print("Number of frames in the dataset: {}".format(frame_count))
+    viz_dataset = NVDUDataset(dataset_dir_path, data_annot_dir_path, name_filters, args.index_cache_dir,
+                                args.recursive, args.scan_threads)
+    viz_dataset.scan(rebuild_index=args.rebuild_index)
 
     # NOTE: Just use the YCB models path for now
     model_dir_path = args.model_dir
@@ -83,17 +94,21 @@ def main():
     object_settings_path = args.object_settings_path
     camera_settings_path = args.camera_settings_path
     # If not specified then use the default object and camera settings files from the dataset directory
+    # NOTE: A recursive dataset may not have the settings files in its root directory, use the first subset's ones instead
+    settings_dir_path = dataset_dir_path
+    if viz_dataset.is_recursive and (len(viz_dataset.subsets) > 0):
+        settings_dir_path = viz_dataset.subsets[0].dir_path
     if (object_settings_path is None):
-        object_settings_path = NVDUDataset.get_default_object_setting_file_path(dataset_dir_path)
+        object_settings_path = NVDUDataset.get_default_object_setting_file_path(settings_dir_path)
     if (camera_settings_path is None):
-        camera_settings_path = NVDUDataset.get_default_camera_setting_file_path(dataset_dir_path)
+        camera_settings_path = NVDUDataset.get_default_camera_setting_file_path(settings_dir_path)
 
     dataset_settings = DatasetSettings.parse_from_file(object_settings_path, model_dir_path)
     if (dataset_settings is None):
         print("Error: Could not locate dataset settings at {}".format(object_settings_path))
     else:
         if path.exists(camera_settings_path):
-            camera_json_data = json.load(open(camera_settings_path))
+            camera_json_data = load_json_file(camera_settings_path)
             dataset_settings.exporter_settings = ExporterSettings.parse_from_json_data(camera_json_data)
 
     camera_intrinsic_settings = CameraIntrinsicSettings.from_json_file(camera_settings_path)
@@ -116,10 +131,17 @@ def main():
     main_window.visualizer.dataset_settings = dataset_settings
     main_window.visualizer.visualizer_settings.ignore_initial_matrix = args.ignore_fixed_transform
     main_window.dataset = viz_dataset
+    main_window.set_prefetch_count(args.prefetch)
+    main_window.set_cache_size(args.cache_size * 1024 * 1024)
+    main_window.set_preview_downscale(args.preview_scale)
     main_window.set_auto_fps(args.fps)
     main_window.should_export = auto_export
     main_window.set_auto_change_frame(args.auto_change)
+    main_window.set_follow_new_frames(args.follow, args.follow_interval)
     main_window.export_dir = args.export_dir
+    if args.start_frame:
+        # NOTE: The frame is visualized by setup()
+        main_window.frame_index = max(0, viz_dataset.get_frame_index_from_name(args.start_frame))
     main_window.setup()
 
     main_window.set_camera_intrinsic_settings(camera_intrinsic_settings)
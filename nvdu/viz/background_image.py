@@ -1,61 +1,158 @@
 # Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
-# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International 
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
 # License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
 
 import cv2
 import numpy as np
+from ctypes import *
+import pyglet
 from pyglet.gl import *
 
+# NOTE: Rectangle textures are used so the texture coordinates are in pixels and the image size doesn't need to be a power of 2
+BACKGROUND_TEXTURE_TARGET = GL_TEXTURE_RECTANGLE_ARB
+
+# Upload formats of the images by number of color channels: (internal format, format of RGB data, format of BGR data)
+_IMAGE_UPLOAD_FORMATS = {
+    1: (GL_LUMINANCE8, GL_LUMINANCE, GL_LUMINANCE),
+    3: (GL_RGB8, GL_RGB, GL_BGR),
+    4: (GL_RGBA8, GL_RGBA, GL_BGRA),
+}
+
+class _SharedBackgroundTexture(object):
+    """Texture shared by all the background images with the same resolution, only the last drawn image is uploaded in it"""
+    def __init__(self, width, height, internal_format):
+        self.width = width
+        self.height = height
+        # The background image whose data is currently in the texture
+        self.owner_image = None
+
+        self.id = GLuint()
+        glGenTextures(1, byref(self.id))
+        glBindTexture(BACKGROUND_TEXTURE_TARGET, self.id)
+        glTexParameteri(BACKGROUND_TEXTURE_TARGET, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(BACKGROUND_TEXTURE_TARGET, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        # Allocate the texture once, the images are then uploaded using glTexSubImage2D
+        glTexImage2D(BACKGROUND_TEXTURE_TARGET, 0, internal_format, width, height, 0, GL_RGB, GL_UNSIGNED_BYTE, None)
+        glBindTexture(BACKGROUND_TEXTURE_TARGET, 0)
+
+    def upload(self, image_data, upload_format):
+        """Upload a C-contiguous uint8 image (rows from top to bottom) to the texture"""
+        glBindTexture(BACKGROUND_TEXTURE_TARGET, self.id)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glTexSubImage2D(BACKGROUND_TEXTURE_TARGET, 0, 0, 0, self.width, self.height,
+            upload_format, GL_UNSIGNED_BYTE, image_data.ctypes.data_as(POINTER(GLubyte)))
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+        glBindTexture(BACKGROUND_TEXTURE_TARGET, 0)
+
+# Shared textures by (width, height, number of color channels)
+_shared_background_textures = {}
+# Shared vertex lists by (display width, display height, image width, image height)
+_shared_background_vlists = {}
+
 class BackgroundImage(object):
     def __init__(self, width = 0, height = 0):
         self.width = width
         self.height = height
         self.location = [0, 0, 0]
-        self.vlist = pyglet.graphics.vertex_list(4,
-                ('v2f', [0,0, width,0, 0,height, width,height]),
-                ('t2f', [0,0, width,0, 0,height, width,height]))
-
         self.scale = [self.width, self.height, 1.0]
 
+        # Image data to upload: C-contiguous numpy array and the GL format of its pixels
+        self._upload_data = None
+        self._upload_format = GL_RGB
+        self._internal_format = GL_RGB8
+        self._is_uploaded = False
+        self.texture = None
+        self.vlist = None
+
     @classmethod
     def create_from_numpy_image_data(cls, numpy_image_data, width = 0, height = 0):
         img_width = numpy_image_data.shape[1] if (width == 0) else width
         img_height = numpy_image_data.shape[0] if (height == 0) else height
-        
+
         new_image = cls(img_width, img_height)
         new_image.load_image_data_from_numpy(numpy_image_data)
         return new_image
 
     @classmethod
     def create_from_file_path(cls, image_file_path, width = 0, height = 0):
-        image_np = np.array(cv2.imread(image_file_path))
-        image_np = image_np[:,:,::-1]  # Convert BGR to RGB format.  Alternatively, use cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        image_np = cv2.imread(image_file_path)
+        image_np = image_np[:,:,::-1]  # View the BGR image as RGB, the channels are swapped back when uploading
         return cls.create_from_numpy_image_data(image_np, width, height)
-    
+
     def load_image_data_from_numpy(self, numpy_image_data):
-        width = numpy_image_data.shape[1]
-        height = numpy_image_data.shape[0]
-        color_channel_count = numpy_image_data.shape[2]
-        pitch = -width * color_channel_count
-        # print('numpy_image_data.shape: {}'.format(numpy_image_data.shape))
-        img_data = numpy_image_data
-        img_data = img_data.tostring()
-        self.image = pyglet.image.ImageData(width, height, 'RGB', img_data, pitch)
-        self.texture = self.image.get_texture(True, True)
+        """Set the RGB(A) image to show, the pixel data is only uploaded to the texture when the image is drawn
+        NOTE: The image data is not copied if it's C-contiguous or a [:,:,::-1] view of a C-contiguous BGR(A) image
+        """
+        color_channel_count = numpy_image_data.shape[2] if (len(numpy_image_data.shape) > 2) else 1
+        if (len(numpy_image_data.shape) < 3):
+            numpy_image_data = numpy_image_data[:, :, np.newaxis]
+        self._internal_format, rgb_format, bgr_format = _IMAGE_UPLOAD_FORMATS[color_channel_count]
+
+        if (numpy_image_data.dtype != np.uint8):
+            numpy_image_data = numpy_image_data.astype(np.uint8)
+
+        if numpy_image_data.flags['C_CONTIGUOUS']:
+            self._upload_data = numpy_image_data
+            self._upload_format = rgb_format
+        elif numpy_image_data[:,:,::-1].flags['C_CONTIGUOUS']:
+            # The image is a view of a BGR image, e.g: from cv2.imread, let OpenGL swap the channels
+            self._upload_data = numpy_image_data[:,:,::-1]
+            self._upload_format = bgr_format
+        else:
+            self._upload_data = np.ascontiguousarray(numpy_image_data)
+            self._upload_format = rgb_format
+        self._is_uploaded = False
 
     def load_image_from_file(self, image_file_path):
-        self.image = pyglet.image.load(image_file_path)
-        self.texture = self.image.get_texture(True, True)
+        image_np = cv2.imread(image_file_path, cv2.IMREAD_UNCHANGED)
+        # NOTE: OpenCV load the color images as BGR(A), view them as RGB(A)
+        if (len(image_np.shape) > 2):
+            image_np = image_np[:,:,::-1]
+        self.load_image_data_from_numpy(image_np)
 
     def load_new_image(self, image_file_path):
-        self.image = pyglet.image.load(image_file_path)
-        self.texture = self.image.get_texture(True, True)
-        # print('Texture: {} - id: {} - target:{} - width: {} - height: {}'.format(
-        #     self.texture, self.texture.id, self.texture.target, self.texture.width, self.texture.height))
-        # print('GL_TEXTURE_RECTANGLE_ARB: {} - GL_TEXTURE_RECTANGLE_NV: {} - GL_TEXTURE_2D: {}'.format(
-        #     GL_TEXTURE_RECTANGLE_ARB, GL_TEXTURE_RECTANGLE_NV, GL_TEXTURE_2D))
+        self.load_image_from_file(image_file_path)
+
+    # Number of bytes used by the image's texture
+    # NOTE: The texture is shared by all the images with the same resolution so it's not counted here
+    @property
+    def nbytes(self):
+        return 0
+
+    def delete(self):
+        """Release the image data, the shared texture is kept for the other images"""
+        if not (self.texture is None) and (self.texture.owner_image is self):
+            self.texture.owner_image = None
+        self.texture = None
+        self.vlist = None
+        self._upload_data = None
+
+    def _update_texture(self):
+        image_height, image_width, color_channel_count = self._upload_data.shape
+        texture_key = (image_width, image_height, color_channel_count)
+        if not (texture_key in _shared_background_textures):
+            _shared_background_textures[texture_key] = _SharedBackgroundTexture(image_width, image_height, self._internal_format)
+        self.texture = _shared_background_textures[texture_key]
+
+        vlist_key = (self.width, self.height, image_width, image_height)
+        if not (vlist_key in _shared_background_vlists):
+            # NOTE: The image rows are uploaded from top to bottom so the texture coordinates flip the image vertically
+            _shared_background_vlists[vlist_key] = pyglet.graphics.vertex_list(4,
+                ('v2f', [0,0, self.width,0, 0,self.height, self.width,self.height]),
+                ('t2f', [0,image_height, image_width,image_height, 0,0, image_width,0]))
+        self.vlist = _shared_background_vlists[vlist_key]
+
+        # Only upload the image if another image was drawn using the texture since the last upload
+        if (self.texture.owner_image is not self) or not self._is_uploaded:
+            self.texture.upload(self._upload_data, self._upload_format)
+            self.texture.owner_image = self
+            self._is_uploaded = True
 
     def draw(self):
+        if (self._upload_data is None):
+            return
+        self._update_texture()
+
         glMatrixMode(GL_MODELVIEW)
         glPushMatrix()
         glLoadIdentity()
@@ -63,10 +160,10 @@ class BackgroundImage(object):
         glTranslatef(x, y, z)
         glColor3f(1, 1, 1)
 
-        texture_target = self.texture.target
-        glEnable(texture_target)
-        glBindTexture(texture_target, self.texture.id)
+        glEnable(BACKGROUND_TEXTURE_TARGET)
+        glBindTexture(BACKGROUND_TEXTURE_TARGET, self.texture.id)
         self.vlist.draw(GL_TRIANGLE_STRIP)
-        glDisable(texture_target)
+        glBindTexture(BACKGROUND_TEXTURE_TARGET, 0)
+        glDisable(BACKGROUND_TEXTURE_TARGET)
 
         glPopMatrix()
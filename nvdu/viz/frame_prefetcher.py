@@ -0,0 +1,130 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+import concurrent.futures
+
+# ========================= FramePrefetcher =========================
+class FramePrefetcher(object):
+    """Load the frames around the visualized frame using background threads
+    The frames ahead in the travel direction are loaded first, so changing frame only need to swap in data already loaded.
+    The loaded frames are keyed by their name and each frame's files are resolved when its request is submitted,
+    so the frames being loaded stay valid when new frames are added to the dataset and shift the frame indexes.
+    NOTE: Only the main thread should call this object's functions, the worker threads only load the resolved files
+    """
+    DEFAULT_PREFETCH_COUNT = 8
+    DEFAULT_THREAD_COUNT = 2
+
+    def __init__(self, get_frame_request_func, load_frame_func, prefetch_count = DEFAULT_PREFETCH_COUNT, thread_count = DEFAULT_THREAD_COUNT,
+            skip_frame_func = None):
+        """
+        Args:
+            get_frame_request_func: function(dataset, frame_index) which resolve what's needed to load a frame (e.g: its file paths),
+                it's called in the main thread so it can read the dataset
+            load_frame_func: function(frame_request) which load a frame from its request, it's called in the worker threads
+                so it must not read the dataset or use OpenGL
+            prefetch_count: number of frames to load ahead of the current frame in the travel direction
+            thread_count: number of worker threads
+            skip_frame_func: function(frame_name) which return True if a frame doesn't need to be prefetched, e.g: it's cached
+        """
+        self._get_frame_request = get_frame_request_func
+        self._load_frame = load_frame_func
+        self._skip_frame = skip_frame_func
+        self.prefetch_count = prefetch_count
+        # Also keep a few frames behind so going back one frame is instant
+        self.prefetch_behind_count = max(1, int(prefetch_count / 4))
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, thread_count))
+
+        self._dataset = None
+        # Frame name => Future of the loaded frame
+        self._frame_futures = {}
+        self._last_frame_index = -1
+        # 1 when moving forward in the dataset, -1 when moving backward
+        self.travel_direction = 1
+
+    def get_frame(self, dataset, frame_index):
+        """Get a loaded frame and start prefetching the frames around it
+        If the frame is not being loaded yet then it's loaded right away in the calling thread
+        """
+        self._set_dataset(dataset)
+        self._update_travel_direction(frame_index)
+        frame_name = dataset.get_frame_name_from_index(frame_index)
+        frame_future = self._frame_futures.get(frame_name, None)
+        if not (frame_future is None) and frame_future.cancelled():
+            frame_future = None
+
+        # NOTE: Start loading the frames ahead before waiting for the current frame
+        self.prefetch(frame_index, frame_future is None)
+
+        if (frame_future is None):
+            frame_future = concurrent.futures.Future()
+            frame_future.set_result(self._load_frame(self._get_frame_request(dataset, frame_index)))
+            self._frame_futures[frame_name] = frame_future
+
+        return frame_future.result()
+
+    def prefetch_around(self, dataset, frame_index):
+        """Start prefetching the frames around a frame without loading it, e.g: when the frame is already available"""
+        self._set_dataset(dataset)
+        self._update_travel_direction(frame_index)
+        self.prefetch(frame_index, True)
+
+    def prefetch(self, frame_index, skip_current_frame = False):
+        """Start loading the frames around a frame and cancel the requests of the other frames"""
+        frame_count = self._dataset.frame_count
+        if (frame_count <= 0):
+            return
+
+        # Frames to keep loaded, in the order they should be loaded
+        wanted_frame_indexes = [frame_index]
+        wanted_frame_indexes.extend(frame_index + self.travel_direction * offset for offset in range(1, self.prefetch_count + 1))
+        wanted_frame_indexes.extend(frame_index - self.travel_direction * offset for offset in range(1, self.prefetch_behind_count + 1))
+
+        wanted_frames = []
+        wanted_frame_names = set()
+        for check_frame_index in wanted_frame_indexes:
+            check_frame_index = check_frame_index % frame_count
+            check_frame_name = self._dataset.get_frame_name_from_index(check_frame_index)
+            if not (check_frame_name in wanted_frame_names):
+                wanted_frame_names.add(check_frame_name)
+                wanted_frames.append((check_frame_index, check_frame_name))
+
+        # Cancel the stale requests, e.g: after jumping 100 frames
+        for check_frame_name in list(self._frame_futures.keys()):
+            if not (check_frame_name in wanted_frame_names):
+                self._frame_futures.pop(check_frame_name).cancel()
+
+        if skip_current_frame:
+            wanted_frames = wanted_frames[1:]
+        for check_frame_index, check_frame_name in wanted_frames:
+            if not (self._skip_frame is None) and self._skip_frame(check_frame_name):
+                continue
+            check_future = self._frame_futures.get(check_frame_name, None)
+            if (check_future is None) or check_future.cancelled():
+                # NOTE: Resolve the frame's files now, the frame indexes can change before the request is loaded
+                frame_request = self._get_frame_request(self._dataset, check_frame_index)
+                self._frame_futures[check_frame_name] = self._executor.submit(self._load_frame, frame_request)
+
+    def _set_dataset(self, dataset):
+        if not (dataset is self._dataset):
+            self.cancel_all()
+            self._dataset = dataset
+
+    def _update_travel_direction(self, frame_index):
+        frame_count = self._dataset.frame_count
+        if (self._last_frame_index >= 0) and (frame_count > 0) and (frame_index != self._last_frame_index):
+            # NOTE: Use the shortest way between the 2 frames so wrapping around the dataset keep the direction
+            forward_distance = (frame_index - self._last_frame_index) % frame_count
+            backward_distance = (self._last_frame_index - frame_index) % frame_count
+            self.travel_direction = 1 if (forward_distance <= backward_distance) else -1
+        self._last_frame_index = frame_index
+
+    def cancel_all(self):
+        for frame_future in self._frame_futures.values():
+            frame_future.cancel()
+        self._frame_futures = {}
+        self._last_frame_index = -1
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=False)
@@ -4,58 +4,143 @@
 
 import math
 import sys
+import numpy as np
 import cv2
 
 from nvdu.core.cuboid import *
 
+# NOTE: sometime the value get too big and we run into error:
+# OverflowError: Python int too large to convert to C long
+# so the points further than this from the image origin are not drawn
+MAX_DRAW_COORDINATE = 10000
+
 def is_point_valid(point):
     if (point is None):
         return False
     if (math.isnan(point[0]) or math.isnan(point[1])):
         return False
-    # NOTE: sometime the value get too big and we run into error:
-    # OverflowError: Python int too large to convert to C long
     # if (math.fabs(point[0]) >= sys.maxsize) or (math.fabs(point[1]) >= sys.maxsize):
-    if (math.fabs(point[0]) >= 10000) or (math.fabs(point[1]) >= 10000):
+    if (math.fabs(point[0]) >= MAX_DRAW_COORDINATE) or (math.fabs(point[1]) >= MAX_DRAW_COORDINATE):
         return False
     return True
 
+def get_valid_point_mask(points2d):
+    """Vectorized is_point_valid: get the (...) mask of the (..., 2) points which can be drawn, the NaN points are not valid"""
+    points2d = np.asarray(points2d, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        return (np.abs(points2d) < MAX_DRAW_COORDINATE).all(axis=-1)
+
+def get_cuboid2d_array(cuboids2d):
+    """Stack a list of cuboids 2d (Cuboid2d, (8 or 9, 2) arrays or None) into a (N, 9, 2) array, the missing vertices are NaN"""
+    cuboid_array = np.full((len(cuboids2d), CuboidVertexType.TotalVertexCount, 2), np.nan)
+    for cuboid_index, cuboid2d in enumerate(cuboids2d):
+        if (cuboid2d is None):
+            continue
+        cuboid_vertices = cuboid2d.get_vertices() if isinstance(cuboid2d, Cuboid2d) else cuboid2d
+        if not isinstance(cuboid_vertices, np.ndarray) or (cuboid_vertices.dtype == object):
+            # NOTE: Same as is_point_valid, the None vertices are not drawn
+            cuboid_vertices = list((np.nan, np.nan) if (vertex is None) else vertex for vertex in cuboid_vertices)
+        cuboid_vertices = np.asarray(cuboid_vertices, dtype=np.float64).reshape(-1, 2)[:CuboidVertexType.TotalVertexCount]
+        cuboid_array[cuboid_index, :len(cuboid_vertices)] = cuboid_vertices
+    return cuboid_array
+
+def draw_markers(image, points2d, color, point_size=1):
+    """Draw a filled disc at each of the (K, 2) integer points in one OpenCV call
+    NOTE: The thick lines have round caps so a zero length line is drawn as a disc
+    """
+    if (len(points2d) == 0):
+        return
+    marker_segments = np.repeat(np.asarray(points2d, dtype=np.int32)[:, np.newaxis, :], 2, axis=1)
+    cv2.polylines(image, list(marker_segments), False, color, max(1, 2 * point_size), cv2.LINE_AA)
+
+def draw_rings(image, points2d, color, radius, thickness=1):
+    """Draw a circle around each of the (K, 2) integer points in one OpenCV call"""
+    if (len(points2d) == 0):
+        return
+    ring_offsets = cv2.ellipse2Poly((0, 0), (max(1, radius), max(1, radius)), 0, 0, 360, 30)
+    rings = np.asarray(points2d, dtype=np.int32)[:, np.newaxis, :] + ring_offsets[np.newaxis]
+    cv2.polylines(image, list(rings), True, color, max(1, thickness), cv2.LINE_AA)
+
 # This module contains all the functions related to drawing on image
+def draw_cuboids2d(image, cuboids2d, colors, line_thickness=1, point_size=1):
+    """Draw many cuboids 2d at once, e.g: all the objects of a frame
+    All the vertices are validated with one mask, then the edges and the corner markers of each color are drawn in one call
+    Args:
+        cuboids2d: (N, 8 or 9, 2) array or list of cuboids 2d, see get_cuboid2d_array
+        colors: the color of each cuboid or one color for all of them
+    """
+    if (image is None) or (cuboids2d is None) or (len(cuboids2d) == 0):
+        return
+
+    cuboid_array = cuboids2d if isinstance(cuboids2d, np.ndarray) else get_cuboid2d_array(cuboids2d)
+    cuboid_count = len(cuboid_array)
+    is_valid = get_valid_point_mask(cuboid_array)
+    cuboid_points = np.where(is_valid[..., np.newaxis], cuboid_array, 0.0).astype(np.int32)
+
+    if np.isscalar(colors[0]):
+        colors = [colors] * cuboid_count
+    # NOTE: The colors may mix RGB and RGBA (e.g: the objects' class_color), only their RGB channels are drawn
+    colors = np.array(list(tuple(color)[:3] for color in colors))
+    unique_colors, color_ids = np.unique(colors, axis=0, return_inverse=True)
+    color_ids = color_ids.reshape(-1)
+
+    line_indexes = np.array(CuboidLineIndexes)
+    is_line_valid = is_valid[:, line_indexes[:, 0]] & is_valid[:, line_indexes[:, 1]]
+    line_points = cuboid_points[:, line_indexes]
+
+    for color_id, color in enumerate(unique_colors):
+        color = tuple(int(color_channel) for color_channel in color)
+        is_color_cuboid = (color_ids == color_id)[:, np.newaxis]
+        # Draw the lines edge of the cuboids
+        color_lines = line_points[is_line_valid & is_color_cuboid]
+        if (len(color_lines) > 0):
+            cv2.polylines(image, list(color_lines), False, color, line_thickness, cv2.LINE_AA)
+        # Draw circle at each vertices of the cuboids
+        draw_markers(image, cuboid_points[is_valid & is_color_cuboid], color, point_size)
+
+    # Highlight the top front vertices
+    draw_rings(image, cuboid_points[is_valid[:, CuboidVertexType.FrontTopRight], CuboidVertexType.FrontTopRight],
+        (0, 0, 0), point_size, int(point_size / 2))
+    draw_rings(image, cuboid_points[is_valid[:, CuboidVertexType.FrontTopLeft], CuboidVertexType.FrontTopLeft],
+        (0, 0, 0), point_size, 1)
+
 def draw_cuboid2d(image, cuboid2d, color, line_thickness=1, point_size=1):
     if (image is None) or (cuboid2d is None):
         return
+    draw_cuboids2d(image, [cuboid2d], [color], line_thickness, point_size)
 
-    # print("image: {} - image.shape: {}".format(image, image.shape))
-
-    line_type = cv2.LINE_AA
-    # Draw the lines edge of the cuboid
-    for line in CuboidLineIndexes:
-        vi0, vi1 = line
-        v0 = cuboid2d.get_vertex(vi0)
-        v1 = cuboid2d.get_vertex(vi1)
-        # print("draw line - v0: {} - v1: {}".format(v0, v1))
-        if (is_point_valid(v0) and is_point_valid(v1)):
-            v0 = (int(v0[0]), int(v0[1]))
-            v1 = (int(v1[0]), int(v1[1]))
-            # print("draw line - v0: {} - v1: {}".format(v0, v1))
-
-            cv2.line(image, v0, v1, color, line_thickness, line_type)
-
-    # Draw circle at each corner vertices of the cuboid
-    thickness = -1
-    # TODO: Highlight the top front vertices
-    for vertex_index in range(CuboidVertexType.TotalVertexCount):
-        vertex = cuboid2d.get_vertex(vertex_index)
-        if (not is_point_valid(vertex)):
-            continue
+# Colors of the X, Y and Z axes of the pivot axes, same as the 3d pivot axes of the visualizer
+PivotAxisColors = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
 
-        point = (int(vertex[0]), int(vertex[1]))
-        cv2.circle(image, point, point_size, color, thickness, line_type)
+def draw_pivot_axis2d(image, axis_points2d, line_thickness=2, axis_colors=PivotAxisColors):
+    """Draw a projected pivot axis: axis_points2d is the [origin, x axis, y axis, z axis] points in image space"""
+    if (image is None) or (axis_points2d is None):
+        return
 
-        if (vertex_index == CuboidVertexType.FrontTopRight):
-            cv2.circle(image, point, point_size, (0,0,0), int(point_size / 2), line_type)
-        elif (vertex_index == CuboidVertexType.FrontTopLeft):
-            cv2.circle(image, point, point_size, (0,0,0), 1, line_type)
+    origin = axis_points2d[0]
+    if not is_point_valid(origin):
+        return
+    origin = (int(origin[0]), int(origin[1]))
+    for axis_index in range(3):
+        axis_point = axis_points2d[axis_index + 1]
+        if is_point_valid(axis_point):
+            cv2.line(image, origin, (int(axis_point[0]), int(axis_point[1])), axis_colors[axis_index], line_thickness, cv2.LINE_AA)
+
+def draw_points2d(image, points2d, color, point_size=2):
+    """Draw a list of 2d points, e.g: the projected keypoints of an object"""
+    if (image is None) or (points2d is None):
+        return
+
+    points2d = np.asarray(points2d, dtype=np.float64).reshape(-1, 2)
+    draw_markers(image, points2d[get_valid_point_mask(points2d)], color, point_size)
+
+def draw_info_text(image, text, color=(255, 255, 255), font_scale=0.6, thickness=1):
+    """Draw a line of text at the top left of the image, with a dark outline so it's readable on any background"""
+    if (image is None) or not text:
+        return
 
-            
-        
\ No newline at end of file
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    (_, text_height), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+    text_origin = (4, 4 + text_height)
+    cv2.putText(image, text, text_origin, font, font_scale, (0, 0, 0), thickness + 2, cv2.LINE_AA)
+    cv2.putText(image, text, text_origin, font, font_scale, color, thickness, cv2.LINE_AA)
@@ -0,0 +1,174 @@
+# Copyright (c) 2018 NVIDIA Corporation.  All rights reserved.
+# This work is licensed under a Creative Commons Attribution-NonCommercial-ShareAlike 4.0 International
+# License.  (https://creativecommons.org/licenses/by-nc-sa/4.0/legalcode
+
+import os
+from os import path
+import numpy as np
+import cv2
+
+from nvdu.core.nvdu_data import *
+from nvdu.core.frame_loader import *
+from .image_draw import *
+
+# =============================== Headless export ===============================
+# Draw the annotations of the frames straight onto their images with OpenCV, without any window or OpenGL context,
+# so the visualized frames can be exported on machines without display
+DEFAULT_EXPORT_CHUNK_SIZE = 8
+# Postfix of the exported image of each frame, same as the frames exported by nvdu_viz
+EXPORTED_FRAME_POSTFIX = '_viz.png'
+
+class ImageOverlaySettings(object):
+    """What to draw on the exported images, the flags follow VisualizerSettings"""
+    def __init__(self):
+        self.show_cuboid2d = True
+        self.show_pivot_axis = True
+        self.show_keypoint2d = False
+        self.show_info_text = True
+        self.line_thickness = 1
+        self.point_size = 2
+        self.axis_line_thickness = 2
+
+def get_pivot_axes2d(scene_info, camera_intrinsic_matrix):
+    """Project the pivot axis of all the objects of a scene in one batch
+    Return:
+        (N, 4, 2) array of the [origin, x axis, y axis, z axis] points of each object, NaN if it can't be projected
+    """
+    object_count = len(scene_info.objects)
+    axis_points = np.full((object_count, 4, 3), np.nan)
+    locations = np.full((object_count, 3), np.nan)
+    quaternions = np.full((object_count, 4), np.nan)
+    for object_index, check_object in enumerate(scene_info.objects):
+        if (check_object is None) or (check_object.object_settings is None) or not check_object.has_valid_transform():
+            continue
+        # NOTE: Same axes as the object's PivotAxis: one axis along each side of the class's cuboid
+        axis_points[object_index, 0] = 0.0
+        axis_points[object_index, 1:] = np.diag(np.asarray(check_object.object_settings.pivot_axis.size3d, dtype=np.float64))
+        locations[object_index] = check_object.location
+        quaternions[object_index] = check_object.quaternion
+    return project_points(transform_points(poses_to_matrices(locations, quaternions), axis_points), camera_intrinsic_matrix)[0]
+
+def draw_scene_overlay(image, scene_info, overlay_settings=None, camera_intrinsic_matrix=None):
+    """Draw the annotations of a scene onto an RGB image (in place)
+    camera_intrinsic_matrix: used to project the pivot axes, they are not drawn if it's None
+    """
+    overlay_settings = overlay_settings if not (overlay_settings is None) else ImageOverlaySettings()
+
+    if overlay_settings.show_pivot_axis and not (camera_intrinsic_matrix is None) and (len(scene_info.objects) > 0):
+        for axis_points2d in get_pivot_axes2d(scene_info, camera_intrinsic_matrix):
+            draw_pivot_axis2d(image, axis_points2d, overlay_settings.axis_line_thickness)
+
+    drawn_objects = list(check_object for check_object in scene_info.objects
+        if not (check_object is None) and not (check_object.object_settings is None))
+    if overlay_settings.show_cuboid2d and drawn_objects:
+        # NOTE: All the cuboids of the frame are drawn in one batch
+        draw_cuboids2d(image, list(check_object.cuboid2d for check_object in drawn_objects),
+            list(check_object.object_settings.class_color[:3] for check_object in drawn_objects),
+            overlay_settings.line_thickness, overlay_settings.point_size)
+
+    for check_object in drawn_objects:
+        object_color = tuple(check_object.object_settings.class_color[:3])
+        if overlay_settings.show_keypoint2d and check_object.keypoints:
+            draw_points2d(image, list(check_keypoint['projected_location'] for check_keypoint in check_object.keypoints
+                if not (check_keypoint is None) and ('projected_location' in check_keypoint)), object_color, overlay_settings.point_size)
+
+    if overlay_settings.show_info_text:
+        draw_info_text(image, scene_info.get_scene_info_str())
+
+# Settings parsed by each worker process: (object settings path, camera settings path) => (DatasetSettings, intrinsic matrix)
+_worker_export_settings_cache = {}
+
+def _get_worker_export_settings(object_settings_path, camera_settings_path):
+    settings_key = (object_settings_path, camera_settings_path)
+    if not (settings_key in _worker_export_settings_cache):
+        dataset_settings = DatasetSettings.parse_from_file(object_settings_path)
+        intrinsic_matrix = None
+        if path.exists(camera_settings_path):
+            if not (dataset_settings is None):
+                dataset_settings.exporter_settings = ExporterSettings.parse_from_json_data(load_json_file(camera_settings_path))
+            camera_intrinsics = CameraIntrinsicSettings.from_json_file(camera_settings_path)
+            intrinsic_matrix = camera_intrinsics.get_intrinsic_matrix() if not (camera_intrinsics is None) else None
+        _worker_export_settings_cache[settings_key] = (dataset_settings, intrinsic_matrix)
+    return _worker_export_settings_cache[settings_key]
+
+def export_frame_chunk(chunk, overlay_settings=None):
+    """Draw and save the visualized images of a chunk of frames, this function run in the worker processes
+    Args:
+        chunk: (object_settings_path, camera_settings_path, [(frame_index, annotation_file_path, image_file_path, export_file_path), ...]),
+            all the frames of a chunk share the same settings
+    Return:
+        list of the indexes of the exported frames
+    """
+    object_settings_path, camera_settings_path, frame_requests = chunk
+    dataset_settings, intrinsic_matrix = _get_worker_export_settings(object_settings_path, camera_settings_path)
+    if (dataset_settings is None):
+        print("Can't export frames without object settings: {}".format(object_settings_path))
+        return []
+
+    exported_frame_indexes = []
+    for frame_index, annotation_file_path, image_file_path, export_file_path in frame_requests:
+        try:
+            scene_info = AnnotatedSceneInfo.create_from_file(dataset_settings, annotation_file_path, image_file_path)
+        except (OSError, ValueError) as ex:
+            print("Can't read annotation file: {} - {}".format(annotation_file_path, ex))
+            continue
+        if (scene_info.image_data is None):
+            print("Can't read image file: {}".format(image_file_path))
+            continue
+
+        # NOTE: The scene's image is an RGB view of the BGR image loaded by OpenCV, draw on a contiguous copy
+        image = np.ascontiguousarray(scene_info.image_data)
+        draw_scene_overlay(image, scene_info, overlay_settings, intrinsic_matrix)
+
+        export_dir_path = path.dirname(export_file_path)
+        if export_dir_path:
+            os.makedirs(export_dir_path, exist_ok=True)
+        if cv2.imwrite(export_file_path, image[:, :, ::-1]):
+            exported_frame_indexes.append(frame_index)
+        else:
+            print("Can't write exported image: {}".format(export_file_path))
+    return exported_frame_indexes
+
+def get_export_file_path(export_dir_path, frame_name):
+    return path.join(export_dir_path, frame_name + EXPORTED_FRAME_POSTFIX)
+
+def get_export_chunks(dataset, frame_indexes, export_dir_path, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE,
+        object_settings_path=None, camera_settings_path=None):
+    """Split the frames into the chunks sent to export_frame_chunk, the frames of a chunk are in the same subset
+    object_settings_path, camera_settings_path: override the settings files of the dataset's subsets
+    """
+    chunk_size = max(1, chunk_size)
+    frame_requests = []
+    chunk_settings = None
+    for frame_index in frame_indexes:
+        frame_subset = dataset.get_subset_of_frame(frame_index)
+        if (frame_subset is None):
+            continue
+        frame_settings = (object_settings_path if object_settings_path else frame_subset.object_setting_file_path,
+                          camera_settings_path if camera_settings_path else frame_subset.camera_setting_file_path)
+        if frame_requests and ((frame_settings != chunk_settings) or (len(frame_requests) >= chunk_size)):
+            yield chunk_settings + (frame_requests,)
+            frame_requests = []
+        chunk_settings = frame_settings
+        frame_name = dataset.get_frame_name_from_index(frame_index)
+        frame_requests.append((frame_index, dataset.get_annotation_file_path_of_frame(frame_name),
+            dataset.get_image_file_path_of_frame(frame_name), get_export_file_path(export_dir_path, frame_name)))
+    if frame_requests:
+        yield chunk_settings + (frame_requests,)
+
+def export_dataset_overlays(dataset, export_dir_path, frame_indexes=None, overlay_settings=None,
+        chunk_size=DEFAULT_EXPORT_CHUNK_SIZE, process_count=None, object_settings_path=None, camera_settings_path=None):
+    """Export the visualized images of the frames of a dataset using a process pool
+    Return:
+        Number of exported frames
+    """
+    if not dataset.is_scanned:
+        dataset.scan()
+    if (frame_indexes is None):
+        frame_indexes = range(dataset.frame_count)
+
+    chunks = get_export_chunks(dataset, frame_indexes, export_dir_path, chunk_size, object_settings_path, camera_settings_path)
+    exported_frame_count = 0
+    for exported_frame_indexes in map_chunks_in_processes(export_frame_chunk, chunks, process_count, (overlay_settings,)):
+        exported_frame_count += len(exported_frame_indexes)
+    return exported_frame_count
@@ -68,6 +68,9 @@ class MeshViz(SceneObjectViz3d):
         # self.pivot_axis = PivotAxis(pivot_size)
         self.pivot_axis = None
         self.ignore_initial_matrix = False
+        # OpenGL copy of the mesh's initial matrix and the matrix it was made from
+        self._gl_initial_matrix = None
+        self._gl_initial_matrix_source = None
 
     def on_draw(self):
         super(MeshViz, self).on_draw()
@@ -84,7 +87,10 @@ class MeshViz(SceneObjectViz3d):
             if (not self.ignore_initial_matrix):
                 mesh_initial_matrix = self.mesh_obj.get_initial_matrix()
                 # print("mesh_initial_matrix: {}".format(mesh_initial_matrix))
-                glMultMatrixf(get_opengl_matrixf(mesh_initial_matrix))
+                if not (mesh_initial_matrix is self._gl_initial_matrix_source):
+                    self._gl_initial_matrix = get_opengl_matrixf(mesh_initial_matrix)
+                    self._gl_initial_matrix_source = mesh_initial_matrix
+                glMultMatrixf(self._gl_initial_matrix)
 
             # TODO: Need to get the color from the object settings
             glColor4f(1.0, 1.0, 0.0, 0.5)
@@ -152,6 +152,21 @@ class AnnotatedSceneViz(object):
                 # color=(255, 0, 0, 255),
                 anchor_x='left', anchor_y='baseline')
 
+    # Approximated number of bytes used by the scene's data and its OpenGL resources
+    @property
+    def nbytes(self):
+        texture_size = self.background_image.nbytes if not (self.background_image is None) else 0
+        return self._scene_info.nbytes + texture_size
+
+    def delete(self):
+        """Free the OpenGL resources of the scene, it can't be drawn after this"""
+        if not (self.background_image is None):
+            self.background_image.delete()
+            self.background_image = None
+        if not (self.info_text is None):
+            self.info_text.delete()
+            self.info_text = None
+
     def set_image_data(self, new_image_numpy_data):
         img_width, img_height = self.dataset_settings.exporter_settings.captured_image_size
         print("set_image_data - img_width: {} - img_height: {}".format(img_width, img_height))
@@ -289,25 +304,57 @@ class NVDUVisualizer():
         self.scene_viz.set_text_color(new_text_color)
 
     def visualize_dataset_frame(self, in_dataset, in_frame_index = 0):
+        frame_scene_data = self.load_dataset_frame(in_dataset, in_frame_index)
+        if not (frame_scene_data is None):
+            self.visualize_scene(frame_scene_data)
+
+    # Load the annotated scene of a frame, return None if the frame's files can't be found
+    # image_downscale: decode the frame's image at 1/image_downscale of its resolution, e.g: to scrub through the frames faster
+    # NOTE: The annotations are drawn in the captured image space and the background image is stretched to fit,
+    # so only the image is downscaled, not the annotations
+    def load_dataset_frame(self, in_dataset, in_frame_index = 0, image_downscale = 1):
+        return self.load_frame_request(self.get_frame_request(in_dataset, in_frame_index, image_downscale))
+
+    # Resolve everything needed to load a frame: (dataset settings, annotation file path, image file path, preview image file path, image downscale)
+    # NOTE: This function reads the dataset's frame tables so it must be called from the thread which scans the dataset
+    def get_frame_request(self, in_dataset, in_frame_index = 0, image_downscale = 1):
         frame_image_file_path, frame_data_file_path = in_dataset.get_frame_file_path_from_index(in_frame_index)
+
+        frame_dataset_settings = self.dataset_settings
+        # NOTE: Each subset of a recursive dataset have its own object settings
+        if in_dataset.is_recursive:
+            mesh_dir_path = self.dataset_settings.mesh_dir_path if not (self.dataset_settings is None) else ''
+            frame_dataset_settings = in_dataset.get_dataset_settings_of_frame(in_frame_index, mesh_dir_path)
+
+        preview_image_file_path = None
+        if (image_downscale != 1):
+            preview_image_file_path = in_dataset.get_preview_image_file_path_of_frame(
+                in_dataset.get_frame_name_from_index(in_frame_index), image_downscale)
+        return (frame_dataset_settings, frame_data_file_path, frame_image_file_path, preview_image_file_path, image_downscale)
+
+    # Load the annotated scene of a frame request made by get_frame_request, return None if the frame's files can't be found
+    # NOTE: This function only reads files and doesn't use OpenGL so it can be called from the frame prefetcher's worker threads
+    def load_frame_request(self, frame_request):
+        frame_dataset_settings, frame_data_file_path, frame_image_file_path, preview_image_file_path, image_downscale = frame_request
         if not path.exists(frame_image_file_path):
-            print("Can't find image file for frame: {} - {}".format(in_frame_index, frame_image_file_path))
-            return
+            print("Can't find image file for frame: {}".format(frame_image_file_path))
+            return None
         if not path.exists(frame_data_file_path):
-            print("Can't find annotation file for frame: {} - {}".format(in_frame_index, frame_data_file_path))
-            return
+            print("Can't find annotation file for frame: {}".format(frame_data_file_path))
+            return None
 
-        print("visualize_dataset_frame: frame_image_file_path: {} - frame_data_file_path: {}".format(
+        print("load_dataset_frame: frame_image_file_path: {} - frame_data_file_path: {}".format(
             frame_image_file_path, frame_data_file_path))
 
-        frame_scene_data = AnnotatedSceneInfo.create_from_file(self.dataset_settings,
-                frame_data_file_path, frame_image_file_path)
-        self.visualize_scene(frame_scene_data)
+        return AnnotatedSceneInfo.create_from_file(frame_dataset_settings,
+                frame_data_file_path, frame_image_file_path, image_downscale=image_downscale,
+                scale_annotations=False, preview_image_file_path=preview_image_file_path)
 
-    def set_scene_data(self, new_scene_data):
+    # new_scene_viz: an already built visualization of the scene (e.g: from a cache), it's built if not specified
+    def set_scene_data(self, new_scene_data, new_scene_viz = None):
         self.annotated_scene = new_scene_data
-        self.scene_viz = AnnotatedSceneViz(self.annotated_scene)
+        self.scene_viz = new_scene_viz if not (new_scene_viz is None) else AnnotatedSceneViz(self.annotated_scene)
 
-    def visualize_scene(self, annotated_scene):
-        self.set_scene_data(annotated_scene)
+    def visualize_scene(self, annotated_scene, scene_viz = None):
+        self.set_scene_data(annotated_scene, scene_viz)
         self.draw()
@@ -9,7 +9,9 @@ import pyglet
 from pyglet.window import key
 
 from nvdu.viz.nvdu_visualizer import *
+from nvdu.viz.frame_prefetcher import *
 from nvdu.core.nvdu_data import *
+from nvdu.core.lru_cache import *
 
 class NVDUVizWindow(pyglet.window.Window):
     DEFAULT_EXPORT_DIR = "viz"
@@ -27,6 +29,28 @@ class NVDUVizWindow(pyglet.window.Window):
         self.auto_change_frame = False
         self.auto_fps = 0
 
+        # If True, periodically look for the new frames added to the dataset and keep showing the newest one
+        self.follow_new_frames = False
+        self.follow_interval = 1.0
+        # How often (in seconds) to list the followed directories, to find the frames written after a gap in the frame numbers
+        self.follow_list_interval = 30.0
+
+        # Load the frames around the current frame in the background, None if prefetching is disabled
+        self.frame_prefetcher = None
+        # Cache of the visualized frames: (frame name, image downscale) => (AnnotatedSceneInfo, AnnotatedSceneViz), None if caching is disabled
+        self.frame_cache = None
+        # The visualized AnnotatedSceneViz when it's not owned by the frame cache (not cached or evicted while visualized),
+        # it's freed when another frame is visualized
+        self._uncached_scene_viz = None
+
+        # Downscale of the images shown while playing or scrubbing through the frames, 1 always show the full resolution images
+        self.preview_downscale = 1
+        # Downscale of the images being loaded and of the image being visualized
+        self._loading_image_downscale = 1
+        self._visualized_image_downscale = 1
+        # Number of frame changes since an arrow key was pressed, more than 1 means the key is held down
+        self._held_motion_count = 0
+
         self._dataset = None
         self.export_dir = ""
         self._should_export = False
@@ -38,7 +62,9 @@ class NVDUVizWindow(pyglet.window.Window):
     @dataset.setter
     def dataset(self, new_dataset):
         self._dataset = new_dataset
-        frame_count = self._dataset.scan()
+        if not self._dataset.is_scanned:
+            self._dataset.scan()
+        frame_count = self._dataset.frame_count
         print("Number of frames in the dataset: {}".format(frame_count))
 
     @property
@@ -76,6 +102,11 @@ class NVDUVizWindow(pyglet.window.Window):
         if (self.should_export):
             self.save_current_viz_frame()
 
+    def on_close(self):
+        self.set_prefetch_count(0)
+        self.set_cache_size(0)
+        super(NVDUVizWindow, self).on_close()
+
     def on_resize(self, width, height):
         super(NVDUVizWindow, self).on_resize(width, height)
         # set the Viewport
@@ -108,9 +139,65 @@ class NVDUVizWindow(pyglet.window.Window):
         self.save_screenshot(export_viz_path)
 
     # ========================== DATA PROCESSING ==========================
+    def get_image_downscale(self):
+        """Get the downscale of the images to show: the preview downscale while playing or scrubbing, else 1"""
+        if (self.preview_downscale > 1) and (self.auto_change_frame or (self._held_motion_count > 1)):
+            return self.preview_downscale
+        return 1
+
+    def get_frame_request(self, dataset, frame_index):
+        """Resolve the files of a frame to load at the current image downscale"""
+        return self.visualizer.get_frame_request(dataset, frame_index, self._loading_image_downscale)
+
+    def load_frame_request(self, frame_request):
+        """Load a frame from its resolved files, this function is also called from the prefetcher's threads"""
+        return self.visualizer.load_frame_request(frame_request)
+
+    def load_frame(self, dataset, frame_index):
+        """Load a frame at the current image downscale"""
+        return self.load_frame_request(self.get_frame_request(dataset, frame_index))
+
     def visualize_current_frame(self):
         print('Visualizing frame: {}'.format(self.frame_index))
-        self.visualizer.visualize_dataset_frame(self.dataset, self.frame_index)
+        image_downscale = self.get_image_downscale()
+        if (image_downscale != self._loading_image_downscale):
+            # NOTE: The frames prefetched at the previous downscale are not wanted anymore
+            if not (self.frame_prefetcher is None):
+                self.frame_prefetcher.cancel_all()
+            self._loading_image_downscale = image_downscale
+        self._visualized_image_downscale = image_downscale
+
+        frame_name = self.dataset.get_frame_name_from_index(self.frame_index)
+        frame_cache_key = (frame_name, image_downscale)
+        cached_frame = self.frame_cache.get(frame_cache_key) if not (self.frame_cache is None) else None
+        if not (cached_frame is None):
+            frame_scene_data, frame_scene_viz = cached_frame
+            self._visualize_scene(frame_scene_data, frame_scene_viz)
+            # NOTE: Keep the prefetcher moving in the travel direction even when the frame is cached
+            if not (self.frame_prefetcher is None):
+                self.frame_prefetcher.prefetch_around(self.dataset, self.frame_index)
+            return
+
+        if (self.frame_prefetcher is None):
+            frame_scene_data = self.load_frame(self.dataset, self.frame_index)
+        else:
+            frame_scene_data = self.frame_prefetcher.get_frame(self.dataset, self.frame_index)
+        if (frame_scene_data is None):
+            return
+
+        self._visualize_scene(frame_scene_data)
+        if (self.frame_cache is None):
+            self._uncached_scene_viz = self.visualizer.scene_viz
+        else:
+            # NOTE: The cache owns the scene viz from now on, _on_frame_evicted gives it back if it's evicted while visualized
+            self.frame_cache.put(frame_cache_key, (frame_scene_data, self.visualizer.scene_viz), self.visualizer.scene_viz.nbytes)
+
+    def _visualize_scene(self, frame_scene_data, frame_scene_viz = None):
+        last_scene_viz = self._uncached_scene_viz
+        self._uncached_scene_viz = None
+        self.visualizer.visualize_scene(frame_scene_data, frame_scene_viz)
+        if not (last_scene_viz is None) and not (last_scene_viz is self.visualizer.scene_viz):
+            last_scene_viz.delete()
 
     def set_frame_index(self, new_frame_index):
         total_frame_count = self.dataset.frame_count
@@ -124,9 +211,20 @@ class NVDUVizWindow(pyglet.window.Window):
             self.frame_index = new_frame_index
             self.visualize_current_frame()
     
+    def set_frame_name(self, frame_name):
+        """Jump to a frame using its name, return False if the frame is not in the dataset"""
+        new_frame_index = self.dataset.get_frame_index_from_name(frame_name)
+        if (new_frame_index < 0):
+            print("Can't find frame: {}".format(frame_name))
+            return False
+
+        self.set_frame_index(new_frame_index)
+        return True
+    
     # ========================== INPUT CONTROL ==========================
     def on_key_press(self, symbol, modifiers):
         super(NVDUVizWindow, self).on_key_press(symbol, modifiers)
+        self._held_motion_count = 0
         if (symbol == key.F3):
             self.toggle_cuboid2d_overlay()
         if (symbol == key.F4):
@@ -150,7 +248,15 @@ class NVDUVizWindow(pyglet.window.Window):
         elif (symbol == key.SPACE):
             self.toggle_auto_change_frame()
 
+    def on_key_release(self, symbol, modifiers):
+        # Show the full resolution image when the user stop scrubbing through the frames
+        if (symbol in (key.LEFT, key.RIGHT, key.UP, key.DOWN)):
+            self._held_motion_count = 0
+            self.refresh_preview_frame()
+
     def on_text_motion(self, motion):
+        # NOTE: Holding an arrow key repeat the motion, the preview images are used from the second repeat
+        self._held_motion_count += 1
         if motion == key.LEFT:
             self.set_frame_index(self.frame_index - 1)
         elif motion == key.RIGHT:
@@ -161,8 +267,28 @@ class NVDUVizWindow(pyglet.window.Window):
             self.set_frame_index(self.frame_index - 100)
 
     def visualize_next_frame(self, dt=0):
+        # NOTE: When following a dataset that is still being written, wait for the new frames instead of going back to the first frame
+        if self.follow_new_frames and (self.frame_index >= self.dataset.frame_count - 1):
+            return
         self.set_frame_index(self.frame_index + 1)
 
+    def update_new_frames(self, dt=0, list_changed_dirs=False):
+        last_frame_count = self.dataset.frame_count
+        shown_frame_name = self.dataset.get_frame_name_from_index(self.frame_index)
+        new_frame_count = self.dataset.scan_new_frames(list_changed_dirs)
+        if (new_frame_count <= 0):
+            return
+
+        print("Found {} new frames - Number of frames in the dataset: {}".format(new_frame_count, self.dataset.frame_count))
+        # Jump to the newest frame if we were already showing the last frame
+        if self.auto_change_frame and (self.frame_index >= last_frame_count - 1):
+            self.set_frame_index(self.dataset.frame_count - 1)
+            return
+        # NOTE: The new frames can be merged before the shown frame, keep the index of the shown frame in sync
+        shown_frame_index = self.dataset.get_frame_index_from_name(shown_frame_name)
+        if (shown_frame_index >= 0):
+            self.frame_index = shown_frame_index
+
     def toggle_export_viz_frame(self):
         self._should_export = not self._should_export
         if (self._should_export and not self.export_dir):
@@ -207,6 +333,62 @@ class NVDUVizWindow(pyglet.window.Window):
         else:
             self.set_auto_change_frame(True)
             
+    def set_prefetch_count(self, prefetch_count, thread_count=FramePrefetcher.DEFAULT_THREAD_COUNT):
+        """Set how many frames are loaded ahead in the background, 0 disable the prefetching"""
+        if not (self.frame_prefetcher is None):
+            self.frame_prefetcher.shutdown()
+            self.frame_prefetcher = None
+
+        if (prefetch_count > 0):
+            self.frame_prefetcher = FramePrefetcher(self.get_frame_request, self.load_frame_request, prefetch_count, thread_count,
+                skip_frame_func=self.is_frame_cached)
+
+    def set_cache_size(self, max_bytes):
+        """Set the byte budget of the visualized frames cache, 0 disable the caching"""
+        if not (self.frame_cache is None):
+            self.frame_cache.clear()
+            self.frame_cache = None
+
+        if (max_bytes > 0):
+            self.frame_cache = LRUCache(max_bytes, on_evict_func=self._on_frame_evicted)
+
+    def set_preview_downscale(self, preview_downscale):
+        """Set the downscale of the images shown while playing or scrubbing through the frames (1, 2, 4 or 8)"""
+        if not (preview_downscale in SUPPORTED_IMAGE_DOWNSCALES):
+            raise Exception('Unsupported preview downscale: {} - supported downscales: {}'.format(preview_downscale, SUPPORTED_IMAGE_DOWNSCALES))
+        self.preview_downscale = preview_downscale
+
+    def refresh_preview_frame(self):
+        """Visualize the current frame again if it's shown at a different downscale than it should"""
+        if not (self.dataset is None) and (self._visualized_image_downscale != self.get_image_downscale()):
+            self.visualize_current_frame()
+
+    def is_frame_cached(self, frame_name):
+        return not (self.frame_cache is None) and ((frame_name, self._loading_image_downscale) in self.frame_cache)
+
+    def _on_frame_evicted(self, frame_cache_key, cached_frame):
+        frame_scene_data, frame_scene_viz = cached_frame
+        # NOTE: Don't free the frame which is being visualized, it's freed when another frame is visualized
+        if (frame_scene_viz is self.visualizer.scene_viz):
+            self._uncached_scene_viz = frame_scene_viz
+        else:
+            frame_scene_viz.delete()
+
+    def set_follow_new_frames(self, new_bool, follow_interval=None):
+        if not (follow_interval is None):
+            self.follow_interval = follow_interval
+        if (self.follow_new_frames == new_bool):
+            return
+
+        self.follow_new_frames = new_bool
+        if (self.follow_new_frames):
+            print("Start following new frames ...")
+            pyglet.clock.schedule_interval(self.update_new_frames, self.follow_interval)
+            pyglet.clock.schedule_interval(self.update_new_frames, self.follow_list_interval, True)
+        else:
+            print("Stop following new frames ...")
+            pyglet.clock.unschedule(self.update_new_frames)
+
     def set_auto_change_frame(self, new_bool):
         if (self.auto_change_frame == new_bool):
             return
@@ -219,4 +401,5 @@ class NVDUVizWindow(pyglet.window.Window):
         else:
             print("Stop auto changing frame ...")
             pyglet.clock.unschedule(self.visualize_next_frame)
+            self.refresh_preview_frame()
             
@@ -43,6 +43,9 @@ class SceneObjectVizBase(object):
 class SceneObjectViz3d(SceneObjectVizBase):
     def __init__(self, scene_object):
         super(SceneObjectViz3d, self).__init__(scene_object)
+        # OpenGL copy of the scene object's world transform matrix and the matrix it was made from
+        self._gl_world_matrix = None
+        self._gl_world_matrix_source = None
 
     def draw(self):
         if ((self.scene_object is None) or (not self.is_visible())):
@@ -58,7 +61,11 @@ class SceneObjectViz3d(SceneObjectVizBase):
 
         world_transform_matrix = self.scene_object.get_world_transform_matrix()
         # print("{} - draw - world_transform_matrix: {}".format(self, world_transform_matrix))
-        glMultMatrixf(get_opengl_matrixf(world_transform_matrix))
+        # NOTE: The world matrix is cached by the scene object until it move, so only convert it again when it's a new matrix
+        if not (world_transform_matrix is self._gl_world_matrix_source):
+            self._gl_world_matrix = get_opengl_matrixf(world_transform_matrix)
+            self._gl_world_matrix_source = world_transform_matrix
+        glMultMatrixf(self._gl_world_matrix)
 
         self.on_draw()
 
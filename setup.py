@@ -69,11 +69,17 @@ setup(
     ],
     extras_require = {
         # "test": [ "pytest" ]
+        # Faster annotation parsing, see nvdu.core.json_backend
+        "fast_json": [ "orjson" ],
     },
     entry_points = {
         "console_scripts": [
             "nvdu_viz=nvdu.tools.test_nvdu_visualizer:main",
             "nvdu_ycb=nvdu.tools.nvdu_ycb:main",
+            "nvdu_pack=nvdu.tools.nvdu_pack:main",
+            "nvdu_check_reprojection=nvdu.tools.nvdu_check_reprojection:main",
+            "nvdu_extract_masks=nvdu.tools.nvdu_extract_masks:main",
+            "nvdu_viz_export=nvdu.tools.nvdu_viz_export:main",
         ]
     },
     scripts=[],